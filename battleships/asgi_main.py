@@ -0,0 +1,375 @@
+"""
+This is the asyncio (ASGI) variant of the main module for the Battleships game.
+
+It serves the same routes and templates as the Flask server in 'main', but as an ASGI
+application, so one process can keep many idle but connected players open cheaply.
+It can be run with any ASGI server, for example:
+
+    uvicorn asgi_main:app
+
+The placement of ships is handled on the '/placement' route.
+The main game is handled on the '/' route.
+The processing of attacks is handled on the '/attack' route.
+Several attacks can be processed in one request on the '/attack/batch' route.
+The state of both boards is returned as bitmasks on the '/state' route, or as lists of
+cells on boards too large for bitmasks.
+Latency and request metrics are returned on the '/metrics' route, when the
+BATTLESHIPS_METRICS environment variable is set to 1.
+
+Each turn, including the BOT's move, is played in a thread pool executor, as is
+every lookup in the game store, which may read the persistence backend, so neither
+blocks the event loop.
+"""
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from typing import Optional
+from urllib.parse import parse_qs
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+import bots as bt
+import components as c
+import decision_cache as dc
+import game_store as gs
+import metrics as mt
+import mp_game_engine as mge
+import persistence as ps
+
+
+# Initialise the template environment, using the same templates as the Flask server
+templates = Environment(
+    loader=FileSystemLoader(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+    ),
+    autoescape=select_autoescape(["html"]),
+)
+
+
+class Request:
+    """The parts of an HTTP request used by the routes
+
+    Attributes:
+    method -- the HTTP method of the request
+    path -- the path of the request
+    args -- dictionary containing the first value of each query string argument
+    cookies -- dictionary containing the value of each cookie
+    body -- the body of the request
+    """
+
+    def __init__(self, scope: dict, body: bytes) -> None:
+        self.method = scope["method"]
+        self.path = scope["path"]
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        self.args = {key: values[0] for key, values in query.items()}
+        cookie = SimpleCookie()
+        for name, value in scope.get("headers", []):
+            if name == b"cookie":
+                cookie.load(value.decode("latin-1"))
+        self.cookies = {key: morsel.value for key, morsel in cookie.items()}
+        self.body = body
+
+    def get_json(self):
+        """Returns the body of the request parsed as JSON"""
+        return json.loads(self.body or b"null")
+
+
+def html(body: str, game_id: Optional[str] = None) -> tuple:
+    """Returns an HTML response, setting the game ID cookie if one is given"""
+    return 200, "text/html; charset=utf-8", body.encode("utf-8"), game_id
+
+
+def jsonify(data, status: int = 200, game_id: Optional[str] = None) -> tuple:
+    """Returns a JSON response, setting the game ID cookie if one is given"""
+    return status, "application/json", json.dumps(data).encode("utf-8"), game_id
+
+
+def text(body: str, status: int = 200) -> tuple:
+    """Returns a plain text response"""
+    return status, "text/html; charset=utf-8", body.encode("utf-8"), None
+
+
+async def run_blocking(function, *args):
+    """Runs a function which may block in the executor and returns its result"""
+    return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+
+async def current_game(request: Request):
+    """Returns the ID and game state of the caller's game, or None if they have none"""
+    game_id = request.cookies.get(GAME_COOKIE)
+    return game_id, await run_blocking(games.get, game_id)
+
+
+def play_locked(play, game, *args):
+    """Plays turns of a game, or reads its state, while holding the game's lock
+
+    Requests holding the lock use the game one at a time, so no request sees a
+    turn half played.
+    """
+    with game.lock:
+        return play(game, *args)
+
+
+def recorder(game_id: str):
+    """Returns a function recording the moves of a game in the game store"""
+    return lambda event: games.record_event(game_id, event)
+
+
+async def placement_interface(request: Request) -> tuple:
+    """
+    Handles the initial placement of the ships on the board.
+
+    If a GET request is made, it starts a new game for the player and returns a
+    rendered template of the game board where they can place their battleships.
+
+    If a POST request is made, it receives the ship placement data from the
+    webpage, checks it and places the ships on the board of the player's game.
+    """
+    if request.method == "GET":
+        # Starts a new game for the player
+        game_id, _ = await run_blocking(games.new_game)
+        # Shows the placement.html template where the player can place battleships
+        page = templates.get_template("placement.html").render(
+            ships=c.create_battleships(), board_size=BOARD_SIZE
+        )
+        return html(page, game_id)
+
+    game_id, game = await current_game(request)
+    if game is None:
+        game_id, game = await run_blocking(games.new_game)
+    try:
+        # Places the ships on the player's board, held in their game
+        await run_blocking(games.place_ships, game_id, "player", request.get_json())
+    except (TypeError, ValueError) as err:
+        return jsonify({"Success": False, "Error": str(err)}, 400)
+    return jsonify({"Success": True}, game_id=game_id)
+
+
+async def root(request: Request) -> tuple:
+    """
+    Handles the root route of the application.
+
+    It places battleships on the player's board according to their choice on
+    /placement and passes the player's board data to the main.html template.
+    If the player has no game, a new one is started.
+    """
+    game_id, game = await current_game(request)
+    if game is None:
+        game_id, game = await run_blocking(games.new_game)
+    # Ships are only placed once, refreshing the page keeps the current board
+    await run_blocking(games.place_default_ships, game_id, "player")
+
+    page = templates.get_template("main.html").render(
+        player_board=c.board_to_list(game.board("player"))
+    )
+    return html(page, game_id)
+
+
+async def process_attack(request: Request) -> tuple:
+    """
+    Processes an attack made when the player clicks on the grid.
+
+    It reads the attack coordinates from the request arguments and plays one turn
+    of both the player and the BOT in the executor, so the BOT's move never blocks
+    the event loop.
+    """
+    game_id, game = await current_game(request)
+    if game is None:
+        return text("No Game Found")
+
+    if request.args:
+        try:
+            # Requests attack coordinates from request arguments
+            player_attack = (int(request.args["y"]), int(request.args["x"]))
+        except (KeyError, ValueError):
+            return text("Invalid Coordinates")
+        # Plays the turns of both the player and the BOT, giving the BOT a share of
+        # the move budget depending on the server's load. The game's lock stops two
+        # requests, such as a double click, playing turns of the game at once
+        with bot_budget.reserve() as budget:
+            outcome = await run_blocking(
+                play_locked,
+                mge.play_turn,
+                game,
+                player_attack,
+                recorder(game_id),
+                budget,
+            )
+        # Messages are sent when the attack could not be played
+        if isinstance(outcome, str):
+            return text(outcome)
+        return jsonify(outcome)
+
+    return text("Unknown Error")
+
+
+async def process_attack_batch(request: Request) -> tuple:
+    """
+    Processes a list of attacks in one request, for scripted and bot clients.
+
+    The request body is JSON of the form {"shots": [[x, y], ...]}, with at most one
+    shot for each cell of the board. The turns are played in the executor and stop
+    once the game is over.
+    """
+    game_id, game = await current_game(request)
+    if game is None:
+        return text("No Game Found")
+
+    try:
+        shots = request.get_json()["shots"]
+        # No game lasts longer than a shot at every cell of the board
+        if len(shots) > game.size * game.size:
+            return text("Too Many Shots")
+        # Converts each shot into the coordinates used by the game
+        player_attacks = [(int(y), int(x)) for x, y in shots]
+    except (KeyError, TypeError, ValueError):
+        return text("Invalid Coordinates")
+    with bot_budget.reserve() as budget:
+        outcome = await run_blocking(
+            play_locked,
+            mge.play_turns,
+            game,
+            player_attacks,
+            recorder(game_id),
+            budget,
+        )
+    return jsonify(outcome)
+
+
+async def game_state(request: Request) -> tuple:
+    """
+    Returns the state of both boards of the caller's game as bitmasks, or as lists
+    of cells on large boards.
+
+    If the version of an earlier response is given in the "since" argument, only
+    the shots made after that version are returned.
+    """
+    _, game = await current_game(request)
+    if game is None:
+        return text("No Game Found")
+
+    try:
+        since = int(request.args["since"]) if "since" in request.args else None
+    except ValueError:
+        return text("Invalid Version")
+    # Reads the state in the executor, as a turn may be holding the game's lock
+    state = await run_blocking(play_locked, mge.board_state, game, "player", since)
+    return jsonify(state)
+
+
+async def prometheus_metrics(request: Request) -> tuple:
+    """
+    Returns the latency of each route and phase of a turn, the number of requests
+    and the number of active games in the Prometheus text format.
+    """
+    if not mt.registry.enabled:
+        return text("Metrics Disabled", 404)
+    body = mt.registry.render().encode("utf-8")
+    return 200, "text/plain; version=0.0.4", body, None
+
+
+# Routes of the application, as {(method, path): handler}
+ROUTES = {
+    ("GET", "/placement"): placement_interface,
+    ("POST", "/placement"): placement_interface,
+    ("GET", "/"): root,
+    ("GET", "/attack"): process_attack,
+    ("POST", "/attack/batch"): process_attack_batch,
+    ("GET", "/state"): game_state,
+    ("GET", "/metrics"): prometheus_metrics,
+}
+
+
+async def read_body(receive) -> bytes:
+    """Reads the whole body of an HTTP request"""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+async def app(scope: dict, receive, send) -> None:
+    """The ASGI application, handling HTTP requests and lifespan events"""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                executor.shutdown(wait=False)
+                # Saves every queued move before the server stops
+                games.persistence.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] != "http":
+        return
+
+    # Times each request when metrics are enabled
+    start = time.perf_counter() if mt.registry.enabled else None
+    request = Request(scope, await read_body(receive))
+    handler = ROUTES.get((request.method, request.path))
+    if handler is None:
+        status, content_type, body, game_id = text("Not Found", 404)
+    else:
+        status, content_type, body, game_id = await handler(request)
+    if start is not None:
+        route = request.path if handler is not None else "unmatched"
+        mt.registry.observe(
+            "battleships_request_seconds",
+            (("route", route),),
+            time.perf_counter() - start,
+        )
+        mt.registry.increment(
+            "battleships_requests_total", (("route", route), ("status", status))
+        )
+
+    headers = [
+        (b"content-type", content_type.encode("latin-1")),
+        (b"content-length", str(len(body)).encode("latin-1")),
+    ]
+    # Sets the game ID cookie so later requests find the same game
+    if game_id is not None:
+        cookie = f"{GAME_COOKIE}={game_id}; HttpOnly; SameSite=Lax; Path=/"
+        headers.append((b"set-cookie", cookie.encode("latin-1")))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+# Initialises variables
+BOARD_SIZE = 10
+BOARD_ENGINE = "compact"  # See components.ENGINES for other board engines
+BOT_STRATEGY = "hunt_target"  # See bots.BOTS and bots.DIFFICULTIES for others
+BOT_MOVE_BUDGET = 0.05  # Seconds for a BOT move, shared by the moves made at once
+GAME_COOKIE = "game_id"
+BOT_WORKERS = 4  # Threads used to play turns off the event loop
+DATABASE_FILE = os.environ.get("BATTLESHIPS_DATABASE")  # None keeps games in memory
+METRICS_ENABLED = os.environ.get("BATTLESHIPS_METRICS") == "1"
+BOT_CACHE_BYTES = 16 * 1024 * 1024  # Memory cap of the BOT decision cache
+
+# Initialises the store holding every player's game
+games = gs.GameStore(
+    BOARD_SIZE,
+    BOARD_ENGINE,
+    persistence=ps.SQLitePersistence(DATABASE_FILE) if DATABASE_FILE else None,
+    bot=BOT_STRATEGY,
+)
+executor = ThreadPoolExecutor(max_workers=BOT_WORKERS)
+
+# Shares the time for BOT moves out so latency stays flat as load grows
+bot_budget = bt.MoveBudget(BOT_MOVE_BUDGET)
+# Bounds the decisions cached by strong BOTs across every game
+dc.cache.max_bytes = BOT_CACHE_BYTES
+
+# Metrics are only recorded when enabled, so they cost nothing otherwise
+mt.registry.enabled = METRICS_ENABLED
+mt.registry.gauge("battleships_active_games", lambda: len(games))
+mt.registry.gauge("battleships_bot_cache_hit_ratio", lambda: dc.cache.hit_rate)
+mt.registry.gauge("battleships_bot_cache_bytes", lambda: dc.cache.size)
+mt.registry.gauge("battleships_bot_moves_active", lambda: bot_budget.active)
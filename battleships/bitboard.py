@@ -0,0 +1,313 @@
+"""
+This module contains the bitboard engine for the Battleships game.
+
+A bitboard stores the board as integer bitmasks instead of a list of lists. Each cell
+of a size * size board is given one bit, numbered row by row, so the cell at
+board[col][row] is bit (col * size + row). The engine keeps one mask per ship and
+a mask of every shot fired, which lets attacks, sunk detection and game over
+checks be answered with a handful of bit operations.
+
+The 'iter_bits' function gives the index of each set bit of a mask, which is how
+the cells of a mask are visited by every module working with bitmasks.
+
+The 'BitBoard' class exposes the same methods used by the 'components' and
+'game_engine' modules for the other board engines, so it can be passed to
+'place_battleships' and 'attack' in place of a list of lists.
+
+Constants:
+    DOWN: Represents the direction down of a ship (matches components.DOWN).
+    RIGHT: Represents the direction right of a ship (matches components.RIGHT).
+    SEARCH_STEPS: The largest number of placements tried when sampling a fleet.
+    RESTART_STEPS: The placements tried before the first restart of the sampling.
+"""
+
+from functools import lru_cache
+from random import Random, randint
+from typing import Iterator, Optional
+
+
+# Constants
+DOWN = 0
+RIGHT = 1
+# Largest number of placements tried by 'sample_fleet' before giving up
+SEARCH_STEPS = 50000
+# Placements tried by 'sample_fleet' before its first restart
+RESTART_STEPS = 200
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Yields the index of every set bit of a mask, from the lowest bit up"""
+    while mask:
+        # Finds the index of the lowest set bit and clears it
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def line_mask(size: int, col: int, row: int, direction: int, length: int) -> int:
+    """Returns the bitmask covering a ship of length starting at (col, row)
+
+    Returns 0 if any cell of the ship would fall outside of the board.
+
+    Keyword arguments:
+    size -- the size of the board
+    col -- the starting col of the ship (first index of the board)
+    row -- the starting row of the ship (second index of the board)
+    direction -- DOWN or RIGHT
+    length -- the length of the ship
+    """
+    length = int(length)
+    # Checks the ship fits within the board
+    if col < 0 or row < 0 or col >= size or row >= size or length < 1:
+        return 0
+    if direction == DOWN:
+        if col + length > size:
+            return 0
+        step = size
+    else:
+        if row + length > size:
+            return 0
+        step = 1
+    mask = 0
+    start = col * size + row
+    # Sets one bit for each cell of the ship
+    for i in range(length):
+        mask |= 1 << (start + i * step)
+    return mask
+
+
+@lru_cache(maxsize=None)
+def placement_index(size: int, length: int) -> tuple[tuple[int, int, int, int], ...]:
+    """Returns every legal placement of a ship of length on an empty board
+
+    Each placement is a tuple of (mask, col, row, direction). The index is cached for
+    each (size, length) so it is only built once per process.
+
+    Keyword arguments:
+    size -- the size of the board
+    length -- the length of the ship
+    """
+    placements = []
+    for direction in (DOWN, RIGHT):
+        for col in range(size):
+            for row in range(size):
+                mask = line_mask(size, col, row, direction, length)
+                if mask:
+                    placements.append((mask, col, row, direction))
+    return tuple(placements)
+
+
+def sample_fleet(
+    size: int,
+    lengths: list[int],
+    occupied: int = 0,
+    rng: Optional[Random] = None,
+    steps: int = SEARCH_STEPS,
+) -> Optional[list[tuple[int, int, int, int]]]:
+    """Randomly places a fleet of ships using the placement index
+
+    The longest ship left is placed at a placement chosen uniformly from those which
+    do not overlap the ships already placed. On crowded boards, the cell with the
+    fewest placements covering it is decided first instead: it is covered by one
+    of them, or left empty while there are reachable cells to spare, so tight
+    fleets are found without guessing.
+    If a ship has no compatible placement, the previous ships are moved.
+
+    The search is restarted in a new random order after RESTART_STEPS placements,
+    with twice as many steps each time, so an unlucky start does not hold it up.
+    Every placement a ship could take is tried before a search gives up, so a
+    search which ends within its steps proves the fleet cannot fit.
+
+    Returns the placements in the order of lengths, or None if the fleet cannot fit
+    on the board. A RuntimeError is raised if neither a placement nor a proof was
+    found within the number of steps, so the search always ends.
+
+    Keyword arguments:
+    size -- the size of the board
+    lengths -- the length of each ship
+    occupied -- mask of cells which are already occupied (default 0)
+    rng -- the random generator to use, or None for the random module (default None)
+    steps -- the largest number of placements tried (default SEARCH_STEPS)
+    """
+    pick = randint if rng is None else rng.randint
+    lengths = [int(length) for length in lengths]
+    # The fleet cannot fit if there are fewer free cells than ship cells
+    if sum(lengths) > size * size - bin(occupied).count("1"):
+        return None
+    # Ships of the same length are interchangeable, so only their number is kept
+    remaining = {}
+    for length in lengths:
+        remaining[length] = remaining.get(length, 0) + 1
+    placed = {length: [] for length in remaining}
+    budget = [0]
+
+    def crowded_options(occupied: int, left: int) -> list[tuple[int, tuple]]:
+        """Returns the (length, placement) options of a crowded board"""
+        candidates = {
+            length: [
+                placement
+                for placement in placement_index(size, length)
+                if placement[0] & occupied == 0
+            ]
+            for length, count in remaining.items()
+            if count
+        }
+        # Counts the placements covering each cell the ships left can reach
+        counts = {}
+        for placements in candidates.values():
+            for placement in placements:
+                for index in iter_bits(placement[0]):
+                    counts[index] = counts.get(index, 0) + 1
+        # Some ship cells would have nowhere to go
+        if len(counts) < left:
+            return []
+        # The cell with the fewest placements covering it is decided first
+        cell = 1 << min(counts, key=counts.get)
+        options = [
+            (length, placement)
+            for length, placements in candidates.items()
+            for placement in placements
+            if placement[0] & cell
+        ]
+        # With reachable cells to spare, the cell may also be left empty
+        if len(counts) > left:
+            options.append((0, (cell, 0, 0, 0)))
+        return options
+
+    def place(occupied: int, left: int) -> bool:
+        if left == 0:
+            return True
+        if size * size - bin(occupied).count("1") - left >= size:
+            # Boards with room to spare place the longest ship left anywhere it fits
+            length = max(length for length, count in remaining.items() if count)
+            options = [
+                (length, placement)
+                for placement in placement_index(size, length)
+                if placement[0] & occupied == 0
+            ]
+        else:
+            options = crowded_options(occupied, left)
+        # Tries the options in a random order without repeats
+        while options:
+            if budget[0] <= 0:
+                return False
+            budget[0] -= 1
+            index = pick(0, len(options) - 1)
+            options[index], options[-1] = options[-1], options[index]
+            length, placement = options.pop()
+            # Leaves a cell empty by blocking it
+            if length == 0:
+                if place(occupied | placement[0], left):
+                    return True
+                continue
+            remaining[length] -= 1
+            placed[length].append(placement)
+            if place(occupied | placement[0], left - length):
+                return True
+            placed[length].pop()
+            remaining[length] += 1
+        return False
+
+    limit = RESTART_STEPS
+    while steps > 0:
+        budget[0] = min(limit, steps)
+        steps -= budget[0]
+        if place(occupied, sum(lengths)):
+            # Hands the placements of each length back in the order of the ships
+            return [placed[length].pop() for length in lengths]
+        # The search ended before its steps ran out, so every option was tried
+        if budget[0] > 0:
+            return None
+        limit *= 2
+    raise RuntimeError("No placement of the fleet was found within the steps")
+
+
+class BitBoard:
+    """Board engine storing occupancy, hits and misses as integer bitmasks
+
+    Attributes:
+    size -- the size of the board
+    ships -- dictionary containing each ship name and the mask of its cells
+    occupied -- mask of every cell containing a ship
+    afloat -- mask of every ship cell that has not been hit
+    shots -- mask of every cell that has been attacked
+    """
+
+    def __init__(self, size: int = 10) -> None:
+        self.size = size
+        self.ships = {}
+        self.occupied = 0
+        self.afloat = 0
+        self.shots = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def cell_bit(self, col: int, row: int) -> int:
+        """Returns the bit representing the cell at (col, row)"""
+        return 1 << (col * self.size + row)
+
+    @property
+    def hits(self) -> int:
+        """Mask of every shot that hit a ship"""
+        return self.shots & self.occupied
+
+    @property
+    def misses(self) -> int:
+        """Mask of every shot that missed"""
+        return self.shots & ~self.occupied
+
+    def is_position_occupied(
+        self, col: int, row: int, direction: int, length: int
+    ) -> bool:
+        """Checks if ship can fit and returns True or False"""
+        mask = line_mask(self.size, col, row, direction, length)
+        return mask != 0 and mask & self.occupied == 0
+
+    def place_ship(
+        self, ship: str, col: int, row: int, direction: int, length: int
+    ) -> None:
+        """Places a ship onto the board starting at (col, row)"""
+        mask = line_mask(self.size, col, row, direction, length)
+        # Raises error if ship does not fit on the board
+        if mask == 0:
+            raise ValueError(f"Ship '{ship}' does not fit on the board")
+        self.ships[ship] = self.ships.get(ship, 0) | mask
+        self.occupied |= mask
+        self.afloat |= mask
+
+    def ship_at(self, col: int, row: int) -> Optional[str]:
+        """Returns the name of the ship at (col, row) or None if cell is empty"""
+        bit = self.cell_bit(col, row)
+        if self.occupied & bit == 0:
+            return None
+        for ship, mask in self.ships.items():
+            if mask & bit:
+                return ship
+        return None
+
+    def attack(self, col: int, row: int) -> Optional[str]:
+        """Records a shot at (col, row) and returns the ship hit or None"""
+        bit = self.cell_bit(col, row)
+        self.shots |= bit
+        # Checks if cell contains a ship that has not already been hit
+        if self.afloat & bit == 0:
+            return None
+        self.afloat &= ~bit
+        return self.ship_at(col, row)
+
+    def is_sunk(self, ship: str) -> bool:
+        """Checks if every cell of a ship has been hit"""
+        return self.ships[ship] & self.afloat == 0
+
+    def is_game_over(self) -> bool:
+        """Checks if every ship on the board has been sunk"""
+        return self.afloat == 0
+
+    def to_list(self) -> list[list]:
+        """Returns the board as a list of lists of ship names that are not hit"""
+        board = [[None] * self.size for _ in range(self.size)]
+        for ship, mask in self.ships.items():
+            for index in iter_bits(mask & self.afloat):
+                board[index // self.size][index % self.size] = ship
+        return board
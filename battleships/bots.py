@@ -0,0 +1,694 @@
+"""
+This module contains the BOT opponents of the Battleships game.
+
+Each BOT picks the cells it attacks with 'choose' and is told the outcome of each of
+its shots with 'record', so it only ever knows what a real opponent would: whether a
+shot hit and which ship, if any, it sank.
+
+The 'RandomBot' class attacks untried cells at random.
+The 'HuntTargetBot' class hunts on a parity pattern of cells until it hits a ship, and
+then targets the neighbours of each hit until the ships hit have been sunk. Its state
+is updated incrementally on each shot, so picking a move takes constant time whatever
+the size of the board.
+The 'DensityBot' class attacks the cell covered by the most placements of the ships
+not yet sunk, which are counted with NumPy sliding windows and updated only along the
+column and row of each shot.
+The 'MonteCarloBot' class attacks the cell most often occupied in whole fleets sampled
+to be consistent with its shots, sampling across a process pool within a time budget.
+
+Each move can be given a deadline, by which BOTs searching for their move return the
+best move found so far.
+
+The 'BOTS' dictionary maps the name of each strategy to its class, the 'DIFFICULTIES'
+dictionary maps each difficulty tier to a strategy and its budgets, and 'create_bot'
+creates a BOT for a game. The 'MoveBudget' class shares out the time allowed for BOT
+moves between the moves the server is computing at once.
+"""
+
+import os
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from functools import lru_cache
+from multiprocessing import current_process
+from random import Random, randint, seed
+from typing import Iterator, Optional
+
+import bitboard as bb
+import decision_cache as dc
+import models as m
+import numpy_board as nb
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only the density BOT needs it
+    np = None
+
+
+# Default number of fleets sampled by the Monte Carlo BOT for each move
+MONTE_CARLO_SAMPLES = 2000
+# Default seconds of sampling allowed for each move of the Monte Carlo BOT
+MONTE_CARLO_BUDGET = 0.05
+# Default number of processes sampling for the Monte Carlo BOT
+MONTE_CARLO_WORKERS = min(os.cpu_count() or 1, 4)
+# Number of chunks the samples of each move are split into, whatever the workers
+MONTE_CARLO_CHUNKS = 8
+# Random cells of the parity pattern tried by the hunt/target BOT on large boards
+HUNT_ATTEMPTS = 64
+# Largest number of placements tried for each fleet sampled, so no sample stalls
+SAMPLE_STEPS = 500
+# Seconds to wait past the budget for the samplers to hand back their counts
+RESULT_GRACE = 0.005
+
+
+class RandomBot:
+    """BOT attacking cells which have not been attacked yet at random
+
+    Attributes:
+    size -- the size of the board being attacked
+    rng -- the random generator of the BOT, or None for the random module
+    """
+
+    def __init__(
+        self, size: int, battleships: dict[str, int], rng: Optional[Random] = None
+    ) -> None:
+        self.size = size
+        self.rng = rng
+
+    def choose(
+        self, shots: m.ShotTracker, deadline: Optional[float] = None
+    ) -> tuple[int, int]:
+        """Returns the coordinates of the next cell to attack
+
+        BOTs which search for their move return the best move found by the
+        deadline, while the others take a constant time and ignore it.
+
+        Keyword arguments:
+        shots -- the cells already attacked by the BOT
+        deadline -- the time.time() by which the move is needed, or None
+        """
+        return shots.sample(self.rng)
+
+    def record(self, coordinates: tuple, hit: bool, sunk: Optional[str]) -> None:
+        """Records the outcome of a shot
+
+        Keyword arguments:
+        coordinates -- the coordinates of the shot
+        hit -- whether the shot hit a ship
+        sunk -- the name of the ship sunk by the shot, or None
+        """
+
+
+class HuntTargetBot(RandomBot):
+    """BOT hunting on a parity pattern and then targeting the neighbours of hits
+
+    While hunting, only cells where (col + row) is a multiple of the shortest ship's
+    length are attacked, as every ship must cover one of them. These cells are kept
+    in a deck, with the cells not yet attacked first, like 'models.ShotTracker',
+    and removed from it with 'models.remove_from_deck'. Boards larger than
+    'models.DECK_MAX_SIZE' keep no deck, and random cells of the pattern are retried
+    until an untried one is found instead. After a hit, the neighbouring cells are
+    added to a stack of targets, which are attacked until every ship hit has been
+    sunk.
+
+    Attributes:
+    size -- the size of the board being attacked
+    lengths -- dictionary containing each ship name and its length
+    parity -- the spacing of the cells attacked while hunting
+    deck -- array of the hunting cells, with the cells not attacked yet first, or
+            None on large boards
+    positions -- array of the position of each cell in the deck, or
+                 'models.NOT_IN_DECK' if it is not a hunting cell
+    untried -- number of hunting cells not attacked yet, 0 on large boards
+    targets -- stack of cells next to hits which are still to be attacked
+    wounded -- number of hits on ships which have not been sunk yet
+    """
+
+    def __init__(
+        self, size: int, battleships: dict[str, int], rng: Optional[Random] = None
+    ) -> None:
+        super().__init__(size, battleships, rng)
+        self.lengths = dict(battleships)
+        self.parity = max(min(self.lengths.values(), default=1), 1)
+        self.deck = None
+        self.positions = array(m.DECK_TYPECODE)
+        self.untried = 0
+        # Large boards keep no deck, so the memory used does not grow with the board
+        if size <= m.DECK_MAX_SIZE:
+            self.deck = array(m.DECK_TYPECODE)
+            self.positions = array(m.DECK_TYPECODE, [m.NOT_IN_DECK]) * (size * size)
+            for cell in range(size * size):
+                if sum(divmod(cell, size)) % self.parity == 0:
+                    self.positions[cell] = len(self.deck)
+                    self.deck.append(cell)
+            self.untried = len(self.deck)
+        self.targets = []
+        self.wounded = 0
+
+    def _remove(self, cell: int) -> None:
+        """Removes a cell from the untried hunting cells, if it is one of them"""
+        if self.deck is not None:
+            self.untried = m.remove_from_deck(
+                self.deck, self.positions, self.untried, cell
+            )
+
+    def choose(
+        self, shots: m.ShotTracker, deadline: Optional[float] = None
+    ) -> tuple[int, int]:
+        # Targets the neighbours of hits first
+        while self.targets:
+            coordinates = divmod(self.targets.pop(), self.size)
+            if coordinates not in shots:
+                return coordinates
+        pick = randint if self.rng is None else self.rng.randint
+        # Hunts on the parity pattern
+        if self.untried:
+            return divmod(self.deck[pick(0, self.untried - 1)], self.size)
+        if self.deck is None:
+            for _ in range(HUNT_ATTEMPTS):
+                col = pick(0, self.size - 1)
+                # Picks a row of the col on the parity pattern
+                first = -col % self.parity
+                if first >= self.size:
+                    continue
+                step = pick(0, (self.size - 1 - first) // self.parity)
+                row = first + step * self.parity
+                if (col, row) not in shots:
+                    return col, row
+        # Every hunting cell has been attacked, so any untried cell is picked
+        return shots.sample(self.rng)
+
+    def record(self, coordinates: tuple, hit: bool, sunk: Optional[str]) -> None:
+        col, row = coordinates
+        self._remove(col * self.size + row)
+        if not hit:
+            return
+        self.wounded += 1
+        if sunk is not None:
+            self.wounded -= self.lengths.get(sunk, 0)
+            # Every ship hit has been sunk, so the BOT goes back to hunting
+            if self.wounded <= 0:
+                self.wounded = 0
+                self.targets.clear()
+                return
+        # Adds the neighbouring cells on the board as targets
+        if col > 0:
+            self.targets.append((col - 1) * self.size + row)
+        if col < self.size - 1:
+            self.targets.append((col + 1) * self.size + row)
+        if row > 0:
+            self.targets.append(col * self.size + row - 1)
+        if row < self.size - 1:
+            self.targets.append(col * self.size + row + 1)
+
+
+def _sunk_cells(size: int, col: int, row: int, length: int, is_hit) -> list:
+    """Returns the hits in a line through (col, row) which made up a sunk ship
+
+    Keyword arguments:
+    size -- the size of the board
+    col -- the col of the shot which sank the ship
+    row -- the row of the shot which sank the ship
+    length -- the length of the sunk ship
+    is_hit -- function returning whether (col, row) is a hit on a ship not yet sunk
+    """
+    for step_col, step_row in ((1, 0), (0, 1)):
+        for offset in range(length):
+            start_col = col - offset * step_col
+            start_row = row - offset * step_row
+            cells = [
+                (start_col + i * step_col, start_row + i * step_row)
+                for i in range(length)
+            ]
+            if all(
+                0 <= c < size and 0 <= r < size and is_hit(c, r) for c, r in cells
+            ):
+                return cells
+    return [(col, row)]
+
+
+@lru_cache(maxsize=None)
+def _coverage_indices(size: int, length: int) -> tuple:
+    """Returns the prefix sum indices of the first and last window covering each cell"""
+    cells = np.arange(size)
+    # Cell i is covered by the windows starting from i - length + 1 to i
+    return np.minimum(cells, size - length) + 1, np.maximum(cells - length + 1, 0)
+
+
+def _line_density(lines, length: int):
+    """Returns the hunting and targeting density of each cell along the last axis
+
+    The hunting density of a cell is the number of placements of a ship of length
+    covering it which do not cover a blocked cell. The targeting density only counts
+    placements covering hits, weighted by the number of hits covered. Both are
+    found with the sliding-window sums of 'numpy_board.line_window_sums', and the
+    placements covering each cell are summed from 'numpy_board.prefix_sums'.
+
+    The result is an array of the same shape as lines, of the hunting density
+    followed by the targeting density.
+
+    Keyword arguments:
+    lines -- array of the blocked cells, which no ship can cover, followed by the
+             hits on ships which have not been sunk, containing 1 for each
+    length -- the length of the ship
+    """
+    size = lines.shape[-1]
+    if length > size:
+        return np.zeros(lines.shape, dtype=np.int64)
+    # Sums of the blocked cells and hits covered by the placement starting at each cell
+    windows = nb.line_window_sums(lines, length)
+    free = windows[0] == 0
+    windows[0] = free
+    windows[1] *= free
+    # Sums of the placements covering each cell
+    totals = nb.prefix_sums(windows)
+    last, first = _coverage_indices(size, length)
+    return totals[..., last] - totals[..., first]
+
+
+class DensityBot(RandomBot):
+    """BOT attacking the cell covered by the most placements of the remaining ships
+
+    For every ship not yet sunk, the placements which are consistent with the misses
+    and sunk ships are counted for each cell using sliding-window sums over the board.
+    While there are hits on ships which have not been sunk, only the placements
+    covering those hits are counted, weighted by the number of hits they cover.
+
+    A shot only changes the placements along its own column and row, so after each
+    shot only that column and row are counted again, rather than the whole board.
+    NumPy is needed to use this BOT.
+
+    Attributes:
+    size -- the size of the board being attacked
+    lengths -- dictionary containing each ship name and its length
+    marks -- array of the blocked cells, misses and the cells of sunk ships, followed
+             by the hits on ships which have not been sunk, containing 1 for each
+    shot -- boolean array of every cell attacked
+    wounded -- number of hits on ships which have not been sunk
+    """
+
+    def __init__(
+        self, size: int, battleships: dict[str, int], rng: Optional[Random] = None
+    ) -> None:
+        if np is None:
+            raise ImportError("The density BOT requires NumPy to be installed")
+        super().__init__(size, battleships, rng)
+        self.lengths = dict(battleships)
+        self.marks = np.zeros((2, size, size), dtype=np.int64)
+        self.shot = np.zeros((size, size), dtype=bool)
+        self.wounded = 0
+        # Number of ships not sunk of each distinct length
+        self._lengths = sorted(set(self.lengths.values()))
+        self._counts = np.array(
+            [list(self.lengths.values()).count(length) for length in self._lengths]
+        )
+        # Density of each length along every line: the columns of the board, for
+        # ships going DOWN, followed by the rows, for ships going RIGHT
+        lines = np.concatenate((self.marks.transpose(0, 2, 1), self.marks), axis=1)
+        self._density = np.stack(
+            [_line_density(lines, length) for length in self._lengths]
+        )
+        # Total hunting and targeting density of each cell over every ship
+        self._total = np.zeros((2, size, size), dtype=np.int64)
+        for count, density in zip(self._counts, self._density):
+            self._total += count * self._cells(density)
+
+    def _cells(self, density):
+        """Returns the density of each cell from the density along every line"""
+        return density[:, : self.size].transpose(0, 2, 1) + density[:, self.size :]
+
+    def _update_lines(self, cols: list, rows: list) -> None:
+        """Counts the placements along some columns and rows of the board again
+
+        Keyword arguments:
+        cols -- the cols of the board whose rows of cells going RIGHT have changed
+        rows -- the rows of the board whose columns of cells going DOWN have changed
+        """
+        lines = rows + [self.size + col for col in cols]
+        marks = np.concatenate(
+            (self.marks[:, :, rows].transpose(0, 2, 1), self.marks[:, cols, :]), axis=1
+        )
+        density = np.stack([_line_density(marks, length) for length in self._lengths])
+        change = np.tensordot(self._counts, density - self._density[:, :, lines], 1)
+        self._density[:, :, lines] = density
+        self._total[:, :, rows] += change[:, : len(rows)].transpose(0, 2, 1)
+        self._total[:, cols, :] += change[:, len(rows) :]
+
+    def choose(
+        self, shots: m.ShotTracker, deadline: Optional[float] = None
+    ) -> tuple[int, int]:
+        density = self._total[1] if self.wounded else self._total[0]
+        density = np.where(self.shot, -1, density)
+        cell = int(density.argmax())
+        # Falls back to random cells if no placement is left to count
+        if density.flat[cell] <= 0:
+            return shots.sample(self.rng)
+        return divmod(cell, self.size)
+
+    def record(self, coordinates: tuple, hit: bool, sunk: Optional[str]) -> None:
+        col, row = coordinates
+        self.shot[col, row] = True
+        if not hit:
+            self.marks[0, col, row] = 1
+            self._update_lines([col], [row])
+            return
+        self.marks[1, col, row] = 1
+        self.wounded += 1
+        if sunk is None or sunk not in self.lengths:
+            self._update_lines([col], [row])
+            return
+
+        # The cells of the sunk ship can no longer be covered by other ships
+        length = self.lengths[sunk]
+        hits = self.marks[1]
+        cells = _sunk_cells(self.size, col, row, length, lambda c, r: hits[c, r])
+        for c, r in cells:
+            self.marks[:, c, r] = (1, 0)
+        self.wounded = max(self.wounded - len(cells), 0)
+        self._update_lines(sorted({c for c, _ in cells}), sorted({r for _, r in cells}))
+        # Removes the density of one ship of the sunk ship's length
+        index = self._lengths.index(length)
+        if self._counts[index]:
+            self._counts[index] -= 1
+            self._total -= self._cells(self._density[index])
+
+
+def sample_occupancy(
+    size: int,
+    lengths: list,
+    blocked: int,
+    hits: int,
+    samples: int,
+    deadline: float,
+    seed: Optional[int] = None,
+) -> tuple[list, int]:
+    """Returns how often each cell is occupied in fleets sampled at random
+
+    Fleets are sampled with 'bitboard.sample_fleet' around the blocked cells, and
+    only fleets covering every hit are kept. Sampling stops after the number of
+    samples or at the deadline, whichever comes first. Returns the count of the
+    kept fleets occupying each cell, indexed by (col * size + row), and the number
+    of fleets kept.
+
+    Keyword arguments:
+    size -- the size of the board
+    lengths -- the length of each ship not yet sunk
+    blocked -- mask of the cells no ship can cover: misses and sunk ships
+    hits -- mask of the hits on ships which have not been sunk
+    samples -- the largest number of fleets to sample
+    deadline -- the time.time() at which to stop sampling
+    seed -- the seed of the fleets sampled, or None to use the random module
+    """
+    rng = None if seed is None else Random(seed)
+    counts = [0] * (size * size)
+    kept = 0
+    for _ in range(samples):
+        if time.time() >= deadline:
+            break
+        try:
+            fleet = bb.sample_fleet(size, lengths, blocked, rng, SAMPLE_STEPS)
+        except RuntimeError:
+            # This sample ran out of steps, so it is skipped
+            continue
+        # No fleet fits around the blocked cells
+        if fleet is None:
+            break
+        occupied = 0
+        for mask, _, _, _ in fleet:
+            occupied |= mask
+        # Fleets leaving a hit uncovered are not consistent with the shots
+        if hits & ~occupied:
+            continue
+        kept += 1
+        for cell in bb.iter_bits(occupied):
+            counts[cell] += 1
+    return counts, kept
+
+
+def _merge_counts(size: int, results: list) -> tuple[list, int]:
+    """Returns the sums of the occupancy counts and fleets kept of sampled chunks"""
+    counts = [0] * (size * size)
+    kept = 0
+    for chunk_counts, chunk_kept in results:
+        counts = [a + b for a, b in zip(counts, chunk_counts)]
+        kept += chunk_kept
+    return counts, kept
+
+
+# The process pool shared by the BOTs for each number of workers
+_POOLS = {}
+# Held while a pool is created, so BOTs moving at once never start two pools
+_POOLS_LOCK = threading.Lock()
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    """Returns the process pool shared by every BOT sampling with workers"""
+    with _POOLS_LOCK:
+        pool = _POOLS.get(workers)
+        if pool is None:
+            # Each worker reseeds its random generator so forked workers sample
+            # differently
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=seed)
+            _POOLS[workers] = pool
+    return pool
+
+
+class MonteCarloBot(HuntTargetBot):
+    """BOT attacking the cell most often occupied in fleets consistent with its shots
+
+    For each move, whole fleets of the ships not yet sunk are sampled around the
+    misses and sunk ships, keeping those covering every hit, and the untried cell
+    occupied in the most kept fleets is attacked. The samples are split across a
+    shared process pool. Sampling stops at the time budget, and parts of the work
+    still waiting for a busy pool are cancelled, so under load a move is picked
+    from fewer samples rather than taking longer. The budget is also cut short by
+    the deadline of each move. If no fleet was kept in time, the BOT falls back to
+    hunting and targeting like 'HuntTargetBot'.
+
+    The cell chosen in each position is kept in a decision cache, shared by default
+    with the BOTs of every game, so positions seen before are answered without
+    sampling. Only moves chosen from every sample are cached, so a move picked
+    from fewer samples under load is never answered again in later games.
+    A BOT given its own random generator ignores the time budget and deadlines and
+    always samples every fleet, so its moves only depend on its seed and its shots,
+    however long sampling takes.
+
+    Attributes:
+    samples -- the largest number of fleets sampled for each move
+    budget -- the most seconds of sampling for each move, cut short by its deadline
+    workers -- number of processes sampling, or 0 to sample in this process
+    cache -- the decision cache of the cells chosen in each position, or None
+    remaining -- the length of each ship not yet sunk
+    blocked -- mask of the misses and the cells of sunk ships
+    hits -- mask of the hits on ships which have not been sunk
+    last_samples -- number of fleets kept for the last move, 0 if it was cached
+    """
+
+    def __init__(
+        self,
+        size: int,
+        battleships: dict[str, int],
+        samples: int = MONTE_CARLO_SAMPLES,
+        budget: float = MONTE_CARLO_BUDGET,
+        workers: int = MONTE_CARLO_WORKERS,
+        cache: Optional[dc.DecisionCache] = dc.cache,
+        rng: Optional[Random] = None,
+    ) -> None:
+        super().__init__(size, battleships, rng)
+        self.samples = samples
+        self.budget = budget
+        self.workers = workers
+        # Cached moves depend on the games played before, so a BOT with its own
+        # random generator does not use the cache and its games can be replayed
+        self.cache = cache if rng is None else None
+        self.remaining = list(self.lengths.values())
+        self.blocked = 0
+        self.hits = 0
+        self.last_samples = 0
+
+    def _sample(self, budget: float) -> tuple[list, int, bool]:
+        """Returns the occupancy counts of the sampled fleets and the number kept
+
+        Also returns whether every chunk was sampled in full, which is only certain
+        if each chunk returned before the deadline.
+        """
+        # Seeded BOTs are bound by the number of samples rather than the clock
+        timed = self.rng is None
+        deadline = time.time() + budget if timed else float("inf")
+        args = (self.size, self.remaining, self.blocked, self.hits)
+        # The samples are split into the same chunks however many processes share
+        # them, each seeded from the BOT's generator when it has one, so a seeded
+        # BOT samples the same fleets with any number of workers
+        share, extra = divmod(self.samples, MONTE_CARLO_CHUNKS)
+        chunks = [
+            (
+                share + (i < extra),
+                None if self.rng is None else self.rng.getrandbits(64),
+            )
+            for i in range(MONTE_CARLO_CHUNKS)
+        ]
+        results = None
+        # Daemon processes, like the workers of a tournament, cannot start a pool
+        if self.workers and not current_process().daemon:
+            try:
+                pool = _process_pool(self.workers)
+                futures = [
+                    pool.submit(sample_occupancy, *args, n, deadline, seed)
+                    for n, seed in chunks
+                ]
+            except (OSError, RuntimeError):
+                # The pool cannot be used, so the fleets are sampled in this process
+                futures = None
+            if futures is not None:
+                timeout = budget + RESULT_GRACE if timed else None
+                done, pending = wait(futures, timeout=timeout)
+                # Work which has not started by the deadline is dropped
+                for future in pending:
+                    future.cancel()
+                results = [
+                    future.result()
+                    for future in done
+                    if not future.cancelled() and future.exception() is None
+                ]
+        if results is None:
+            results = [sample_occupancy(*args, n, deadline, seed) for n, seed in chunks]
+        counts, kept = _merge_counts(self.size, results)
+        # Chunks may have stopped early if the deadline passed before they returned
+        complete = len(results) == len(chunks) and time.time() < deadline
+        return counts, kept, complete
+
+    def choose(
+        self, shots: m.ShotTracker, deadline: Optional[float] = None
+    ) -> tuple[int, int]:
+        if self.cache is not None:
+            key, symmetry = dc.canonical_position(
+                self.size, self.blocked, self.hits, self.remaining
+            )
+            cell = self.cache.get(key)
+            if cell is not None:
+                cell = dc.from_canonical(self.size, cell, symmetry)
+                if not shots.shots >> cell & 1:
+                    self.last_samples = 0
+                    return divmod(cell, self.size)
+        budget = self.budget
+        if deadline is not None and self.rng is None:
+            budget = min(budget, deadline - time.time() - RESULT_GRACE)
+        # Without time left to sample, the BOT falls back to hunting and targeting
+        if budget <= 0 and self.rng is None:
+            self.last_samples = 0
+            return super().choose(shots, deadline)
+        counts, self.last_samples, complete = self._sample(budget)
+        best = max(
+            (
+                (count, cell)
+                for cell, count in enumerate(counts)
+                if count and not shots.shots >> cell & 1
+            ),
+            default=None,
+        )
+        # Falls back to hunting and targeting if no fleet was kept in time
+        if best is None:
+            return super().choose(shots, deadline)
+        # Moves picked from fewer samples under load are not kept for later games
+        if self.cache is not None and complete:
+            self.cache.put(key, dc.to_canonical(self.size, best[1], symmetry))
+        return divmod(best[1], self.size)
+
+    def record(self, coordinates: tuple, hit: bool, sunk: Optional[str]) -> None:
+        super().record(coordinates, hit, sunk)
+        col, row = coordinates
+        bit = 1 << (col * self.size + row)
+        if not hit:
+            self.blocked |= bit
+            return
+        self.hits |= bit
+        if sunk is None or sunk not in self.lengths:
+            return
+
+        # The cells of the sunk ship can no longer be covered by other ships
+        length = self.lengths[sunk]
+        hits = self.hits
+        cells = _sunk_cells(
+            self.size, col, row, length, lambda c, r: hits >> (c * self.size + r) & 1
+        )
+        for c, r in cells:
+            bit = 1 << (c * self.size + r)
+            self.hits &= ~bit
+            self.blocked |= bit
+        if length in self.remaining:
+            self.remaining.remove(length)
+
+
+# BOT strategies which can be given to create_bot
+BOTS = {
+    "random": RandomBot,
+    "hunt_target": HuntTargetBot,
+    "density": DensityBot,
+    "monte_carlo": MonteCarloBot,
+}
+
+# Difficulty tiers which can be given to create_bot, as the strategy of each tier
+# and the options of its BOT, such as the sample and time budgets of each move
+DIFFICULTIES = {
+    "easy": ("random", {}),
+    "medium": ("hunt_target", {}),
+    "hard": ("monte_carlo", {"samples": 200, "budget": 0.01}),
+    "expert": ("monte_carlo", {"samples": MONTE_CARLO_SAMPLES, "budget": 0.05}),
+}
+
+
+def create_bot(
+    strategy: str,
+    size: int,
+    battleships: dict[str, int],
+    rng: Optional[Random] = None,
+):
+    """Returns a new BOT using a strategy or difficulty tier
+
+    Keyword arguments:
+    strategy -- the name of the strategy (see BOTS) or difficulty (see DIFFICULTIES)
+    size -- the size of the board being attacked
+    battleships -- dictionary containing each ship and its length
+    rng -- the random generator of the BOT, or None for the random module
+    """
+    options = {}
+    if strategy in DIFFICULTIES:
+        strategy, options = DIFFICULTIES[strategy]
+    if strategy not in BOTS:
+        raise ValueError(f"Invalid BOT strategy: {strategy}")
+    return BOTS[strategy](size, battleships, rng=rng, **options)
+
+
+class MoveBudget:
+    """Shares out the time allowed for BOT moves between the moves made at once
+
+    Each move being computed gets an equal share of the budget, so the more moves
+    the server is computing at once, the less time each may take, and the time
+    spent on BOT moves stays flat as traffic grows. Below the minimum, a share is
+    too short to search and moves are given no time at all.
+
+    Attributes:
+    budget -- seconds allowed for a BOT move when it is the only one
+    minimum -- the shortest share given to a move, in seconds
+    active -- number of BOT moves being computed
+    """
+
+    def __init__(self, budget: float, minimum: float = 0.002) -> None:
+        self.budget = budget
+        self.minimum = minimum
+        self.active = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def reserve(self) -> Iterator[float]:
+        """Yields the seconds the BOT's move may take, while the move is computed"""
+        with self._lock:
+            self.active += 1
+            share = self.budget / self.active
+        try:
+            yield share if share >= self.minimum else 0.0
+        finally:
+            with self._lock:
+                self.active -= 1
@@ -7,7 +7,22 @@ the board, and the battleships are created from a text file which can also be sp
 The algorithm used to place the battleships can also be specified.
 - simple: places the battleships on each row
 - random: places the battleships randomly on the board
-- custom: places the battleships using a custom algorithm
+- custom: places the battleships using given placements, or placement.json
+  (the placements can be checked first with validate_placements)
+
+The battleships and placement files are cached once parsed, and are only read again
+when they change or clear_file_cache is called.
+
+Random placements use the random module, or a random generator given to them, so
+games can be replayed from a seed (see spawn_rngs).
+
+The board engine can also be chosen when initialising the board:
+- list: a list of lists of ship names (default)
+- bitboard: integer bitmasks of each ship and every shot (see the 'bitboard' module)
+- numpy: a NumPy array of ship indices (see the 'numpy_board' module)
+- compact: a bytearray of ship indices (see the 'models' module)
+- sparse: only the occupied and attacked cells, allowing much larger boards
+  (see the 'sparse_board' module)
 
 Constants:
     DOWN: Represents the direction down of a ship.
@@ -18,37 +33,179 @@ This module is used by the main server module to handle the core game logic.
 
 import os
 import json
-from random import randint
+import time
+from random import Random, randint
+from types import MappingProxyType
+from typing import Optional
+
+import bitboard as bb
+import fleet as fl
+import models as m
+import numpy_board as nb
+import sparse_board as sb
 
 
 # Constants
 DOWN = 0
 RIGHT = 1
 
-
-def initialise_board(size: int = 10) -> list[list[None]]:
+# Board engines which can be selected in initialise_board, other than "list"
+ENGINES = {
+    "bitboard": bb.BitBoard,
+    "numpy": nb.NumpyBoard,
+    "compact": m.Board,
+    "sparse": sb.SparseBoard,
+}
+# Largest board size allowed unless the board engine allows more
+MAX_SIZE = 10
+# Largest board size placed randomly using the placement index, larger boards are
+# sparsely filled so random positions rarely overlap
+INDEX_MAX_SIZE = 32
+# Attempts made to place each ship randomly on boards larger than INDEX_MAX_SIZE
+RANDOM_ATTEMPTS = 10000
+# Seconds between checks for changes to cached files
+FILE_CHECK_INTERVAL = 1.0
+
+# Parsed files cached by path, as (time checked, (mtime, size), contents)
+_file_cache = {}
+
+
+def initialise_board(size: int = 10, engine: str = "list") -> list[list[None]]:
     """Initialises and returns a board of size * size
 
     This function creates a square board with each cell set to None.
     The size of the board is specified by the 'size' argument. If argument is not provided,
     a default size of 10 is used. The function checks if the size is an integer and within
-    the range of 5 to 10, inclusive. If not, it raises an appropriate error.
+    the range of 5 to 10, inclusive (or the max_size of the board engine, if it has one).
+    If not, it raises an appropriate error.
+    If an engine other than "list" is given, an empty board object of that engine
+    is returned instead of a list of lists.
 
 
     Keyword arguments:
     size -- the size of the board (default 10, range: 5-10)
+    engine -- the board engine used to store the board (default "list")
     """
     # Checks if size is an integer and within range
-    if size < 5 or size > 10:
-        raise ValueError("Size must be between 5 and 10")
+    max_size = getattr(ENGINES.get(engine), "max_size", MAX_SIZE)
+    if size < 5 or size > max_size:
+        raise ValueError(f"Size must be between 5 and {max_size}")
     # Checks if size is an integer or None (defaults to 10)
     if not isinstance(size, int) or size is None:
         raise TypeError("Size must be an integer")
+    # Creates an empty board using the chosen engine
+    if engine != "list":
+        if engine not in ENGINES:
+            raise ValueError(f"Invalid engine type: {engine}")
+        return ENGINES[engine](size)
     # Creates a board of size * size
     board = [[None] * size for _ in range(size)]
     return board
 
 
+def _file_path(filename: str) -> str:
+    """Returns the absolute path of a file in the same folder as this module"""
+    # Gets and constructs absolute path of file
+    # This is so that the file can be accessed by any environment
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(script_dir, filename)
+
+
+def _load_cached(file_path: str, parse):
+    """Returns the parsed contents of a file, only reading it again if it has changed
+
+    The modification time and size of the file are checked at most once every
+    FILE_CHECK_INTERVAL seconds, so repeated calls do no filesystem I/O.
+
+    Keyword arguments:
+    file_path -- absolute path of the file
+    parse -- function which is given the opened file and returns its parsed contents
+    """
+    now = time.monotonic()
+    cached = _file_cache.get(file_path)
+    if cached is not None and now - cached[0] < FILE_CHECK_INTERVAL:
+        return cached[2]
+    # Directories are reported the same as missing files
+    if not os.path.isfile(file_path):
+        _file_cache.pop(file_path, None)
+        raise FileNotFoundError(file_path)
+    stat = os.stat(file_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    if cached is not None and cached[1] == version:
+        _file_cache[file_path] = (now, version, cached[2])
+        return cached[2]
+    with open(file_path, "r", encoding="utf-8") as f:
+        contents = parse(f)
+    _file_cache[file_path] = (now, version, contents)
+    return contents
+
+
+def clear_file_cache(filename: Optional[str] = None) -> None:
+    """Clears the cached contents of a file, or every file if no filename is given
+
+    Keyword arguments:
+    filename -- name of the file to clear, as given to create_battleships
+                or place_battleships_custom (default None)
+    """
+    if filename is None:
+        _file_cache.clear()
+    else:
+        _file_cache.pop(_file_path(filename), None)
+
+
+def _parse_fleet(f) -> tuple[tuple[str, int], ...]:
+    """Parses a battleships file into a tuple of (name, length) pairs"""
+    battleships = {}
+    # Reads each line of the file
+    filelines = f.readlines()
+    # Iterates through each line
+    for line in filelines:
+        # Splits and strips lines into ship name and length
+        ship = line.strip().split(":")
+        # Checks if ship is a valid list
+        if len(ship) == 2:
+            # Adds ship to dictionary with name as key and length as value
+            battleships[ship[0]] = int(ship[1])
+        else:
+            raise ValueError("Invalid data format in the file")
+    return tuple(battleships.items())
+
+
+def _parse_placements(f) -> MappingProxyType:
+    """Parses a placement file into a read only dictionary of ship placements"""
+    return MappingProxyType(
+        {ship: tuple(key) for ship, key in json.load(f).items()}
+    )
+
+
+def load_fleet(filename: str = "battleships.txt") -> tuple[tuple[str, int], ...]:
+    """Returns the battleships in a file as a tuple of (name, length) pairs
+
+    The parsed file is cached until the file changes, see create_battleships for the
+    file format.
+
+    Keyword arguments:
+    filename -- name of file containing battleship data (default "battleships.txt")
+    """
+    try:
+        return _load_cached(_file_path(filename), _parse_fleet)
+    # Raises and handles error if file is not found
+    except FileNotFoundError as err:
+        raise FileNotFoundError(f"File '{filename}' not found") from err
+
+
+def load_placements(filename: str = "placement.json") -> MappingProxyType:
+    """Returns the ship placements in a file as a read only dictionary
+
+    Each ship name is mapped to a tuple of (row, col, direction), where direction
+    is "h" or "v". The parsed file is cached until the file changes.
+
+    Keyword arguments:
+    filename -- name of file containing placement data (default "placement.json")
+    """
+    return _load_cached(_file_path(filename), _parse_placements)
+
+
 def create_battleships(filename: str = "battleships.txt") -> dict[str, int]:
     """
     Reads the text file and returns battleships as a dictionary.
@@ -63,43 +220,25 @@ def create_battleships(filename: str = "battleships.txt") -> dict[str, int]:
         Submarine:3
         Destroyer:2
 
+    The file is only read again when it changes, each call returns a new dictionary.
+
     Keyword arguments:
     filename -- name of file containing battleship data (default "battleships.txt")
                 must include file extension within argument.
     """
-    battleships = {}
     # Checks if filename is a string or None (defaults to "battleships.txt")
     if not isinstance(filename, str) or filename is None:
         raise TypeError("Filename must be a string")
-    try:
-        # Gets and constructs absolute path of file
-        # This is so that the file can be accessed by any environment
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join(script_dir, filename)
-        # Opens battleships.txt to read file
-        with open(file_path, "r", encoding="utf-8") as f:
-            # Reads each line of the file
-            filelines = f.readlines()
-            # Iterates through each line
-            for line in filelines:
-                # Splits and strips lines into ship name and length
-                ship = line.strip().split(":")
-                # Checks if ship is a valid list
-                if len(ship) == 2:
-                    # Adds ship to dictionary with name as key and length as value
-                    battleships[ship[0]] = int(ship[1])
-                else:
-                    raise ValueError("Invalid data format in the file")
-    # Raises and handles error if file is not found
-    except FileNotFoundError as err:
-        raise FileNotFoundError(f"File '{filename}' not found") from err
-    return battleships
+    return dict(load_fleet(filename))
 
 
 def is_position_occupied(
     board: list[list], col: int, row: int, direction: int, length: int
 ) -> bool:
     """Checks if ship can fit and returns True or False"""
+    # Board engines check the position themselves
+    if not isinstance(board, list):
+        return board.is_position_occupied(col, row, direction, length)
     check = True
     # Iterates through the length of the ship
     for i in range(int(length)):
@@ -114,25 +253,86 @@ def is_position_occupied(
     return check
 
 
+def place_ship(
+    board: list[list], ship: str, col: int, row: int, direction: int, length: int
+) -> None:
+    """Places a single ship onto the board starting at (col, row)"""
+    # Board engines place the ship themselves
+    if not isinstance(board, list):
+        board.place_ship(ship, col, row, direction, length)
+        return
+    # Places the ship onto the board depending on direction
+    if direction == DOWN:
+        for i in range(int(length)):
+            board[col + i][row] = ship
+    if direction == RIGHT:
+        for i in range(int(length)):
+            board[col][row + i] = ship
+
+
+def occupied_mask(board: list[list]) -> int:
+    """Returns a bitmask of every occupied cell of the board (see 'bitboard')"""
+    # Bitboards already store their occupied cells as a mask
+    if isinstance(board, bb.BitBoard):
+        return board.occupied
+    mask = 0
+    # Sparse boards store the index of each occupied cell
+    if isinstance(board, sb.SparseBoard):
+        for cell in board.occupied_cells():
+            mask |= 1 << cell
+        return mask
+    size = len(board)
+    for col, cells in enumerate(board_to_list(board)):
+        for row, cell in enumerate(cells):
+            if cell is not None:
+                mask |= 1 << (col * size + row)
+    return mask
+
+
+def occupied_cells(board: list[list]) -> list[int]:
+    """Returns the index (col * size + row) of every occupied cell of the board
+
+    Sparse boards list their own cells, so no bitmask of the whole board is built.
+    """
+    if isinstance(board, sb.SparseBoard):
+        return sorted(board.occupied_cells())
+    return list(bb.iter_bits(occupied_mask(board)))
+
+
+def spawn_rngs(seed, count: int) -> list[Random]:
+    """Returns independent random generators derived from a seed
+
+    Each generator is seeded with the seed and its index, which the random module
+    hashes with SHA-512, so the generators give unrelated streams and the same seed
+    always gives the same generators, in any process.
+
+    Keyword arguments:
+    seed -- the seed, an int or a string
+    count -- number of generators
+    """
+    return [Random(f"{seed}/{index}") for index in range(count)]
+
+
 def generate_starting_position(
-    board: list[list[None]], direction: int, length: int
+    board: list[list[None]], direction: int, length: int, rng: Optional[Random] = None
 ) -> list[int, int]:
     """Generated valid starting position depending on size of board and the
-    direction and length of ship"""
+    direction and length of ship, using rng or the random module if None"""
+    pick = randint if rng is None else rng.randint
     # Handles potential randint randrange error
     if len(board) - int(length) - 1 == -1:
         return [0, 0]
     if direction == DOWN:
         # Generates random starting position within the board
         starting_location = [
-            randint(0, len(board) - int(length) - 1),
-            randint(0, len(board) - 1),
+            pick(0, len(board) - int(length) - 1),
+            pick(0, len(board) - 1),
         ]
     if direction == RIGHT:
         # Generates random starting position within the board
         starting_location = [
-            randint(0, len(board) - 1),
-            randint(0, len(board) - int(length) - 1),
+            pick(0, len(board) - 1),
+            pick(0, len(board) - int(length) - 1),
         ]
     return starting_location
 
@@ -144,49 +344,111 @@ def place_battleships_simple(
     count = 0
     # Repeats for each ship in battleships dictionary
     for ship in battleships.keys():
-        # Repeats for each length of the ship
-        for i in range(battleships[ship]):
-            # Places the ship onto the board
-            board[count][i] = ship
+        # Places the ship onto the board
+        place_ship(board, ship, count, 0, RIGHT, battleships[ship])
         count += 1
     return board
 
 
 def place_battleships_random(
-    board: list[list[None]], battleships: dict[str, int]
+    board: list[list[None]], battleships: dict[str, int], rng: Optional[Random] = None
 ) -> list[list]:
-    """Places battleships randomly onto the board"""
-    # Repeats for each ship in battleships dictionary
-    for ship, length in battleships.items():
-        placed = False
-        # Loop to check the ship has a valid placement
-        while not placed:
-            # Generates random direction and starting position
-            direction = randint(0, 1)
-            col, row = generate_starting_position(board, direction, length)
-            placed = is_position_occupied(board, col, row, direction, length)
-
+    """Places battleships randomly onto the board, using rng or the random module"""
+    pick = randint if rng is None else rng.randint
+    # Board engines which can list every legal placement pick from them directly
+    if hasattr(board, "legal_placements"):
+        for ship, length in battleships.items():
+            placements = board.legal_placements(length)
+            if len(placements) == 0:
+                raise ValueError(f"No space left on the board for '{ship}'")
+            col, row, direction = placements[pick(0, len(placements) - 1)]
+            place_ship(board, ship, int(col), int(row), int(direction), length)
+        return board
+
+    # Large boards are mostly empty so random positions are tried until one fits
+    if len(board) > INDEX_MAX_SIZE:
+        for ship, length in battleships.items():
+            for _ in range(RANDOM_ATTEMPTS):
+                direction = pick(0, 1)
+                col, row = generate_starting_position(board, direction, length, rng)
+                if is_position_occupied(board, col, row, direction, length):
+                    break
+            else:
+                raise ValueError(f"No space found on the board for '{ship}'")
+            place_ship(board, ship, col, row, direction, length)
+        return board
+
+    # Samples every ship from the placement index, which never retries a position.
+    # Fleets proved not to fit raise a ValueError, while a search which runs out
+    # of steps without a proof raises a RuntimeError from sample_fleet
+    placements = bb.sample_fleet(
+        len(board), list(battleships.values()), occupied_mask(board), rng
+    )
+    if placements is None:
+        raise ValueError("Battleships cannot all be placed on the board")
+    for ship, length, (_, col, row, direction) in zip(
+        battleships.keys(), battleships.values(), placements
+    ):
         # Places the ship onto the board depending on direction
-        if direction == DOWN:
-            for i in range(int(length)):
-                board[col + i][row] = ship
-        if direction == RIGHT:
-            for i in range(int(length)):
-                board[col][row + i] = ship
+        place_ship(board, ship, col, row, direction, length)
     return board
 
 
+def validate_placements(
+    placements: dict, battleships: dict[str, int], size: int = 10
+) -> dict[str, tuple]:
+    """Checks ship placements fit on a board without overlapping and returns them
+
+    The placements are in the format of placement.json, mapping each ship name to
+    (row, col, direction), where direction is "h" or "v". They are returned with
+    the row and col converted to integers.
+
+    Keyword arguments:
+    placements -- dictionary containing each ship name and its (row, col, direction)
+    battleships -- dictionary containing each ship and its length
+    size -- the size of the board the ships are placed on (default 10)
+    """
+    if not isinstance(placements, dict):
+        raise TypeError("Placements must be a dictionary")
+    # Every ship must be placed exactly once
+    if set(placements) != set(battleships):
+        raise ValueError("Placements must include every ship")
+
+    # Places the ships on a scratch board, which checks they fit and do not overlap
+    board = initialise_board(size, engine="compact")
+    valid = {}
+    for ship, key in placements.items():
+        if not isinstance(key, (list, tuple)) or len(key) != 3:
+            raise ValueError(f"Invalid placement for ship '{ship}'")
+        try:
+            row, col, direction = int(key[0]), int(key[1]), key[2]
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid placement for ship '{ship}'") from None
+        if direction not in ("h", "v"):
+            raise ValueError(f"Invalid placement for ship '{ship}'")
+        step = DOWN if direction == "v" else RIGHT
+        if not board.is_position_occupied(col, row, step, battleships[ship]):
+            raise ValueError(f"Ship '{ship}' does not fit on the board")
+        board.place_ship(ship, col, row, step, battleships[ship])
+        valid[ship] = (row, col, direction)
+    return valid
+
+
 def place_battleships_custom(
-    board: list[list[None]], battleships: dict[str, int]
+    board: list[list[None]],
+    battleships: dict[str, int],
+    placements: Optional[dict] = None,
 ) -> list[list]:
-    """Custom algorithm of battleships using placement.json"""
-    # Gets and constructs absolute path of file
-    # This is so that the file can be accessed by any environment
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(script_dir, "placement.json")
-    # Load ship placement data from placement.json
-    with open(file_path, "r", encoding="utf-8") as placement:
-        ship_data = json.load(placement)
+    """Custom algorithm of battleships using given placements or placement.json
+
+    Keyword arguments:
+    board -- a list of lists containing None, or an empty board engine object
+    battleships -- dictionary containing each ship and its length
+    placements -- dictionary containing each ship name and its (row, col, direction),
+                  read from placement.json if not given (default None)
+    """
+    # Load ship placement data from placement.json if none were given
+    ship_data = load_placements() if placements is None else placements
 
     # Place each ship on the board based on custom placement data
     for ship, key in ship_data.items():
@@ -198,30 +460,37 @@ def place_battleships_custom(
 
         # Places the ship onto the board depending on direction
         if direction == "v":
-            for i in range(length):
-                board[col + i][row] = ship
+            place_ship(board, ship, col, row, DOWN, length)
         if direction == "h":
-            for i in range(length):
-                board[col][row + i] = ship
+            place_ship(board, ship, col, row, RIGHT, length)
 
     return board
 
 
 def place_battleships(
-    board: list[list[None]], ships: dict[str, int], algorithm: str = "simple"
+    board: list[list[None]],
+    ships: dict[str, int],
+    algorithm: str = "simple",
+    placements: Optional[dict] = None,
+    rng: Optional[Random] = None,
 ) -> list[list]:
     """Places battleships onto the board and returns it
 
     Keyword arguments:
-    board -- a list of lists containing None
+    board -- a list of lists containing None, or an empty board engine object
     ships -- a dictionary containing each ship and its length
     algorithm -- determines the algorithm used to place ships (default "simple")
+    placements -- ship placements used by the "custom" algorithm instead of
+                  placement.json (default None)
+    rng -- the random generator used by the "random" algorithm, or None for the
+           random module (default None)
     """
-    # Checks if argument board is a list
-    if not isinstance(board, list) or board is None:
+    # Checks if argument board is a list or a board engine
+    if not isinstance(board, (list, *ENGINES.values())) or board is None:
         raise TypeError("Board must be a list")
-    if len(board) < 5 or len(board) > 10:
-        raise ValueError("Board must be between 5 and 10")
+    max_size = getattr(board, "max_size", MAX_SIZE)
+    if len(board) < 5 or len(board) > max_size:
+        raise ValueError(f"Board must be between 5 and {max_size}")
 
     # Checks if argument ships is a valid dictionary
     if not isinstance(ships, dict) or ships is None:
@@ -242,9 +511,9 @@ def place_battleships(
     if algorithm == "simple" and len(ships) <= len(board):
         return place_battleships_simple(board, ships)
     if algorithm == "random":
-        return place_battleships_random(board, ships)
+        return place_battleships_random(board, ships, rng)
     if algorithm == "custom":
-        return place_battleships_custom(board, ships)
+        return place_battleships_custom(board, ships, placements)
 
     # Raises error if algorithm is invalid
     raise ValueError(f"Invalid algorithm type: {algorithm}")
@@ -257,6 +526,11 @@ def print_player_board(board: list[list]) -> None:
     players -- a dictionary containing player data
     username -- the username of the player
     """
+    # Boards too large to print every cell render only the cells in use
+    if hasattr(board, "render"):
+        print(board.render())
+        return
+    board = board_to_list(board)
     max_length = 0
     # Finds the string length of the longest cell
     for row in board:
@@ -281,13 +555,61 @@ def print_player_board(board: list[list]) -> None:
         print()
 
 
+def board_to_list(board: list[list]) -> list[list]:
+    """Returns the board as a list of lists of ship names, whatever its engine"""
+    if isinstance(board, list):
+        return board
+    return board.to_list()
+
+
+def board_placements(board: list[list]) -> dict[str, list]:
+    """Returns the placement of every ship not yet hit on the board
+
+    The placements are in the format of placement.json, mapping each ship name to
+    [row, col, direction], where direction is "h" or "v".
+
+    Keyword arguments:
+    board -- list of lists containing battleship placements, or a board engine object
+    """
+    cells = {}
+    # Finds the cells of each ship
+    for col, line in enumerate(board_to_list(board)):
+        for row, ship in enumerate(line):
+            if ship is not None:
+                cells.setdefault(ship, []).append((col, row))
+    placements = {}
+    for ship, ship_cells in cells.items():
+        col, row = min(ship_cells)
+        # Ships going down the board cover more than one column
+        direction = "v" if any(cell[0] != col for cell in ship_cells) else "h"
+        placements[ship] = [row, col, direction]
+    return placements
+
+
+def is_board_empty(board: list[list]) -> bool:
+    """Checks if every ship on the board has been hit"""
+    # Board engines track the remaining ships themselves
+    if not isinstance(board, list):
+        return board.is_game_over()
+    return all(all(value is None for value in row) for row in board)
+
+
 def check_game_over(username: str, players: dict) -> bool:
     """Check if the game is over for a specific player.
 
     Keyword arguments:
     username -- username of the player
-    players -- dictionary containing the game data of each player
+    players -- dictionary containing the game data of each player, or a GameState
     """
+    # Game states track the remaining health of every player's ships
+    if isinstance(players, m.GameState):
+        return players.is_game_over(username)
+    # Fleets track the remaining health of every ship
+    if isinstance(players[username].get("battleships"), fl.Fleet):
+        return players[username]["battleships"].is_game_over()
+    # Board engines track the remaining ships themselves
+    if not isinstance(players[username]["board"], list):
+        return is_board_empty(players[username]["board"])
     # Assume game is over
     game_over = True
     # Iterate over each row in player board
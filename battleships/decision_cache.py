@@ -0,0 +1,239 @@
+"""
+This module contains the cache of BOT decisions for the Battleships game.
+
+Strong BOTs, like the Monte Carlo BOT, take many milliseconds to analyse a position,
+although openings and many patterns of hits and misses come up again across games.
+A position is described by the cells known to be empty (misses and sunk ships), the
+hits on ships which have not been sunk and the lengths of the ships not yet sunk, so
+a BOT can look up its decision for a position seen in any earlier game.
+
+Positions are made canonical before they are cached: the board is rotated and
+reflected in each of its 8 symmetries and the smallest encoding is kept, so a
+position and its mirror images share one entry.
+
+The 'canonical_position' function returns the canonical key of a position and the
+symmetry mapping it to the key.
+The 'DecisionCache' class is a bounded LRU or LFU cache of the cells chosen in each
+canonical position, with hit-rate statistics. The 'cache' instance is shared by the
+BOTs of every game in the process.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import bitboard as bb
+
+
+# Default memory cap of the shared cache, in bytes
+MAX_BYTES = 16 * 1024 * 1024
+# Estimated bytes used by the dictionaries for each entry, besides its key and value
+ENTRY_OVERHEAD = 200
+# Eviction policies of the cache
+POLICIES = ("lru", "lfu")
+
+
+@lru_cache(maxsize=None)
+def symmetries(size: int) -> tuple[tuple[tuple[int, ...], tuple[int, ...]], ...]:
+    """Returns each symmetry of the board as the bit of every cell and its inverse
+
+    The first symmetry is the identity. Each symmetry is a pair of tuples, where the
+    first gives the bit each cell (col * size + row) is moved to and the second gives
+    the cell each cell is moved from.
+
+    Keyword arguments:
+    size -- the size of the board
+    """
+    last = size - 1
+    transforms = []
+    for transpose in (False, True):
+        for flip_col in (False, True):
+            for flip_row in (False, True):
+                bits = []
+                inverse = [0] * (size * size)
+                for cell in range(size * size):
+                    col, row = divmod(cell, size)
+                    if transpose:
+                        col, row = row, col
+                    if flip_col:
+                        col = last - col
+                    if flip_row:
+                        row = last - row
+                    bits.append(1 << (col * size + row))
+                    inverse[col * size + row] = cell
+                transforms.append((tuple(bits), tuple(inverse)))
+    return tuple(transforms)
+
+
+def _transform(mask: int, bits: tuple[int, ...]) -> int:
+    """Returns a mask of cells moved by a symmetry"""
+    moved = 0
+    for cell in bb.iter_bits(mask):
+        moved |= bits[cell]
+    return moved
+
+
+def canonical_position(
+    size: int, blocked: int, hits: int, remaining: list
+) -> tuple[tuple, int]:
+    """Returns the canonical key of a position and the index of its symmetry
+
+    Keyword arguments:
+    size -- the size of the board
+    blocked -- mask of the cells no ship can cover: misses and sunk ships
+    hits -- mask of the hits on ships which have not been sunk
+    remaining -- the length of each ship not yet sunk
+    """
+    best = None
+    index = 0
+    for i, (bits, _) in enumerate(symmetries(size)):
+        encoding = (_transform(blocked, bits), _transform(hits, bits))
+        if best is None or encoding < best:
+            best = encoding
+            index = i
+    return (size, tuple(sorted(remaining)), *best), index
+
+
+def to_canonical(size: int, cell: int, index: int) -> int:
+    """Returns the cell a cell is moved to by a symmetry"""
+    return symmetries(size)[index][0][cell].bit_length() - 1
+
+
+def from_canonical(size: int, cell: int, index: int) -> int:
+    """Returns the cell moved to a cell by a symmetry"""
+    return symmetries(size)[index][1][cell]
+
+
+def _entry_size(key: tuple, value) -> int:
+    """Returns the estimated bytes used by an entry of the cache"""
+    return (
+        ENTRY_OVERHEAD
+        + sys.getsizeof(key)
+        + sum(sys.getsizeof(item) for item in key)
+        + sys.getsizeof(value)
+    )
+
+
+class DecisionCache:
+    """A bounded cache of the decision made in each canonical position
+
+    Entries are evicted once their estimated size exceeds max_bytes: the least
+    recently used entry with the "lru" policy, or the least frequently used entry
+    with the "lfu" policy, breaking ties by the least recently used. Entries are
+    kept in buckets by their number of uses, so every operation takes constant time.
+
+    Attributes:
+    max_bytes -- the largest estimated size of the entries, in bytes
+    policy -- the eviction policy, "lru" or "lfu"
+    size -- the estimated size of the entries, in bytes
+    hits -- number of lookups which found an entry
+    misses -- number of lookups which found no entry
+    evictions -- number of entries evicted to stay within max_bytes
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES, policy: str = "lru") -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Invalid cache policy: {policy}")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Each key's value, use count and estimated size
+        self._entries = {}
+        # Keys of each use count, from the least to the most recently used
+        self._buckets = {}
+        self._min_uses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups which found an entry"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _touch(self, key: tuple, entry: list) -> None:
+        """Records a use of an entry, moving it to the end of its bucket"""
+        bucket = self._buckets[entry[1]]
+        # Only the LFU policy counts uses, so LRU entries stay in one bucket
+        if self.policy == "lfu":
+            del bucket[key]
+            if not bucket:
+                del self._buckets[entry[1]]
+                if self._min_uses == entry[1]:
+                    self._min_uses += 1
+            entry[1] += 1
+            self._buckets.setdefault(entry[1], OrderedDict())[key] = None
+        else:
+            bucket.move_to_end(key)
+
+    def get(self, key: tuple):
+        """Returns the value cached for a key, or None if there is none"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touch(key, entry)
+            return entry[0]
+
+    def put(self, key: tuple, value) -> None:
+        """Caches a value for a key, evicting entries to stay within max_bytes"""
+        size = _entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[0] = value
+                self._touch(key, entry)
+                return
+            while self.size + size > self.max_bytes:
+                self._evict()
+            self._entries[key] = [value, 1, size]
+            self._buckets.setdefault(1, OrderedDict())[key] = None
+            self._min_uses = 1
+            self.size += size
+
+    def _evict(self) -> None:
+        """Removes the least recently or least frequently used entry"""
+        bucket = self._buckets[self._min_uses]
+        key, _ = bucket.popitem(last=False)
+        if not bucket:
+            del self._buckets[self._min_uses]
+            # Finds the next smallest use count, which only happens under LFU
+            self._min_uses = min(self._buckets, default=0)
+        self.size -= self._entries.pop(key)[2]
+        self.evictions += 1
+
+    def clear(self) -> None:
+        """Removes every entry and resets the statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._min_uses = 0
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        """Returns the statistics of the cache as a dictionary"""
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+        }
+
+
+# The cache shared by the BOTs of every game
+cache = DecisionCache()
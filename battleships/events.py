@@ -0,0 +1,94 @@
+"""
+This module contains the in-process publish/subscribe of game events for the
+Battleships server.
+
+Each turn of a game publishes events such as a player shot, a BOT shot, a hit, a sunk
+ship and game over. Any number of subscribers, like the player's own browser or
+spectators, can follow the events of a game. Each subscriber has a bounded queue,
+and once it is full the oldest event is dropped, so a slow client can never make
+the server hold an unbounded number of events.
+
+The 'format_event' function formats an event as a server-sent event (SSE) message.
+"""
+
+import json
+import threading
+from collections import deque
+from typing import Optional
+
+
+class Subscription:
+    """A bounded queue of the events of one game for one subscriber
+
+    Attributes:
+    game_id -- the ID of the game being followed
+    dropped -- number of events dropped because the queue was full
+    """
+
+    def __init__(self, game_id: str, queue_size: int) -> None:
+        self.game_id = game_id
+        self.dropped = 0
+        self._events = deque(maxlen=queue_size)
+        self._ready = threading.Condition()
+
+    def put(self, event: dict) -> None:
+        """Adds an event to the queue, dropping the oldest event if it is full"""
+        with self._ready:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._ready.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Returns the next event, or None if there is none within the timeout"""
+        with self._ready:
+            if not self._events:
+                self._ready.wait(timeout)
+            if not self._events:
+                return None
+            return self._events.popleft()
+
+
+class EventBus:
+    """Publishes the events of each game to its subscribers
+
+    Attributes:
+    queue_size -- the largest number of events queued for each subscriber
+    """
+
+    def __init__(self, queue_size: int = 100) -> None:
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, game_id: str) -> Subscription:
+        """Returns a new subscription to the events of a game"""
+        subscription = Subscription(game_id, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(game_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stops a subscription from receiving any more events"""
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.game_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.game_id]
+
+    def subscribers(self, game_id: str) -> int:
+        """Returns the number of subscribers following a game"""
+        return len(self._subscribers.get(game_id, ()))
+
+    def publish(self, game_id: str, event: dict) -> None:
+        """Sends an event to every subscriber of a game"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(game_id, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+
+def format_event(event: dict) -> str:
+    """Returns an event formatted as a server-sent event message"""
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
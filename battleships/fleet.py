@@ -0,0 +1,71 @@
+"""
+This module contains the fleet game state for the Battleships game.
+
+A 'Fleet' keeps the remaining health of each ship as an integer along with the total
+health remaining across the whole fleet. Both are updated by 'game_engine.attack'
+each time a ship is hit, so checking if a ship is sunk, fetching the status of the
+fleet or checking if the game is over never needs to scan the board.
+
+A 'Fleet' can be passed to 'attack' and stored in the players dictionary in place of
+the battleships dictionary returned by 'components.create_battleships'.
+"""
+
+
+class Fleet:
+    """Remaining health of each ship in a fleet
+
+    Attributes:
+    lengths -- dictionary containing each ship name and its length
+    health -- dictionary containing each ship name and its remaining health
+    remaining -- total health remaining across every ship
+    sunk -- number of ships which have been sunk
+    """
+
+    __slots__ = ("lengths", "health", "remaining", "sunk")
+
+    def __init__(self, battleships: dict[str, int]) -> None:
+        self.lengths = {ship: int(length) for ship, length in battleships.items()}
+        self.health = dict(self.lengths)
+        self.remaining = sum(self.health.values())
+        self.sunk = 0
+
+    def __getitem__(self, ship: str) -> int:
+        return self.health[ship]
+
+    def __contains__(self, ship: str) -> bool:
+        return ship in self.health
+
+    def __len__(self) -> int:
+        return len(self.health)
+
+    def keys(self):
+        """Returns the names of every ship in the fleet"""
+        return self.health.keys()
+
+    def items(self):
+        """Returns the name and remaining health of every ship in the fleet"""
+        return self.health.items()
+
+    def hit(self, ship: str) -> bool:
+        """Decrements the health of a ship by 1 and returns True if it is sunk"""
+        # Ignores hits on ships which are already sunk
+        if self.health[ship] <= 0:
+            return True
+        self.health[ship] -= 1
+        self.remaining -= 1
+        if self.health[ship] == 0:
+            self.sunk += 1
+            return True
+        return False
+
+    def is_sunk(self, ship: str) -> bool:
+        """Checks if every cell of a ship has been hit"""
+        return self.health[ship] == 0
+
+    def is_game_over(self) -> bool:
+        """Checks if every ship in the fleet has been sunk"""
+        return self.remaining == 0
+
+    def status(self) -> dict[str, int]:
+        """Returns a dictionary containing each ship name and its remaining health"""
+        return dict(self.health)
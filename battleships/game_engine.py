@@ -7,15 +7,36 @@ if a ship has been sunk, and if all ships have been sunk therefore game over.
 
 The main functions in this module are as follows:
 
-The 'attack' function checks if a ship has been hit and updates the battleships dictionary.
+The 'attack' function checks if a ship has been hit and updates the battleships dictionary,
+or the 'Fleet' game state which tracks the remaining health of each ship.
 The 'cli_coordinates_input' function requests user input and formats into a tuple,
 which is then used by the 'attack' function.
-The 'simple_game_loop' function is a manual testing game loop for the game logic.
+The 'simple_game_loop' function is a manual testing game loop for the game logic,
+played as the steps of a 'mp_game_engine.Game'.
 
 This module is used by the main server module to handle the game logic.
 """
 
 import components as c
+import fleet as fl
+import models as m
+
+
+def record_hit(battleships: dict[str, int], ship: str) -> None:
+    """Decrements the health of a hit ship by 1
+
+    Keyword arguments:
+    battleships -- dictionary containing battleship name and length, or a Fleet
+    ship -- name of the ship which was hit
+    """
+    # Compact boards already updated the health of their own ships
+    if isinstance(battleships, m.Board):
+        return
+    # Fleets also keep their total remaining health up to date
+    if isinstance(battleships, fl.Fleet):
+        battleships.hit(ship)
+    else:
+        battleships[ship] = int(battleships[ship]) - 1
 
 
 def attack(coordinates: tuple, board: list, battleships: dict[str, int]) -> bool:
@@ -23,13 +44,21 @@ def attack(coordinates: tuple, board: list, battleships: dict[str, int]) -> bool
 
     Keyword arguments:
     coordinates -- a tuple containing coordinate values
-    board -- list of lists containing battleship placements
-    battlships -- dictionary containing battleship name and length
+    board -- list of lists containing battleship placements, or a board engine object
+    battlships -- dictionary containing battleship name and length, or a Fleet
     """
     # Checks if coordinates are within range of board
     if max(coordinates) < len(board):
         # Splits coordinates into col and row from tuple
         col, row = coordinates
+        # Board engines record the shot and return the ship hit
+        if not isinstance(board, list):
+            ship = board.attack(col, row)
+            if ship is None:
+                return False
+            # Decrements length of hit ship by 1
+            record_hit(battleships, ship)
+            return True
         # Checks if cell is not empty
         if board[col][row] is not None:
             # Stores ship name in variable
@@ -37,7 +66,7 @@ def attack(coordinates: tuple, board: list, battleships: dict[str, int]) -> bool
             # Sets cell to None
             board[col][row] = None
             # Decrements length of hit ship by 1
-            battleships[ship] = str(int(battleships[ship]) - 1)
+            record_hit(battleships, ship)
             return True
         # If cell is empty
         return False
@@ -65,42 +94,34 @@ def cli_coordinates_input() -> tuple:
 
 def simple_game_loop() -> None:
     """Manual testing game loop"""
+    # Imported here as the multiplayer game logic is built on this module
+    import mp_game_engine as mge
+
     # Prints welcome message
     print("|" + "-" * 100 + "|")
     print("Welcome to Battleships! (SINGLEPLAYER))")
     print("|" + "-" * 100 + "|")
 
-    # Initialises the board and battleships
-    board = c.initialise_board()
-    battleships = c.create_battleships()
-
-    # Places battleships on the board
-    board = c.place_battleships(
-        board,
-        battleships,
-        algorithm="custom",
-    )
+    # Initialises the board and places the battleships on it, without a BOT
+    # attacking back
+    game = mge.create_game(engine="list", bot_algorithm="custom", bot_replies=False)
 
     # Game loop
-    game_over = False
-    while game_over is False:
-        while True:
-            # Gets coordinates from user
-            coordinates = cli_coordinates_input()
-            # Checks if coordinates are within range of board
-            if max(coordinates) < len(board):
-                break
-            print("Coordinates out of range!")
-
-        # Checks if attack was successful and prints result
-        if attack(coordinates, board, battleships) is True:
+    while not game.finished:
+        # Gets coordinates from user and plays the attack
+        events = game.step(cli_coordinates_input())
+        # Asks again for moves which could not be played
+        if events[0]["type"] == "error":
+            print(events[0]["message"])
+            continue
+
+        # Prints the result of the attack
+        if events[0]["hit"] is True:
             print("HIT!")
         else:
             print("MISS!")
         # Prints out players resulting board
-        c.print_player_board(board)
-        # Checks if the board is empty (all values are None)
-        game_over = all(all(value is None for value in row) for row in board)
+        c.print_player_board(game.state.board("BOT"))
     print("GAME OVER!")
 
 
@@ -0,0 +1,257 @@
+"""
+This module contains the game store for the Battleships server.
+
+The 'GameStore' class holds every live game in the server, keyed by a random game ID
+which is given to the player's browser. Each request looks up the caller's game by its
+ID, so the cost of a request does not depend on how many games are live. Once the
+store is full, the game which was used least recently is removed to make room.
+
+A persistence backend (see 'persistence') can be given to the store, in which case a
+game is saved once the player has placed their ships, along with each move after, and
+a game which is not in the store, for example after the server restarts, is restored
+from the backend when it is next used. Games are deleted from the backend once they
+are over, so only games still being played are kept.
+Game IDs which are found in neither are remembered, so unknown or stale cookies are
+answered without asking the backend again.
+
+This module is used by the main server module so that many players can each play
+their own game at the same time.
+"""
+
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import bots as bt
+import components as c
+import models as m
+import mp_game_engine as mge
+import persistence as ps
+
+
+class GameStore:
+    """Every live game in the server, keyed by game ID
+
+    Attributes:
+    size -- the size of the boards of each new game
+    engine -- the board engine used for each new game (see components.ENGINES)
+    max_games -- the largest number of games kept before the oldest are removed
+    persistence -- the backend games are saved to and restored from
+    bot -- the strategy or difficulty of the BOT of each new game (see bots.BOTS and
+           bots.DIFFICULTIES)
+    """
+
+    def __init__(
+        self,
+        size: int = 10,
+        engine: str = "list",
+        max_games: int = 10000,
+        persistence: Optional[ps.Persistence] = None,
+        bot: str = "random",
+    ) -> None:
+        if bot not in bt.BOTS and bot not in bt.DIFFICULTIES:
+            raise ValueError(f"Invalid BOT strategy: {bot}")
+        self.size = size
+        self.engine = engine
+        self.max_games = max_games
+        self.bot = bot
+        self.persistence = ps.Persistence() if persistence is None else persistence
+        self._games = OrderedDict()
+        # The battleships of new games not saved yet, as no ships have been placed
+        self._unsaved = {}
+        # Recently looked up game IDs which no backend had, least recently used first
+        self._missing = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self._games
+
+    def new_game(self) -> tuple[str, m.GameState]:
+        """Creates a new game and returns its ID and game state
+
+        The player's board is left empty so they can place their own battleships,
+        and the BOT's battleships are placed randomly.
+        """
+        battleships = c.create_battleships()
+        player_board = c.initialise_board(size=self.size, engine=self.engine)
+        bot_board = c.place_battleships(
+            c.initialise_board(size=self.size, engine=self.engine),
+            battleships,
+            algorithm="random",
+        )
+        game = m.GameState(self.size)
+        game.add_player("player", player_board, battleships)
+        game.add_player("BOT", bot_board, battleships)
+        game.mark_placed("BOT")
+        game.bot = bt.create_bot(self.bot, self.size, battleships)
+
+        game_id = secrets.token_urlsafe(16)
+        # The game is only saved once the player places their ships (see save_board)
+        with self._lock:
+            self._unsaved[game_id] = battleships
+        self._add(game_id, game)
+        return game_id, game
+
+    def _add(self, game_id: str, game: m.GameState) -> m.GameState:
+        """Adds a game to the store, removing the least recently used once full
+
+        If the game ID is already in the store, for example as another request
+        restored the same game first, that game is kept and returned instead, so
+        every request plays on the same game state.
+        """
+        with self._lock:
+            game = self._games.setdefault(game_id, game)
+            self._games.move_to_end(game_id)
+            self._missing.pop(game_id, None)
+            # Removed games are still kept by the persistence backend once saved
+            while len(self._games) > self.max_games:
+                removed_id, _ = self._games.popitem(last=False)
+                self._unsaved.pop(removed_id, None)
+        return game
+
+    def get(self, game_id: Optional[str]) -> Optional[m.GameState]:
+        """Returns the game state of a game or None if there is no such game
+
+        Games which are not in the store are restored from the persistence backend,
+        unless the game ID was recently found to have no saved game.
+        """
+        if game_id is None:
+            return None
+        with self._lock:
+            game = self._games.get(game_id)
+            if game is not None:
+                self._games.move_to_end(game_id)
+                return game
+            if game_id in self._missing:
+                self._missing.move_to_end(game_id)
+                return None
+        game = self._restore(game_id)
+        if game is not None:
+            return self._add(game_id, game)
+        with self._lock:
+            self._missing[game_id] = None
+            while len(self._missing) > self.max_games:
+                self._missing.popitem(last=False)
+        return None
+
+    def _restore(self, game_id: str) -> Optional[m.GameState]:
+        """Rebuilds a game saved by the persistence backend, or returns None"""
+        saved = self.persistence.load_game(game_id)
+        if saved is None:
+            return None
+        battleships = saved["battleships"]
+        game = m.GameState(saved["size"])
+        for username in ("player", "BOT"):
+            board = c.initialise_board(size=saved["size"], engine=saved["engine"])
+            placements = saved["boards"].get(username, {})
+            # Places the ships of the board again from their saved placements
+            for ship, (row, col, direction) in placements.items():
+                c.place_ship(
+                    board,
+                    ship,
+                    int(col),
+                    int(row),
+                    c.DOWN if direction == "v" else c.RIGHT,
+                    battleships[ship],
+                )
+            game.add_player(username, board, battleships)
+            if placements:
+                game.mark_placed(username)
+        game.bot = bt.create_bot(self.bot, saved["size"], battleships)
+        # Replays every move in the order it was made, which also rebuilds the BOT
+        for username, col, row in saved["moves"]:
+            game.shots_by(username).add((col, row))
+            mge.resolve_shot(game, username, (col, row))
+        return game
+
+    def place_ships(self, game_id: str, username: str, placements: dict) -> None:
+        """Places a player's ships on a new board of the game and saves them
+
+        The placements are checked first, and a ValueError is raised if they are
+        invalid or the game has already started.
+
+        Keyword arguments:
+        game_id -- the ID of the game
+        username -- the username of the player
+        placements -- dictionary containing each ship name and its (row, col, direction)
+        """
+        game = self.get(game_id)
+        if game is None:
+            raise ValueError(f"Game '{game_id}' not found")
+        battleships = c.create_battleships()
+        placements = c.validate_placements(placements, battleships, self.size)
+        board = c.place_battleships(
+            c.initialise_board(size=self.size, engine=self.engine),
+            battleships,
+            algorithm="custom",
+            placements=placements,
+        )
+        # Holds the game's lock so no turn is played while the board is replaced
+        with game.lock:
+            if any(len(shots) for shots in game.shots):
+                raise ValueError("Ships cannot be moved once the game has started")
+            game.set_board(username, board, battleships)
+        self.save_board(game_id, username)
+
+    def place_default_ships(self, game_id: str, username: str) -> None:
+        """Places a player's ships from placement.json, unless they are already placed
+
+        Whether the ships are placed is tracked by the game, so a refresh once the
+        fleet has been sunk keeps the board instead of placing the ships again.
+        """
+        game = self.get(game_id)
+        if game is None:
+            raise ValueError(f"Game '{game_id}' not found")
+        with game.lock:
+            if game.is_placed(username):
+                return
+            battleships = c.create_battleships()
+            c.place_battleships(game.board(username), battleships, algorithm="custom")
+            game.mark_placed(username)
+        self.save_board(game_id, username)
+
+    def save_board(self, game_id: str, username: str) -> None:
+        """Saves the placement of the ships on a player's board once they are placed
+
+        The first board saved also saves the game and the BOT's board, so games
+        which are left before any ships are placed never reach the backend.
+        """
+        game = self.get(game_id)
+        if game is None:
+            return
+        game.mark_placed(username)
+        with self._lock:
+            battleships = self._unsaved.pop(game_id, None)
+        if battleships is not None:
+            self.persistence.save_game(game_id, self.size, self.engine, battleships)
+            self.persistence.save_board(
+                game_id, "BOT", c.board_placements(game.board("BOT"))
+            )
+        placements = c.board_placements(game.board(username))
+        self.persistence.save_board(game_id, username, placements)
+
+    def record_event(self, game_id: str, event: dict) -> None:
+        """Records the move of a shot event (see 'mp_game_engine.play_turn')
+
+        Only the moves are recorded, the other events are found again when the
+        moves are replayed. Once the game is over it is deleted from the backend,
+        but is kept in the store until it is removed to make room.
+        """
+        if event["type"] == "player_shot":
+            self.persistence.record_move(game_id, "player", event["coordinates"])
+        elif event["type"] == "bot_shot":
+            self.persistence.record_move(game_id, "BOT", event["coordinates"])
+        elif event["type"] == "game_over":
+            self.persistence.delete_game(game_id)
+
+    def remove(self, game_id: str) -> None:
+        """Removes a game from the store and the persistence backend"""
+        with self._lock:
+            self._games.pop(game_id, None)
+            self._unsaved.pop(game_id, None)
+            self._missing[game_id] = None
+        self.persistence.delete_game(game_id)
@@ -12,20 +12,89 @@ the board and ship placement.
 The placement of ships is handled on the '/placement' route.
 The main game is handled on the '/' route.
 The processing of attacks is handled on the '/attack' route.
+Several attacks can be processed in one request on the '/attack/batch' route.
+The state of both boards is returned as bitmasks on the '/state' route, or as lists of
+cells on boards too large for bitmasks.
+The events of a game are streamed as server-sent events on the '/events' route.
+Latency and request metrics are returned on the '/metrics' route, when the
+BATTLESHIPS_METRICS environment variable is set to 1.
+
+Each player has their own game, held in the 'game_store' module and found using the
+game ID stored in a cookie when the player starts a game on '/placement'. Games are
+saved to the SQLite database named by the BATTLESHIPS_DATABASE environment variable,
+if it is set, so they can be restored after the server restarts.
 """
 
+import atexit
 import os
-import json
-from flask import Flask, render_template, jsonify, request
+import time
 
+from flask import Flask, Response, render_template, jsonify, request, make_response, g
+
+import bots as bt
 import components as c
-import game_engine as ge
+import decision_cache as dc
+import events as ev
+import game_store as gs
+import metrics as mt
 import mp_game_engine as mge
+import persistence as ps
 
 # Initialise the Flask object
 app = Flask(__name__)
 
 
+@app.before_request
+def start_request_timer():
+    """Records the start time of each request when metrics are enabled"""
+    if mt.registry.enabled:
+        g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Records the latency and status of each request when metrics are enabled"""
+    if mt.registry.enabled and "request_start" in g:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        mt.registry.observe(
+            "battleships_request_seconds",
+            (("route", route),),
+            time.perf_counter() - g.request_start,
+        )
+        mt.registry.increment(
+            "battleships_requests_total",
+            (("route", route), ("status", response.status_code)),
+        )
+    return response
+
+
+def current_game():
+    """Returns the ID and game state of the caller's game, or None if they have none"""
+    game_id = request.cookies.get(GAME_COOKIE)
+    return game_id, games.get(game_id)
+
+
+def publisher(game_id: str):
+    """Returns a function publishing an event to everyone following a game
+
+    The shots of each event are also recorded in the game store, so the game can
+    be restored after the server restarts.
+    """
+
+    def publish(event: dict) -> None:
+        games.record_event(game_id, event)
+        events.publish(game_id, event)
+
+    return publish
+
+
+def with_game_cookie(response, game_id: str):
+    """Sets the game ID cookie on a response so later requests find the same game"""
+    response = make_response(response)
+    response.set_cookie(GAME_COOKIE, game_id, httponly=True, samesite="Lax")
+    return response
+
+
 @app.route("/placement", methods=["GET", "POST"])
 def placement_interface():
     """
@@ -33,32 +102,37 @@ def placement_interface():
 
     This function serves a dual purpose depending on the HTTP method used.
 
-    If a GET request is made, it returns a rendered template of the game board
-    and the player can place their battleships onto the board.
+    If a GET request is made, it starts a new game for the player and returns a
+    rendered template of the game board where they can place their battleships.
 
     If a POST request is made, it receives the ship placement data from the
-    webpage and writes the ship placement data to a JSON file.
+    webpage, checks it and places the ships on the board of the player's game.
     """
 
     if request.method == "GET":
+        # Starts a new game for the player
+        game_id, _ = games.new_game()
         # Shows the placement.html template where the player can place battleships
-        return render_template(
-            "placement.html", ships=player_battleships, board_size=BOARD_SIZE
+        return with_game_cookie(
+            render_template(
+                "placement.html", ships=c.create_battleships(), board_size=BOARD_SIZE
+            ),
+            game_id,
         )
 
     if request.method == "POST":
+        game_id, game = current_game()
+        if game is None:
+            game_id, game = games.new_game()
         # Requests ship placement data from webpage
-        data = request.get_json()
-        # Gets and constructs absolute path of file
-        # This is so that the file can be accessed by any environment
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join(script_dir, "placement.json")
-        # Opens placement.json to write to file
-        with open(file_path, "w", encoding="utf-8") as json_file:
-            # Writes placement data to file
-            json.dump(data, json_file, indent=4)
+        data = request.get_json(silent=True)
+        try:
+            # Places the ships on the player's board, held in their game
+            games.place_ships(game_id, "player", data)
+        except (TypeError, ValueError) as err:
+            return jsonify({"Success": False, "Error": str(err)}), 400
         # Returns success message
-        return jsonify({"Success": True})
+        return with_game_cookie(jsonify({"Success": True}), game_id)
 
     return None
 
@@ -69,27 +143,28 @@ def root():
     Handles the root route of the application. During normal gameplay,
     this route is only called once
 
-    This function is called after the player has places their battleships and sends
-    a GET request to the "/" route. It places battleships on the player's board
-    according to their choice on /placement. This is done by reading the ship placement
-    data from the placement.json file through the place_battleships function.
-    The player's board data is then passed to the main.html template.
+    This function is called after the player has placed their battleships on
+    /placement and sends a GET request to the "/" route. If the player has not placed
+    their battleships, they are placed using the default placements in the
+    placement.json file. The player's board data is then passed to the main.html
+    template. If the player has no game, a new one is started.
     """
 
-    # Declaring global variable
-    global player_board
-
+    game_id, game = current_game()
+    if game is None:
+        game_id, game = games.new_game()
+    # Ships are only placed once, refreshing the page keeps the current board
     if request.method == "GET":
-        # Places battleships on players board according to their choice on /placement
+        # Places battleships on players board using the default placements
         # This is done by reading the ship placements from the placement.json file
-        player_board = c.place_battleships(
-            player_board, player_battleships, algorithm="custom"
-        )
-        # Updates player data dictionary with board with battleships placed
-        players["player"]["board"] = player_board
+        games.place_default_ships(game_id, "player")
+    player_board = game.board("player")
 
     # Returns the main.html template with the player's board data
-    return render_template("main.html", player_board=player_board)
+    return with_game_cookie(
+        render_template("main.html", player_board=c.board_to_list(player_board)),
+        game_id,
+    )
 
 
 @app.route("/attack", methods=["GET"])
@@ -105,122 +180,182 @@ def process_attack():
     therefore preventing further attacks.
     """
 
+    game_id, game = current_game()
+    if game is None:
+        return "No Game Found"
+
     if request.args:
         try:
-            # Checks if game is over
-            player_list = ["player", "BOT"]
-            for username in player_list:
-                game_over = False
-                game_over = c.check_game_over(username, players)
-                if game_over is True:
-                    winner = "BOT" if username == "player" else "PLAYER"
-                    break
-
-            # Attack phase
-            if game_over is not True:
-                # Player attack on BOT's board
-                # Requests attack coordinates from request arguments
-                # Loops until bot move is unique
-                row = request.args.get("x")
-                col = request.args.get("y")
-                player_attack = (int(col), int(row))
-                # Checks if attack has already been played
-                if player_attack in player_already_attacked:
-                    # If attack has already been played, stops function here
-                    return "Already Attacked"
-                # Adds player attack to list to prevent repeat attacks on same coordinates
-                player_already_attacked.append(player_attack)
-                # Performs attack on bot board and returns hit or miss as True or False
-                outcome = ge.attack(
-                    player_attack,
-                    players["BOT"]["board"],
-                    players["BOT"]["battleships"],
-                )
-
-                # BOT attack on Player's board
-                # Loops until bot move is unique
-                while True:
-                    bot_attack = mge.generate_attack(BOARD_SIZE)
-                    # Checks if attack has already been played
-                    if bot_attack not in bot_already_attacked:
-                        break
-                # Adds bot attack to list for comparison
-                bot_already_attacked.append(bot_attack)
-                # Performs attack on player board
-                ge.attack(
-                    bot_attack,
-                    players["player"]["board"],
-                    players["player"]["battleships"],
-                )
-
-            # Checks if game is over
-            player_list = ["player", "BOT"]
-            for username in player_list:
-                game_over = False
-                game_over = c.check_game_over(username, players)
-                if game_over is True:
-                    winner = "BOT" if username == "player" else "PLAYER"
-                    break
-
-            # If game over send game over message
-            if game_over is True:
-                if winner == "BOT":
-                    # If BOT wins send only BOT coordinates
-                    return jsonify(
-                        {
-                            "hit": False,
-                            "AI_Turn": bot_attack,
-                            "finished": (f"GAME OVER {winner} WINS!"),
-                        }
-                    )
-
-                # If player wins send only player coordinates
-                return jsonify(
-                    {
-                        "hit": True,
-                        "Player_Turn": (row, col),
-                        "finished": (f"GAME OVER {winner} WINS!"),
-                    }
-                )
-            # If game not over send both player coordinates
-            return jsonify(
-                {"hit": outcome, "Player_Turn": player_attack, "AI_Turn": bot_attack}
-            )
-
-        # If game over send game over message and prevent further attacks
-        except UnboundLocalError:
-            return "Game Over"
+            # Requests attack coordinates from request arguments
+            row = request.args.get("x")
+            col = request.args.get("y")
+            player_attack = (int(col), int(row))
+        except (TypeError, ValueError):
+            return "Invalid Coordinates"
+        # Plays the turns of both the player and the BOT, giving the BOT a share of
+        # the move budget depending on the server's load. The game's lock stops two
+        # requests, such as a double click, playing turns of the game at once
+        with game.lock, bot_budget.reserve() as budget:
+            outcome = mge.play_turn(game, player_attack, publisher(game_id), budget)
+        # Messages are sent when the attack could not be played
+        if isinstance(outcome, str):
+            return outcome
+        return jsonify(outcome)
 
     return "Unknown Error"
 
 
+@app.route("/attack/batch", methods=["POST"])
+def process_attack_batch():
+    """
+    Processes a list of attacks in one request, for scripted and bot clients.
+
+    The request body is JSON of the form {"shots": [[x, y], ...]}, using the same
+    x and y as the "/attack" route. A turn of both the player and the BOT is played
+    for each shot in order, stopping once the game is over, and the outcomes of
+    every turn are returned together. A batch can hold at most one shot for each
+    cell of the board.
+    """
+
+    game_id, game = current_game()
+    if game is None:
+        return "No Game Found"
+
+    data = request.get_json(silent=True)
+    try:
+        shots = data["shots"]
+        # No game lasts longer than a shot at every cell of the board
+        if len(shots) > game.size * game.size:
+            return "Too Many Shots"
+        # Converts each shot into the coordinates used by the game
+        player_attacks = [(int(y), int(x)) for x, y in shots]
+    except (KeyError, TypeError, ValueError):
+        return "Invalid Coordinates"
+    with game.lock, bot_budget.reserve() as budget:
+        outcome = mge.play_turns(game, player_attacks, publisher(game_id), budget)
+    return jsonify(outcome)
+
+
+@app.route("/state", methods=["GET"])
+def game_state():
+    """
+    Returns the state of both boards of the caller's game as bitmasks, or as lists
+    of cells on large boards.
+
+    The response includes a version number. If it is given back in the "since"
+    argument, only the shots made after that version are returned, so reconnecting
+    clients and monitoring tools can catch up without fetching the whole page.
+    """
+
+    _, game = current_game()
+    if game is None:
+        return "No Game Found"
+
+    try:
+        since = int(request.args["since"]) if "since" in request.args else None
+    except ValueError:
+        return "Invalid Version"
+    # Holds the game's lock so no turn is played while the state is read
+    with game.lock:
+        state = mge.board_state(game, "player", since)
+    return jsonify(state)
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """
+    Returns the latency of each route and phase of a turn, the number of requests
+    and the number of active games in the Prometheus text format.
+    """
+
+    if not mt.registry.enabled:
+        return "Metrics Disabled", 404
+    return Response(mt.registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/events", methods=["GET"])
+def game_events():
+    """
+    Streams the events of a game as server-sent events.
+
+    The caller's own game is followed, or the game given by the "game" argument so
+    spectators can follow a game too. An event is sent for each player shot, BOT shot,
+    hit, sunk ship and game over, and the stream ends once the game is over. A comment
+    is sent when there have been no events for a while to keep the connection open.
+    Following a game which is already over sends its game over event straight away.
+    """
+
+    game_id = request.args.get("game") or request.cookies.get(GAME_COOKIE)
+    game = games.get(game_id)
+    if game is None:
+        return "No Game Found"
+
+    # Subscribes before responding so no events are missed, holding the game's lock
+    # so no turn can end the game between subscribing and checking for a winner
+    with game.lock:
+        subscription = events.subscribe(game_id)
+        winner = mge.Game(game).winner
+
+    def stream():
+        try:
+            if winner is not None:
+                yield ev.format_event({"type": "game_over", "winner": winner})
+                return
+            while True:
+                event = subscription.get(timeout=EVENT_KEEPALIVE)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield ev.format_event(event)
+                if event["type"] == "game_over":
+                    return
+        finally:
+            # Runs when the game ends or the client disconnects
+            events.unsubscribe(subscription)
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # Initialises variables
 BOARD_SIZE = 10
-players = {}
-bot_already_attacked = []
-player_already_attacked = []
-
-# Initialises the boards and battleships for player and BOT
-player_board = c.initialise_board(size=BOARD_SIZE)
-bot_board = c.initialise_board(size=BOARD_SIZE)
-
-player_battleships = c.create_battleships()
-bot_battleships = c.create_battleships()
-
-# Places BOT's battleships onto bot_board using random algorithm
-bot_board = c.place_battleships(bot_board, bot_battleships, algorithm="random")
-
-# Saves board and battleships into players dictionary
-players = {
-    "player": {
-        "board": player_board,
-        "battleships": player_battleships,
-    },
-    "BOT": {
-        "board": bot_board,
-        "battleships": bot_battleships,
-    },
-}
+BOARD_ENGINE = "compact"  # See components.ENGINES for other board engines
+BOT_STRATEGY = "hunt_target"  # See bots.BOTS and bots.DIFFICULTIES for others
+BOT_MOVE_BUDGET = 0.05  # Seconds for a BOT move, shared by the moves made at once
+GAME_COOKIE = "game_id"
+EVENT_QUEUE_SIZE = 100  # Events held for each slow client before the oldest is dropped
+EVENT_KEEPALIVE = 15.0  # Seconds between keep-alive comments when there are no events
+
+DATABASE_FILE = os.environ.get("BATTLESHIPS_DATABASE")  # None keeps games in memory
+METRICS_ENABLED = os.environ.get("BATTLESHIPS_METRICS") == "1"
+BOT_CACHE_BYTES = 16 * 1024 * 1024  # Memory cap of the BOT decision cache
+
+# Initialises the store holding every player's game
+games = gs.GameStore(
+    BOARD_SIZE,
+    BOARD_ENGINE,
+    persistence=ps.SQLitePersistence(DATABASE_FILE) if DATABASE_FILE else None,
+    bot=BOT_STRATEGY,
+)
+# Saves every queued move before the server stops
+atexit.register(games.persistence.close)
+
+# Shares the time for BOT moves out so latency stays flat as load grows
+bot_budget = bt.MoveBudget(BOT_MOVE_BUDGET)
+# Bounds the decisions cached by strong BOTs across every game
+dc.cache.max_bytes = BOT_CACHE_BYTES
+
+# Metrics are only recorded when enabled, so they cost nothing otherwise
+mt.registry.enabled = METRICS_ENABLED
+mt.registry.gauge("battleships_active_games", lambda: len(games))
+mt.registry.gauge("battleships_bot_cache_hit_ratio", lambda: dc.cache.hit_rate)
+mt.registry.gauge("battleships_bot_cache_bytes", lambda: dc.cache.size)
+mt.registry.gauge("battleships_bot_moves_active", lambda: bot_budget.active)
+# Initialises the events published to anyone following a game
+events = ev.EventBus(EVENT_QUEUE_SIZE)
 
 if __name__ == "__main__":
     # Runs the Flask app
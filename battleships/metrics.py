@@ -0,0 +1,201 @@
+"""
+This module contains the latency and request metrics of the Battleships server.
+
+The 'Registry' class records latency histograms, counters and gauges, and renders them
+in the Prometheus text format for the '/metrics' route. The 'registry' instance is
+shared by the servers and the game logic, and records nothing until it is enabled.
+
+The 'Timer' class times the phases of a piece of work, such as the player's attack and
+the BOT's move in one turn. A disabled registry hands out a timer which does nothing,
+so instrumented code costs no more than a method call when metrics are disabled.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable
+
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+)
+
+# Type and help text of every metric, as {name: (type, help)}
+METRICS = {
+    "battleships_request_seconds": ("histogram", "Latency of each request by route"),
+    "battleships_requests_total": ("counter", "Requests by route and status"),
+    "battleships_turn_phase_seconds": ("histogram", "Latency of each phase of a turn"),
+    "battleships_active_games": ("gauge", "Games held in the game store"),
+    "battleships_bot_cache_hit_ratio": ("gauge", "Hit rate of the BOT decision cache"),
+    "battleships_bot_moves_active": ("gauge", "BOT moves being computed at once"),
+    "battleships_bot_cache_bytes": ("gauge", "Estimated bytes of BOT decisions cached"),
+}
+
+
+class Histogram:
+    """Counts of observed values in buckets, with their sum
+
+    Attributes:
+    buckets -- the upper bound of each bucket
+    counts -- number of values observed in each bucket (not cumulative)
+    total -- the sum of every value observed
+    """
+
+    __slots__ = ("buckets", "counts", "total")
+
+    def __init__(self, buckets: tuple = BUCKETS) -> None:
+        self.buckets = buckets
+        # The last count is of values above every bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        """Records one value"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class Timer:
+    """Records the time taken by each phase of a piece of work
+
+    Attributes:
+    registry -- the registry the phases are recorded in
+    name -- the name of the histogram the phases are recorded in
+    """
+
+    __slots__ = ("registry", "name", "_start")
+
+    def __init__(self, registry, name: str) -> None:
+        self.registry = registry
+        self.name = name
+        self._start = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        """Records the time since the last lap as the given phase"""
+        now = time.perf_counter()
+        self.registry.observe(self.name, (("phase", phase),), now - self._start)
+        self._start = now
+
+
+class NullTimer:
+    """A timer which records nothing, handed out when metrics are disabled"""
+
+    __slots__ = ()
+
+    def lap(self, phase: str) -> None:
+        """Does nothing"""
+
+
+NULL_TIMER = NullTimer()
+
+
+class Registry:
+    """Every metric recorded by the server
+
+    Each metric is stored by name and labels, where labels is a tuple of
+    (label, value) pairs.
+
+    Attributes:
+    enabled -- whether metrics are recorded
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, labels: tuple, seconds: float) -> None:
+        """Records a latency in a histogram"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name: str, labels: tuple, amount: int = 1) -> None:
+        """Adds to a counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[(name, labels)] = (
+                self._counters.get((name, labels), 0) + amount
+            )
+
+    def gauge(self, name: str, function: Callable[[], float]) -> None:
+        """Registers a function returning the current value of a gauge"""
+        self._gauges[name] = function
+
+    def timer(self, name: str):
+        """Returns a Timer recording in a histogram, or a timer doing nothing"""
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, name)
+
+    def clear(self) -> None:
+        """Removes every recorded histogram and counter"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text format"""
+        with self._lock:
+            histograms = {
+                key: (histogram.buckets, list(histogram.counts), histogram.total)
+                for key, histogram in self._histograms.items()
+            }
+            counters = dict(self._counters)
+        samples = {}
+        for (name, labels), (buckets, counts, total) in histograms.items():
+            lines = samples.setdefault(name, [])
+            # Buckets are cumulative in the Prometheus text format
+            count = 0
+            for bound, bucket_count in zip(buckets + ("+Inf",), counts):
+                count += bucket_count
+                bucket_labels = _labels(labels + (("le", bound),))
+                lines.append(f"{name}_bucket{bucket_labels} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        for (name, labels), value in counters.items():
+            samples.setdefault(name, []).append(f"{name}{_labels(labels)} {value}")
+        for name, function in self._gauges.items():
+            samples.setdefault(name, []).append(f"{name} {function()}")
+
+        output = []
+        for name in sorted(samples):
+            metric_type, help_text = METRICS.get(name, ("untyped", name))
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {metric_type}")
+            output.extend(samples[name])
+        return "\n".join(output) + "\n"
+
+
+def _labels(labels: tuple) -> str:
+    """Returns labels in the Prometheus text format"""
+    if not labels:
+        return ""
+    pairs = []
+    for label, value in labels:
+        # Backslashes and quotes are escaped in label values
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        pairs.append(f'{label}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+# The registry shared by the servers and the game logic
+registry = Registry()
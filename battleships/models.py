@@ -0,0 +1,548 @@
+"""
+This module contains the compact game data model for the Battleships game.
+
+The classes in this module use __slots__ so that many games can be held in one process
+without the overhead of a dictionary for every object:
+
+The 'Ship' class holds the name, length and remaining health of one ship.
+The 'Board' class is a board engine storing every cell in a bytearray of ship indices,
+instead of a list of lists of ship names. It also tracks the health of its own ships
+in a bytearray, so it can be used in place of the battleships dictionary.
+The 'ShotTracker' class records the cells a player has attacked, with constant time
+checks for repeated shots and constant time random picks of cells not yet attacked.
+The 'remove_from_deck' function removes a cell from such a deck, and is shared with
+the hunting deck of 'bots.HuntTargetBot'.
+The 'SparseShotTracker' class records them in a set instead, for boards too large to
+keep a deck of every cell, so its memory grows with the shots rather than the board.
+The 'GameState' class holds the board and fleet of each player in a game, in place of
+the players dictionary of dictionaries.
+
+The existing functions in 'components' and 'game_engine' accept these objects, so a
+'Board' is created with initialise_board(size, engine="compact").
+"""
+
+import threading
+from array import array
+from random import Random, randint
+from typing import Optional
+
+import fleet as fl
+
+
+# Constants
+DOWN = 0
+RIGHT = 1
+# The high bit of a cell is set once the cell has been attacked
+SHOT = 0x80
+# Largest board size whose shots are tracked with a deck of every cell
+DECK_MAX_SIZE = 32
+# Array typecode of deck cell indices, 2 bytes as a deck holds at most 1024 cells
+DECK_TYPECODE = "H"
+# Deck position of a cell which is not in a deck
+NOT_IN_DECK = 0xFFFF
+
+
+# Fleet tuples shared between every board holding the same ships
+_FLEETS = {}
+
+
+def _shared_fleet(fleet: tuple) -> tuple:
+    """Returns the shared copy of a fleet tuple so boards do not each store one"""
+    return _FLEETS.setdefault(fleet, fleet)
+
+
+class Ship:
+    """A ship on a board
+
+    Attributes:
+    name -- the name of the ship
+    length -- the length of the ship
+    health -- the number of cells of the ship which have not been hit
+    """
+
+    __slots__ = ("name", "length", "health")
+
+    def __init__(self, name: str, length: int, health: Optional[int] = None) -> None:
+        self.name = name
+        self.length = int(length)
+        self.health = int(length) if health is None else health
+
+    def __repr__(self) -> str:
+        return f"Ship({self.name!r}, {self.length}, health={self.health})"
+
+
+class Board:
+    """Board engine storing each cell as a ship index in a bytearray
+
+    Cell (col, row) is stored at index (col * size + row). A value of 0 is an empty
+    cell and ship index i + 1 is the i-th ship of the fleet. The SHOT bit is set on
+    attacked cells. The names and lengths of the ships are kept in a tuple shared
+    by every board with the same fleet, so each board only stores its cells and the
+    health of each ship.
+
+    Attributes:
+    size -- the size of the board
+    cells -- bytearray containing the ship index of every cell
+    fleet -- tuple containing the (name, length) of each ship placed on the board
+    health -- bytearray containing the remaining health of each ship
+    remaining -- total health remaining across every ship
+    """
+
+    __slots__ = ("size", "cells", "fleet", "health", "remaining")
+
+    def __init__(self, size: int = 10) -> None:
+        self.size = size
+        self.cells = bytearray(size * size)
+        self.fleet = ()
+        self.health = bytearray()
+        self.remaining = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def ships(self) -> list[Ship]:
+        """Returns a list of the ships placed on the board"""
+        return [
+            Ship(name, length, health)
+            for (name, length), health in zip(self.fleet, self.health)
+        ]
+
+    def _index(self, ship: str) -> int:
+        """Returns the position of the ship with the given name in the fleet"""
+        for index, (name, _) in enumerate(self.fleet):
+            if name == ship:
+                return index
+        raise KeyError(ship)
+
+    def is_position_occupied(
+        self, col: int, row: int, direction: int, length: int
+    ) -> bool:
+        """Checks if ship can fit and returns True or False"""
+        length = int(length)
+        if col < 0 or row < 0 or col >= self.size or row >= self.size:
+            return False
+        if direction == DOWN:
+            if col + length > self.size:
+                return False
+            step = self.size
+        else:
+            if row + length > self.size:
+                return False
+            step = 1
+        start = col * self.size + row
+        return not any(self.cells[start : start + step * length : step])
+
+    def place_ship(
+        self, ship: str, col: int, row: int, direction: int, length: int
+    ) -> None:
+        """Places a ship onto the board starting at (col, row)"""
+        length = int(length)
+        if not self.is_position_occupied(col, row, direction, length):
+            raise ValueError(f"Ship '{ship}' does not fit on the board")
+        try:
+            index = self._index(ship)
+            # Health of each ship is stored in one byte
+            if self.health[index] + length > 255:
+                raise ValueError(f"Ship '{ship}' is too long")
+            fleet = list(self.fleet)
+            fleet[index] = (ship, fleet[index][1] + length)
+            self.fleet = _shared_fleet(tuple(fleet))
+            self.health[index] += length
+        except KeyError:
+            if len(self.fleet) >= SHOT - 1 or length > 255:
+                raise ValueError(f"Ship '{ship}' cannot be added to the board") from None
+            index = len(self.fleet)
+            self.fleet = _shared_fleet(self.fleet + ((ship, length),))
+            self.health.append(length)
+        step = self.size if direction == DOWN else 1
+        start = col * self.size + row
+        for i in range(length):
+            self.cells[start + i * step] = index + 1
+        self.remaining += length
+
+    def ship_at(self, col: int, row: int) -> Optional[str]:
+        """Returns the name of the ship at (col, row) or None if cell is empty"""
+        index = self.cells[col * self.size + row] & ~SHOT
+        return self.fleet[index - 1][0] if index else None
+
+    def attack(self, col: int, row: int) -> Optional[str]:
+        """Records a shot at (col, row) and returns the ship hit or None"""
+        cell = col * self.size + row
+        value = self.cells[cell]
+        # Checks if cell has already been attacked
+        if value & SHOT:
+            return None
+        self.cells[cell] = value | SHOT
+        if value == 0:
+            return None
+        self.health[value - 1] -= 1
+        self.remaining -= 1
+        return self.fleet[value - 1][0]
+
+    def is_sunk(self, ship: str) -> bool:
+        """Checks if every cell of a ship has been hit"""
+        return self.health[self._index(ship)] == 0
+
+    def is_game_over(self) -> bool:
+        """Checks if every ship on the board has been sunk"""
+        return self.remaining == 0
+
+    def status(self) -> dict[str, int]:
+        """Returns a dictionary containing each ship name and its remaining health"""
+        return {name: health for (name, _), health in zip(self.fleet, self.health)}
+
+    def __getitem__(self, ship: str) -> int:
+        return self.health[self._index(ship)]
+
+    def keys(self):
+        """Returns the names of every ship on the board"""
+        return self.status().keys()
+
+    def items(self):
+        """Returns the name and remaining health of every ship on the board"""
+        return self.status().items()
+
+    def to_list(self) -> list[list]:
+        """Returns the board as a list of lists of ship names that are not hit"""
+        names = [None] + [name for name, _ in self.fleet]
+        return [
+            [
+                None if value & SHOT else names[value]
+                for value in self.cells[col * self.size : (col + 1) * self.size]
+            ]
+            for col in range(self.size)
+        ]
+
+
+def remove_from_deck(deck: array, positions: array, untried: int, cell: int) -> int:
+    """Moves a cell behind the untried cells of a deck and returns the new count
+
+    The cell is swapped with the last untried cell, so it is removed in constant
+    time. Cells already removed, or not in the deck, are left where they are.
+
+    Keyword arguments:
+    deck -- array of cell indices, with the untried cells first
+    positions -- array of the position of each cell index in the deck
+    untried -- number of untried cells at the front of the deck
+    cell -- the cell index to remove
+    """
+    position = positions[cell]
+    if position >= untried:
+        return untried
+    last = deck[untried - 1]
+    deck[position] = last
+    positions[last] = position
+    deck[untried - 1] = cell
+    positions[cell] = untried - 1
+    return untried - 1
+
+
+class ShotTracker:
+    """The cells of a board which have been attacked
+
+    Attacked cells are stored as bits of an integer, so checking for a repeated shot
+    is constant time. The cells not yet attacked are kept at the front of a deck, and
+    each attacked cell is swapped to the back, so a random untried cell can be picked
+    in constant time instead of retrying random cells until an untried one is found.
+
+    The attacked cells are kept at the back of the deck in the reverse order they
+    were attacked, so the cells attacked since an earlier shot can be found without
+    keeping a separate history.
+
+    Attributes:
+    size -- the size of the board
+    shots -- bitmask of every cell that has been attacked (see 'bitboard')
+    hits -- bitmask of every attacked cell which hit a ship
+    deck -- array of every cell index, with the untried cells first
+    positions -- array of the position of each cell index in the deck
+    untried -- number of cells which have not been attacked
+    """
+
+    __slots__ = ("size", "shots", "hits", "deck", "positions", "untried")
+
+    def __init__(self, size: int = 10) -> None:
+        if size > DECK_MAX_SIZE:
+            raise ValueError(f"Boards over size {DECK_MAX_SIZE} keep no deck of cells")
+        self.size = size
+        self.shots = 0
+        self.hits = 0
+        self.deck = array(DECK_TYPECODE, range(size * size))
+        self.positions = array(DECK_TYPECODE, range(size * size))
+        self.untried = size * size
+
+    def __len__(self) -> int:
+        return self.size * self.size - self.untried
+
+    def _cell(self, coordinates: tuple[int, int]) -> int:
+        """Returns the cell index of coordinates, raising an error if off the board"""
+        col, row = coordinates
+        if not (0 <= col < self.size and 0 <= row < self.size):
+            raise ValueError(f"Coordinates {coordinates} are not on the board")
+        return col * self.size + row
+
+    def __contains__(self, coordinates: tuple[int, int]) -> bool:
+        return bool(self.shots >> self._cell(coordinates) & 1)
+
+    def add(self, coordinates: tuple[int, int]) -> bool:
+        """Records a shot and returns False if the cell was already attacked"""
+        cell = self._cell(coordinates)
+        if self.shots >> cell & 1:
+            return False
+        self.shots |= 1 << cell
+        self.untried = remove_from_deck(self.deck, self.positions, self.untried, cell)
+        return True
+
+    def mark_hit(self, coordinates: tuple[int, int]) -> None:
+        """Records that an attacked cell hit a ship"""
+        self.hits |= 1 << self._cell(coordinates)
+
+    def shots_since(self, count: int) -> int:
+        """Returns a bitmask of the cells attacked after the first count shots"""
+        mask = 0
+        for cell in self.deck[self.untried : self.size * self.size - count]:
+            mask |= 1 << cell
+        return mask
+
+    def sample(self, rng: Optional[Random] = None) -> tuple[int, int]:
+        """Returns random coordinates of a cell which has not been attacked
+
+        Keyword arguments:
+        rng -- the random generator to use, or None for the random module
+        """
+        if self.untried == 0:
+            raise ValueError("Every cell has already been attacked")
+        pick = randint if rng is None else rng.randint
+        cell = self.deck[pick(0, self.untried - 1)]
+        return divmod(cell, self.size)
+
+
+class SparseShotTracker:
+    """The cells of a large board which have been attacked, held in a set
+
+    Only the attacked cells are stored, so the memory used grows with the number of
+    shots, whatever the size of the board. Random untried cells are picked by
+    retrying random cells, which rarely takes more than one try as large boards are
+    mostly untried. The bitmasks of the shots and hits are built when asked for.
+
+    Attributes:
+    size -- the size of the board
+    cells -- set of the index of every attacked cell
+    history -- list of the attacked cell indices, in the order they were attacked
+    hit_cells -- set of the index of every attacked cell which hit a ship
+    """
+
+    __slots__ = ("size", "cells", "history", "hit_cells")
+
+    def __init__(self, size: int = 10) -> None:
+        self.size = size
+        self.cells = set()
+        self.history = []
+        self.hit_cells = set()
+
+    def __len__(self) -> int:
+        return len(self.history)
+
+    def _cell(self, coordinates: tuple[int, int]) -> int:
+        """Returns the cell index of coordinates, raising an error if off the board"""
+        col, row = coordinates
+        if not (0 <= col < self.size and 0 <= row < self.size):
+            raise ValueError(f"Coordinates {coordinates} are not on the board")
+        return col * self.size + row
+
+    def __contains__(self, coordinates: tuple[int, int]) -> bool:
+        return self._cell(coordinates) in self.cells
+
+    @property
+    def shots(self) -> int:
+        """Bitmask of every cell that has been attacked (see 'bitboard')"""
+        return self.shots_since(0)
+
+    @property
+    def hits(self) -> int:
+        """Bitmask of every attacked cell which hit a ship"""
+        mask = 0
+        for cell in self.hit_cells:
+            mask |= 1 << cell
+        return mask
+
+    def add(self, coordinates: tuple[int, int]) -> bool:
+        """Records a shot and returns False if the cell was already attacked"""
+        cell = self._cell(coordinates)
+        if cell in self.cells:
+            return False
+        self.cells.add(cell)
+        self.history.append(cell)
+        return True
+
+    def mark_hit(self, coordinates: tuple[int, int]) -> None:
+        """Records that an attacked cell hit a ship"""
+        self.hit_cells.add(self._cell(coordinates))
+
+    def shots_since(self, count: int) -> int:
+        """Returns a bitmask of the cells attacked after the first count shots"""
+        mask = 0
+        for cell in self.history[count:]:
+            mask |= 1 << cell
+        return mask
+
+    def sample(self, rng: Optional[Random] = None) -> tuple[int, int]:
+        """Returns random coordinates of a cell which has not been attacked
+
+        Keyword arguments:
+        rng -- the random generator to use, or None for the random module
+        """
+        if len(self.cells) == self.size * self.size:
+            raise ValueError("Every cell has already been attacked")
+        pick = randint if rng is None else rng.randint
+        while True:
+            cell = pick(0, self.size * self.size - 1)
+            if cell not in self.cells:
+                return divmod(cell, self.size)
+
+
+def create_tracker(size: int):
+    """Returns a ShotTracker, or a SparseShotTracker for boards over DECK_MAX_SIZE"""
+    if size > DECK_MAX_SIZE:
+        return SparseShotTracker(size)
+    return ShotTracker(size)
+
+
+class GameState:
+    """The boards and fleets of every player in one game
+
+    The players are held in tuples rather than dictionaries as a game only has a
+    couple of players, use the 'board' and 'fleet' methods to look them up.
+
+    Attributes:
+    size -- the size of each board
+    usernames -- tuple containing the username of each player
+    boards -- tuple containing the board of each player
+    fleets -- tuple containing the health of the ships of each player
+    shots -- tuple containing the tracker of the cells attacked by each player
+    revision -- number of times a player or board has been added or replaced
+    bot -- the BOT choosing the moves of the "BOT" player (see 'bots'), or None
+    rng -- the random generator of the game, or None for the random module
+    lock -- lock held while a turn is played, so requests play one turn at a time
+    placed -- tuple containing the username of each player whose ships are placed
+    """
+
+    __slots__ = (
+        "size",
+        "usernames",
+        "boards",
+        "fleets",
+        "shots",
+        "revision",
+        "bot",
+        "rng",
+        "lock",
+        "placed",
+    )
+
+    def __init__(self, size: int = 10) -> None:
+        self.size = size
+        self.usernames = ()
+        self.boards = ()
+        self.fleets = ()
+        self.shots = ()
+        self.revision = 0
+        self.bot = None
+        self.rng = None
+        self.lock = threading.Lock()
+        self.placed = ()
+
+    def add_player(self, username: str, board, battleships: dict[str, int]) -> None:
+        """Adds a player's board and the battleships placed on it to the game
+
+        Keyword arguments:
+        username -- the username of the player
+        board -- the player's board, of any board engine
+        battleships -- dictionary containing each ship and its length
+        """
+        if username in self.usernames:
+            raise ValueError(f"Player '{username}' is already in the game")
+        # Compact boards track the health of their own ships
+        if isinstance(board, Board):
+            fleet = board
+        else:
+            fleet = fl.Fleet(battleships)
+        self.usernames += (username,)
+        self.boards += (board,)
+        self.fleets += (fleet,)
+        self.shots += (create_tracker(self.size),)
+        self.revision += 1
+
+    def set_board(self, username: str, board, battleships: dict[str, int]) -> None:
+        """Replaces a player's board and the battleships placed on it
+
+        Keyword arguments:
+        username -- the username of the player
+        board -- the player's new board, of any board engine
+        battleships -- dictionary containing each ship and its length
+        """
+        index = self.usernames.index(username)
+        fleet = board if isinstance(board, Board) else fl.Fleet(battleships)
+        self.boards = self.boards[:index] + (board,) + self.boards[index + 1 :]
+        self.fleets = self.fleets[:index] + (fleet,) + self.fleets[index + 1 :]
+        self.mark_placed(username)
+        self.revision += 1
+
+    def mark_placed(self, username: str) -> None:
+        """Records that a player's ships have been placed on their board"""
+        if username not in self.placed:
+            self.placed += (username,)
+
+    def is_placed(self, username: str) -> bool:
+        """Checks if a player's ships have been placed, even if they are now sunk"""
+        return username in self.placed
+
+    def board(self, username: str):
+        """Returns the board of a player"""
+        return self.boards[self.usernames.index(username)]
+
+    def fleet(self, username: str):
+        """Returns the health of the ships of a player"""
+        return self.fleets[self.usernames.index(username)]
+
+    def opponent(self, username: str) -> str:
+        """Returns the username of the other player of a two player game"""
+        return self.usernames[1 - self.usernames.index(username)]
+
+    def shots_by(self, username: str) -> ShotTracker:
+        """Returns the cells attacked by a player"""
+        return self.shots[self.usernames.index(username)]
+
+    def is_game_over(self, username: str) -> bool:
+        """Checks if every ship of a player has been sunk"""
+        return self.fleet(username).is_game_over()
+
+    def version(self) -> int:
+        """Returns a number which increases every time the game changes
+
+        The version is made of the revision followed by the number of shots made by
+        each player, as digits in base (size * size + 1), so the number of shots
+        each player had made at an earlier version can be found from it.
+        """
+        base = self.size * self.size + 1
+        version = self.revision
+        for shots in self.shots:
+            version = version * base + len(shots)
+        return version
+
+    def shot_counts(self, version: int) -> Optional[tuple[int, ...]]:
+        """Returns the number of shots each player had made at an earlier version
+
+        None is returned if the boards have changed since then or the version
+        was never reached, as the changes can then not be found from the shots.
+        """
+        base = self.size * self.size + 1
+        counts = []
+        for shots in reversed(self.shots):
+            version, count = divmod(version, base)
+            if count > len(shots):
+                return None
+            counts.append(count)
+        if version != self.revision:
+            return None
+        return tuple(reversed(counts))
@@ -10,27 +10,432 @@ The main functions in this module are as follows:
 
 The `generate_attack` function generates a random attack for the bot within 
 the board and returns it as a tuple. 
+The `generate_untried_attack` function picks a random cell the bot has not attacked yet.
+The `generate_bot_attack` function picks the next attack of the game's BOT (see 'bots'),
+by an optional deadline.
+The `Game` class plays a game one step at a time, returning the events of each step
+without any console I/O, and `create_game` creates a game with both fleets placed.
+The `play_turn` function plays one turn of the player and the bot on a game state as
+a step of a `Game`, and is shared by the Flask and asyncio servers.
+The `play_turns` function plays a list of turns in order, stopping at game over.
+The `board_state` function returns both boards of a game as bitmasks, or as lists of
+cells on large boards, or only the shots made since an earlier version.
+Both can publish the events of each turn (shots, hits, sunk ships and game over),
+which the server streams to anyone following the game.
 The `ai_opponent_game_loop` function is a manual testing game loop 
 where the player can play against the bot.
 
 This module is used by the main server module to handle the game logic.
 """
 
-from random import randint
+import time
+from random import Random, randint
+from typing import Callable, Optional, Union
+import bots as bt
 import components as c
 import game_engine as ge
+import metrics as mt
+import models as m
 
 
-def generate_attack(size: int = 10):
-    """Generates coordinates at random"""
+def generate_attack(size: int = 10, rng: Optional[Random] = None):
+    """Generates coordinates at random, using rng or the random module if None"""
+    pick = randint if rng is None else rng.randint
     # Generates random col and row within the board
-    col = randint(0, size - 1)
-    row = randint(0, size - 1)
+    col = pick(0, size - 1)
+    row = pick(0, size - 1)
     # Puts col and row into a tuple
     coordinates = (col, row)
     return coordinates
 
 
+def generate_untried_attack(
+    shots: m.ShotTracker, rng: Optional[Random] = None
+) -> tuple:
+    """Picks coordinates at random from the cells not attacked yet and records them
+
+    Keyword arguments:
+    shots -- the cells already attacked by the bot
+    rng -- the random generator to use, or None for the random module
+    """
+    coordinates = shots.sample(rng)
+    shots.add(coordinates)
+    return coordinates
+
+
+def ship_at(coordinates: tuple, board: list):
+    """Returns the name of the ship at coordinates or None if the cell is empty
+
+    Keyword arguments:
+    coordinates -- a tuple containing coordinate values on the board
+    board -- list of lists containing battleship placements, or a board engine object
+    """
+    col, row = coordinates
+    if isinstance(board, list):
+        return board[col][row]
+    return board.ship_at(col, row)
+
+
+def attack_and_publish(
+    coordinates: tuple,
+    board: list,
+    battleships,
+    username: str,
+    publish: Optional[Callable[[dict], None]] = None,
+) -> tuple[bool, Optional[str]]:
+    """Attacks a board like game_engine.attack and publishes the events of the shot
+
+    A "player_shot" or "bot_shot" event is published for every shot, followed by a
+    "hit" event and a "sunk" event when the shot hits or sinks a ship. Whether the
+    shot hit and the name of the ship it sank, or None, are returned.
+
+    Keyword arguments:
+    coordinates -- a tuple containing coordinate values on the board
+    board -- the board being attacked
+    battleships -- the Fleet of the board being attacked
+    username -- the username of the player making the attack
+    publish -- function called with each event, or None to publish no events
+    """
+    # The ship is looked up first as list boards clear the cell when it is hit
+    ship = ship_at(coordinates, board)
+    outcome = ge.attack(coordinates, board, battleships)
+    sunk = ship if outcome and battleships.is_sunk(ship) else None
+    if publish is not None:
+        shot_type = "bot_shot" if username == "BOT" else "player_shot"
+        publish({"type": shot_type, "coordinates": list(coordinates), "hit": outcome})
+        if outcome:
+            publish({"type": "hit", "by": username, "ship": ship})
+        if sunk is not None:
+            publish({"type": "sunk", "by": username, "ship": ship})
+    return outcome, sunk
+
+
+def resolve_shot(
+    game: m.GameState,
+    username: str,
+    coordinates: tuple,
+    publish: Optional[Callable[[dict], None]] = None,
+) -> bool:
+    """Attacks the opponent's board with a shot already added to the player's shots
+
+    Hits are recorded in the player's shots, and the BOT is told the outcome of its
+    own shots. Returns True if the shot hit a ship.
+
+    Keyword arguments:
+    game -- game state containing the boards of both players
+    username -- the username of the player making the attack
+    coordinates -- a tuple containing the coordinates attacked
+    publish -- function called with each event of the shot, or None
+    """
+    target = game.opponent(username)
+    outcome, sunk = attack_and_publish(
+        coordinates, game.board(target), game.fleet(target), username, publish
+    )
+    if outcome:
+        game.shots_by(username).mark_hit(coordinates)
+    if username == "BOT" and game.bot is not None:
+        game.bot.record(coordinates, outcome, sunk)
+    return outcome
+
+
+def generate_bot_attack(game: m.GameState, deadline: Optional[float] = None) -> tuple:
+    """Picks the BOT's next attack using the game's BOT, or at random, and records it
+
+    Keyword arguments:
+    game -- game state containing the "BOT" player
+    deadline -- the time.time() by which the BOT must have picked, or None
+    """
+    if game.bot is None:
+        return generate_untried_attack(game.shots_by("BOT"), game.rng)
+    coordinates = game.bot.choose(game.shots_by("BOT"), deadline)
+    game.shots_by("BOT").add(coordinates)
+    return coordinates
+
+
+class Game:
+    """A game of a player against the BOT, played one step at a time without any I/O
+
+    Each step plays the player's move and the BOT's reply, and returns the events
+    of the step: the events of each shot (see attack_and_publish), followed by a
+    "game_over" event with the "winner" once the game has ended. A move which
+    cannot be played returns a single "error" event with its "message" instead.
+    Nothing is read from or printed to the console, so games can be driven by the
+    command line, the servers or simulations alike.
+
+    Attributes:
+    state -- game state containing the boards of the player and the "BOT"
+    player -- the username of the player
+    bot_replies -- whether the BOT attacks the player after each move
+    """
+
+    __slots__ = ("state", "player", "bot_replies")
+
+    def __init__(
+        self, state: m.GameState, player: str = "player", bot_replies: bool = True
+    ) -> None:
+        self.state = state
+        self.player = player
+        self.bot_replies = bot_replies
+
+    @property
+    def winner(self) -> Optional[str]:
+        """The username of the winner, or None if the game has not ended"""
+        # The player attacks first, so sinking the BOT's fleet ends the game first
+        if c.check_game_over("BOT", self.state):
+            return self.player
+        if self.bot_replies and c.check_game_over(self.player, self.state):
+            return "BOT"
+        return None
+
+    @property
+    def finished(self) -> bool:
+        """Whether the game has ended"""
+        return self.winner is not None
+
+    def step(self, player_move: tuple, budget: Optional[float] = None) -> list[dict]:
+        """Plays the player's move and the BOT's reply and returns their events
+
+        Keyword arguments:
+        player_move -- a tuple containing the coordinates attacked by the player
+        budget -- seconds the BOT may take to pick its attack, or None for no limit
+        """
+        # Times each phase of the step when metrics are enabled
+        timer = mt.registry.timer("battleships_turn_phase_seconds")
+        # Checks if game is over, preventing further attacks
+        if self.finished:
+            return [{"type": "error", "message": "Game Over"}]
+        timer.lap("game_over_check")
+
+        # Player attack on BOT's board
+        # Records the attack, checking it has not already been played
+        try:
+            if not self.state.shots_by(self.player).add(player_move):
+                return [{"type": "error", "message": "Already Attacked"}]
+        except ValueError:
+            return [{"type": "error", "message": "Invalid Coordinates"}]
+        events = []
+        resolve_shot(self.state, self.player, player_move, events.append)
+        timer.lap("player_attack")
+
+        # BOT attack on Player's board, unless the player has just sunk every ship
+        if self.bot_replies and not c.check_game_over("BOT", self.state):
+            # Picks a cell the BOT has not attacked yet, within the time budget
+            deadline = None if budget is None else time.time() + budget
+            bot_attack = generate_bot_attack(self.state, deadline)
+            resolve_shot(self.state, "BOT", bot_attack, events.append)
+            timer.lap("bot_move")
+
+        # Checks if either player has lost every ship
+        winner = self.winner
+        timer.lap("game_over_check")
+        if winner is not None:
+            events.append({"type": "game_over", "winner": winner})
+        return events
+
+
+def create_game(
+    size: int = 10,
+    engine: str = "compact",
+    player: str = "player",
+    player_algorithm: str = "simple",
+    bot_algorithm: str = "random",
+    bot: Optional[str] = None,
+    bot_replies: bool = True,
+    seed=None,
+) -> Game:
+    """Returns a new game of a player against the BOT with both fleets placed
+
+    Keyword arguments:
+    size -- the size of the boards (default 10)
+    engine -- the board engine of both boards (see components.ENGINES)
+    player -- the username of the player (default "player")
+    player_algorithm -- the placement algorithm of the player's fleet
+    bot_algorithm -- the placement algorithm of the BOT's fleet
+    bot -- the strategy of the BOT (see bots.create_bot), or None to attack at random
+    bot_replies -- whether the BOT attacks the player after each move (default True)
+    seed -- the seed the game is played from, or None to use the random module
+    """
+    # Each fleet and the BOT draw from their own stream, so a seed replays the game
+    streams = [None] * 3 if seed is None else c.spawn_rngs(seed, 3)
+    state = m.GameState(size)
+    state.rng = streams[2]
+    for username, algorithm, rng in (
+        (player, player_algorithm, streams[0]),
+        ("BOT", bot_algorithm, streams[1]),
+    ):
+        battleships = c.create_battleships()
+        board = c.place_battleships(
+            c.initialise_board(size=size, engine=engine),
+            battleships,
+            algorithm,
+            rng=rng,
+        )
+        state.add_player(username, board, battleships)
+    if bot is not None:
+        state.bot = bt.create_bot(bot, size, c.create_battleships(), state.rng)
+    return Game(state, player, bot_replies)
+
+
+def play_turn(
+    game: m.GameState,
+    player_attack: tuple,
+    publish: Optional[Callable[[dict], None]] = None,
+    budget: Optional[float] = None,
+) -> Union[dict, str]:
+    """Plays one turn of the player and the BOT and returns the outcome
+
+    The turn is played as a step of a 'Game', and its outcome is returned as a
+    dictionary in the format sent by the '/attack' route, or as a message string
+    if the attack could not be played.
+
+    Keyword arguments:
+    game -- game state containing the "player" and "BOT" boards
+    player_attack -- a tuple containing the coordinates attacked by the player
+    publish -- function called with each event of the turn, or None
+    budget -- seconds the BOT may take to pick its attack, or None for no limit
+    """
+    events = Game(game).step(player_attack, budget)
+    # Moves which could not be played are answered with their message
+    if events[0]["type"] == "error":
+        return events[0]["message"]
+    if publish is not None:
+        for event in events:
+            publish(event)
+    bot_attack = next(
+        (
+            tuple(event["coordinates"])
+            for event in events
+            if event["type"] == "bot_shot"
+        ),
+        None,
+    )
+    winner = events[-1].get("winner")
+
+    # If game over send game over message
+    if winner == "BOT":
+        # If BOT wins send only BOT coordinates
+        return {"hit": False, "AI_Turn": bot_attack, "finished": "GAME OVER BOT WINS!"}
+    if winner is not None:
+        # If player wins send only player coordinates
+        return {
+            "hit": True,
+            "Player_Turn": player_attack,
+            "finished": "GAME OVER PLAYER WINS!",
+        }
+    # If game not over send both player coordinates
+    outcome = events[0]["hit"]
+    return {"hit": outcome, "Player_Turn": player_attack, "AI_Turn": bot_attack}
+
+
+def play_turns(
+    game: m.GameState,
+    player_attacks: list[tuple],
+    publish: Optional[Callable[[dict], None]] = None,
+    budget: Optional[float] = None,
+) -> dict:
+    """Plays a turn for each of the player's attacks in order and returns the outcomes
+
+    The outcome of each turn is in the format returned by play_turn, with message
+    strings returned as {"error": message}. No more turns are played once the game
+    is over, so the outcomes may be fewer than the attacks.
+
+    Keyword arguments:
+    game -- game state containing the "player" and "BOT" boards
+    player_attacks -- a list of tuples containing the coordinates attacked by the player
+    publish -- function called with each event of the turns, or None
+    budget -- seconds the BOT may take to pick each attack, or None for no limit
+    """
+    turns = []
+    finished = None
+    for player_attack in player_attacks:
+        outcome = play_turn(game, player_attack, publish, budget)
+        if outcome == "Game Over":
+            finished = outcome
+            break
+        if isinstance(outcome, str):
+            turns.append({"error": outcome})
+            continue
+        turns.append(outcome)
+        # Stops playing once the game is over
+        if "finished" in outcome:
+            finished = outcome["finished"]
+            break
+    return {"turns": turns, "played": len(turns), "finished": finished}
+
+
+def board_state(
+    game: m.GameState, username: str = "player", since: Optional[int] = None
+) -> dict:
+    """Returns the state of both boards of a game as bitmasks, as seen by a player
+
+    Each bitmask is written as a hexadecimal string, where bit (col * size + row)
+    is set for cell (col, row). The player's own board has masks of its "ships",
+    and the "hits" and "misses" of the shots at it. The opponent's board only has
+    the masks of "hits" and "misses", so its ships are not given away.
+
+    If since is a version returned earlier, only the shots made after it are
+    given, unless the boards have changed since, in which case the full state is
+    given and "full" is True.
+
+    Boards larger than 'models.DECK_MAX_SIZE' have too many cells for a bitmask, so
+    "cells" is True and each board is given as lists of the [col, row] coordinates
+    of its "ships", "hits" and "misses" instead.
+
+    The caller should hold the game's lock, so no turn is played while the state
+    is read.
+
+    Keyword arguments:
+    game -- game state containing the boards of both players
+    username -- the username of the player viewing the boards (default "player")
+    since -- the version of the state already held by the caller (default None)
+    """
+    counts = None if since is None else game.shot_counts(since)
+    state = {"version": game.version(), "size": game.size, "full": counts is None}
+    if game.size > m.DECK_MAX_SIZE:
+        state["cells"] = True
+        return _cell_state(game, username, counts, state)
+    for index, name in enumerate(game.usernames):
+        # The shots at a player's board are made by the opponent
+        shots = game.shots[1 - index]
+        if counts is None:
+            changed = shots.shots
+        else:
+            changed = shots.shots_since(counts[1 - index])
+        board = {
+            "hits": f"{changed & shots.hits:x}",
+            "misses": f"{changed & ~shots.hits:x}",
+        }
+        if name == username and counts is None:
+            # Ships which have been hit are no longer on some boards
+            ships = c.occupied_mask(game.board(name)) | shots.hits
+            board["ships"] = f"{ships:x}"
+        state[name] = board
+    return state
+
+
+def _cell_state(
+    game: m.GameState, username: str, counts: Optional[tuple], state: dict
+) -> dict:
+    """Adds the state of both boards to a state as lists of cells (see board_state)"""
+    size = game.size
+    for index, name in enumerate(game.usernames):
+        # The shots at a player's board are made by the opponent
+        shots = game.shots[1 - index]
+        changed = shots.history[0 if counts is None else counts[1 - index] :]
+        board = {
+            "hits": [divmod(cell, size) for cell in changed if cell in shots.hit_cells],
+            "misses": [
+                divmod(cell, size) for cell in changed if cell not in shots.hit_cells
+            ],
+        }
+        if name == username and counts is None:
+            # Ships which have been hit are no longer on some boards
+            ships = set(c.occupied_cells(game.board(name))) | shots.hit_cells
+            board["ships"] = [divmod(cell, size) for cell in sorted(ships)]
+        state[name] = board
+    return state
+
+
 def ai_opponent_game_loop() -> None:
     """Manual testing game loop for MP"""
 
@@ -44,91 +449,36 @@ def ai_opponent_game_loop() -> None:
     # Asks player for username
     username = str(input("Enter your name...\n"))
 
-    # Initialises the boards and battleships for player and BOT
-    player_board = c.initialise_board(size=size)
-    player_battleships = c.create_battleships()
-
-    bot_board = c.initialise_board(size=size)
-    bot_battleships = c.create_battleships()
-
-    # Saves board and battleships into player dictionaries
-    players[username] = {
-        "board": player_board,
-        "battleships": player_battleships,
-    }
-    players["BOT"] = {
-        "board": bot_board,
-        "battleships": bot_battleships,
-    }
-
-    # Places battleships on each players board
-    players[username]["board"] = c.place_battleships(
-        player_board, player_battleships, algorithm="simple"
+    # Initialises the boards and battleships for player and BOT, placing the
+    # player's battleships on each row and the BOT's battleships randomly
+    game = create_game(
+        size, "compact", username, player_algorithm="simple", bot_algorithm="random"
     )  # must be CUSTOM
-    players["BOT"]["board"] = c.place_battleships(
-        bot_board, bot_battleships, algorithm="random"
-    )
 
     # Game loop
-    game_over = False
-    while game_over is False:
+    while not game.finished:
         # Player's turn
         print("\nYour move.")
-        # Loop to get valid coordinates from user
-        while True:
-            player_attack = ge.cli_coordinates_input()
-            # Checks if coordinates are within range of board
-            if max(player_attack) < size:
-                break
-        # Processes the players coordinates on the BOT's board
-        outcome = ge.attack(
-            player_attack, players["BOT"]["board"], players["BOT"]["battleships"]
-        )
-        # Checks if attack was successful and prints result
-        if outcome is True:
-            print("HIT!")
-        else:
-            print("MISS!")
-
-        # Checks if the BOT's board is empty
-        game_over = all(
-            all(value is None for value in row) for row in players["BOT"]["board"]
-        )
-        # Checks if game is over and announces winner
-        if game_over is True:
-            winner = username.upper()
-            break
-
-        # BOT's turn
-        print("\nBot's move.")
-        # Generates BOT's coordinates
-        bot_attack = generate_attack(size)
-        # Processes the BOT's coordinates on the player's board
-        outcome = ge.attack(
-            bot_attack, players[username]["board"], players[username]["battleships"]
-        )
-        # Checks if BOT attack was successful and prints result
-        if outcome is True:
-            print("BOT HIT!")
-        else:
-            print("BOT MISS!")
+        # Plays the player's move and the BOT's reply
+        events = game.step(ge.cli_coordinates_input())
+        # Asks again for moves which could not be played
+        if events[0]["type"] == "error":
+            print(events[0]["message"])
+            continue
+        # Prints the result of each shot
+        for event in events:
+            if event["type"] == "player_shot":
+                print("HIT!" if event["hit"] else "MISS!")
+            elif event["type"] == "bot_shot":
+                print("\nBot's move.")
+                print("BOT HIT!" if event["hit"] else "BOT MISS!")
         # Prints out players resulting board
-        c.print_player_board(players[username]["board"])
-        # Checks if the player's board is empty
-        game_over = all(
-            all(value is None for value in row) for row in players[username]["board"]
-        )
-        # Checks if game is over and announces BOT as winner
-        if game_over is True:
-            winner = "BOT"
+        c.print_player_board(game.state.board(username))
 
     # Game over message
     print("GAME OVER!")
-    print(f"THE WINNER WAS {winner}!")
-
+    print(f"THE WINNER WAS {game.winner.upper()}!")
 
-# Initialises dictionary to store player data
-players = {}
 
 if __name__ == "__main__":
     ai_opponent_game_loop()
@@ -0,0 +1,312 @@
+"""
+This module contains the NumPy board engine for the Battleships game.
+
+The board is stored as a NumPy array of ship indices, where 0 is an empty cell and
+each ship is numbered from 1 in the order it was placed. Because the whole board is
+one array, the legal starting cells for a ship of any length can be found in one
+vectorized pass using sliding-window sums over the occupancy array, instead of
+checking one candidate position at a time.
+
+The 'NumpyBoard' class exposes the same methods as the other board engines so it can
+be passed to 'place_battleships' and 'attack'. The 'window_sums' function is also
+used to score every candidate placement at once, for example by bots and analytics,
+and 'line_window_sums' gives the same sums along every line of an array at once,
+from the cumulative sums of 'prefix_sums'.
+
+The 'generate_boards' and 'iter_boards' functions build many random fleets at once for
+simulations, placing each ship on every board in the batch with array operations.
+
+NumPy is an optional dependency, it is only needed when this engine is used.
+"""
+
+from typing import Iterator, Optional
+
+import bitboard as bb
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only this engine needs it
+    np = None
+
+
+# Constants
+DOWN = 0
+RIGHT = 1
+# Number of batched random draws for each ship before the remaining boards fall back
+# to picking from their compatible placements one board at a time
+BATCH_ATTEMPTS = 32
+
+
+def prefix_sums(values):
+    """Returns the cumulative sums along the last axis of values, starting from 0"""
+    totals = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,), dtype=np.int64)
+    np.cumsum(values, axis=-1, out=totals[..., 1:])
+    return totals
+
+
+def line_window_sums(lines, length: int):
+    """Returns the sums of every length long window along the last axis of lines
+
+    The result has the same shape as lines, except the last axis has one sum for
+    each window which fits, starting from each cell in turn.
+
+    Keyword arguments:
+    lines -- an array of numbers, with the cells of each line along its last axis
+    length -- the length of each window
+    """
+    # Cumulative sums starting from 0 turn each window into one subtraction
+    totals = prefix_sums(lines)
+    return totals[..., length:] - totals[..., :-length]
+
+
+def window_sums(grid, length: int):
+    """Returns the sums of every length long window of grid in both directions
+
+    The result is a tuple of two arrays the same shape as grid. The value at
+    [col, row] of the first array is the sum of the window going DOWN from (col, row)
+    and the second array is the sum of the window going RIGHT. Windows which would
+    fall off the board are set to -1.
+
+    Keyword arguments:
+    grid -- a square 2D array of numbers
+    length -- the length of each window
+    """
+    size = grid.shape[0]
+    down = np.full(grid.shape, -1, dtype=np.int64)
+    right = np.full(grid.shape, -1, dtype=np.int64)
+    if length > size:
+        return down, right
+    down[: size - length + 1, :] = line_window_sums(grid.T, length).T
+    right[:, : size - length + 1] = line_window_sums(grid, length)
+    return down, right
+
+
+class NumpyBoard:
+    """Board engine storing the board as a NumPy array of ship indices
+
+    Attributes:
+    size -- the size of the board
+    cells -- array of ship indices for each cell (0 is empty)
+    shots -- boolean array of every cell that has been attacked
+    ships -- list of ship names, ship index i + 1 is ships[i]
+    """
+
+    def __init__(self, size: int = 10) -> None:
+        if np is None:
+            raise ImportError("The numpy engine requires NumPy to be installed")
+        self.size = size
+        self.cells = np.zeros((size, size), dtype=np.int16)
+        self.shots = np.zeros((size, size), dtype=bool)
+        self.ships = []
+
+    def __len__(self) -> int:
+        return self.size
+
+    def legal_starts(self, length: int):
+        """Returns boolean arrays of the legal starting cells going DOWN and RIGHT"""
+        free = (self.cells == 0).astype(np.int64)
+        down, right = window_sums(free, int(length))
+        return down == int(length), right == int(length)
+
+    def legal_placements(self, length: int):
+        """Returns an array of every legal (col, row, direction) for a ship of length"""
+        down, right = self.legal_starts(length)
+        placements = [
+            np.column_stack((*np.nonzero(mask), np.full(mask.sum(), direction)))
+            for direction, mask in ((DOWN, down), (RIGHT, right))
+        ]
+        return np.concatenate(placements)
+
+    def score_placements(self, length: int, weights):
+        """Returns the total weight covered by every placement going DOWN and RIGHT
+
+        Placements which are not legal are scored as -1.
+
+        Keyword arguments:
+        length -- the length of the ship
+        weights -- a size * size array of non-negative weights for each cell
+        """
+        down_legal, right_legal = self.legal_starts(length)
+        down, right = window_sums(np.asarray(weights), int(length))
+        return np.where(down_legal, down, -1), np.where(right_legal, right, -1)
+
+    def is_position_occupied(
+        self, col: int, row: int, direction: int, length: int
+    ) -> bool:
+        """Checks if ship can fit and returns True or False"""
+        length = int(length)
+        if col < 0 or row < 0:
+            return False
+        if direction == DOWN:
+            cells = self.cells[col : col + length, row]
+        else:
+            cells = self.cells[col, row : row + length]
+        return len(cells) == length and not cells.any()
+
+    def place_ship(
+        self, ship: str, col: int, row: int, direction: int, length: int
+    ) -> None:
+        """Places a ship onto the board starting at (col, row)"""
+        if not self.is_position_occupied(col, row, direction, length):
+            raise ValueError(f"Ship '{ship}' does not fit on the board")
+        if ship not in self.ships:
+            self.ships.append(ship)
+        index = self.ships.index(ship) + 1
+        if direction == DOWN:
+            self.cells[col : col + int(length), row] = index
+        else:
+            self.cells[col, row : row + int(length)] = index
+
+    def ship_at(self, col: int, row: int) -> Optional[str]:
+        """Returns the name of the ship at (col, row) or None if cell is empty"""
+        index = int(self.cells[col, row])
+        return self.ships[index - 1] if index else None
+
+    def attack(self, col: int, row: int) -> Optional[str]:
+        """Records a shot at (col, row) and returns the ship hit or None"""
+        already_shot = self.shots[col, row]
+        self.shots[col, row] = True
+        if already_shot:
+            return None
+        return self.ship_at(col, row)
+
+    def is_sunk(self, ship: str) -> bool:
+        """Checks if every cell of a ship has been hit"""
+        index = self.ships.index(ship) + 1
+        return bool(self.shots[self.cells == index].all())
+
+    def is_game_over(self) -> bool:
+        """Checks if every ship on the board has been sunk"""
+        return not ((self.cells != 0) & ~self.shots).any()
+
+    def to_list(self) -> list[list]:
+        """Returns the board as a list of lists of ship names that are not hit"""
+        names = [None, *self.ships]
+        afloat = np.where(self.shots, 0, self.cells)
+        return [[names[index] for index in row] for row in afloat.tolist()]
+
+
+def placement_table(size: int, length: int):
+    """Returns the starts and cells of every legal placement of a ship of length
+
+    The result is a tuple of two arrays. The first has one (col, row, direction) row
+    for each placement in 'bitboard.placement_index' and the second has the index
+    (col * size + row) of each cell covered by that placement.
+
+    Keyword arguments:
+    size -- the size of the board
+    length -- the length of the ship
+    """
+    starts = np.array(
+        [placement[1:] for placement in bb.placement_index(size, int(length))],
+        dtype=np.int64,
+    )
+    steps = np.where(starts[:, 2] == DOWN, size, 1)
+    cells = (starts[:, 0] * size + starts[:, 1])[:, None] + steps[:, None] * np.arange(
+        int(length)
+    )
+    return starts, cells
+
+
+def _place_batch(count: int, size: int, lengths: list[int], rng):
+    """Returns random placements of a fleet on count boards at once"""
+    placements = np.empty((count, len(lengths), 3), dtype=np.uint16)
+    occupied = np.zeros((count, size * size), dtype=bool)
+    boards = np.arange(count)
+    for ship, length in enumerate(lengths):
+        starts, cells = placement_table(size, length)
+        choice = np.empty(count, dtype=np.int64)
+        pending = boards
+        # Draws a placement for every board that still needs one and keeps the draws
+        # which do not overlap, this is uniform over the compatible placements
+        for _ in range(BATCH_ATTEMPTS):
+            draws = rng.integers(0, len(starts), size=len(pending))
+            clash = occupied[pending[:, None], cells[draws]].any(axis=1)
+            choice[pending[~clash]] = draws[~clash]
+            pending = pending[clash]
+            if len(pending) == 0:
+                break
+        # Crowded boards pick directly from their compatible placements
+        for board in pending:
+            compatible = np.flatnonzero(~occupied[board][cells].any(axis=1))
+            if len(compatible) == 0:
+                raise ValueError("Battleships cannot all be placed on the board")
+            choice[board] = compatible[rng.integers(0, len(compatible))]
+        occupied[boards[:, None], cells[choice]] = True
+        placements[:, ship] = starts[choice]
+    return placements
+
+
+def iter_boards(
+    n: int,
+    size: int,
+    fleet: dict[str, int],
+    seed: Optional[int] = None,
+    chunk_size: int = 65536,
+) -> Iterator:
+    """Yields random fleet placements for n boards in chunks
+
+    Each chunk is an array of shape (boards, ships, 3) holding the (col, row,
+    direction) of each ship, in the order of the fleet dictionary.
+
+    Keyword arguments:
+    n -- the number of boards to generate
+    size -- the size of each board
+    fleet -- dictionary containing each ship and its length (see create_battleships)
+    seed -- seed for the random number generator (default None)
+    chunk_size -- the maximum number of boards in each chunk (default 65536)
+    """
+    if np is None:
+        raise ImportError("generate_boards requires NumPy to be installed")
+    if n < 0 or chunk_size < 1:
+        raise ValueError("n must not be negative and chunk_size must be positive")
+    rng = np.random.default_rng(seed)
+    lengths = list(fleet.values())
+    # Checks every ship fits on the board before generating anything
+    if any(int(length) < 1 or int(length) > size for length in lengths):
+        raise ValueError("Invalid ship length")
+    for start in range(0, n, chunk_size):
+        yield _place_batch(min(chunk_size, n - start), size, lengths, rng)
+
+
+def generate_boards(
+    n: int, size: int, fleet: dict[str, int], seed: Optional[int] = None
+):
+    """Returns random fleet placements for n boards as one array
+
+    The array has shape (n, ships, 3) and holds the (col, row, direction) of each
+    ship, in the order of the fleet dictionary. Use 'iter_boards' to generate the
+    boards in chunks instead.
+
+    Keyword arguments:
+    n -- the number of boards to generate
+    size -- the size of each board
+    fleet -- dictionary containing each ship and its length (see create_battleships)
+    seed -- seed for the random number generator (default None)
+    """
+    chunks = list(iter_boards(n, size, fleet, seed))
+    if not chunks:
+        return np.empty((0, len(fleet), 3), dtype=np.uint16)
+    return np.concatenate(chunks)
+
+
+def placements_to_cells(placements, size: int, fleet: dict[str, int]):
+    """Returns an array of ship indices for each board of generated placements
+
+    The result has shape (boards, size, size) where 0 is an empty cell and ship index
+    i + 1 is the i-th ship of the fleet dictionary, matching 'NumpyBoard.cells'.
+
+    Keyword arguments:
+    placements -- an array returned by 'generate_boards' or 'iter_boards'
+    size -- the size of each board
+    fleet -- dictionary containing each ship and its length
+    """
+    placements = np.asarray(placements, dtype=np.int64)
+    cells = np.zeros((len(placements), size * size), dtype=np.int8)
+    boards = np.arange(len(placements))[:, None]
+    for ship, length in enumerate(fleet.values()):
+        col, row, direction = placements[:, ship].T
+        steps = np.where(direction == DOWN, size, 1)
+        indices = (col * size + row)[:, None] + steps[:, None] * np.arange(int(length))
+        cells[boards, indices] = ship + 1
+    return cells.reshape(len(placements), size, size)
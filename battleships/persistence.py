@@ -0,0 +1,286 @@
+"""
+This module contains the persistence backends of the game store for the Battleships
+server, so games can be restored after the server restarts.
+
+A game is saved as the battleships of the game, the placement of the ships on each
+player's board, in the same format as placement.json, and every move made in order.
+A game is restored by placing the ships again and replaying the moves.
+
+The 'Persistence' class is the interface of a backend and keeps nothing, it is used
+when the game store has no backend.
+The 'SQLitePersistence' class keeps games in a local SQLite database. Writes are added
+to a queue and committed in batches by a background thread (write-behind), so a
+request never waits for the database to be written to disk. Games are loaded from the
+committed rows with the writes still queued for them laid over the top, so loading a
+game never waits for the queue either.
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class Persistence:
+    """A persistence backend keeping nothing, the interface of every backend"""
+
+    def save_game(
+        self, game_id: str, size: int, engine: str, battleships: dict[str, int]
+    ) -> None:
+        """Saves a new game
+
+        Keyword arguments:
+        game_id -- the ID of the game
+        size -- the size of the boards of the game
+        engine -- the board engine of the game (see components.ENGINES)
+        battleships -- dictionary containing each ship and its length
+        """
+
+    def save_board(self, game_id: str, username: str, placements: dict) -> None:
+        """Saves the placement of the ships on a player's board
+
+        Keyword arguments:
+        game_id -- the ID of the game
+        username -- the username of the player
+        placements -- dictionary containing each ship and its (row, col, direction)
+        """
+
+    def record_move(self, game_id: str, username: str, coordinates: tuple) -> None:
+        """Records a move made by a player, after every earlier move of the game"""
+
+    def delete_game(self, game_id: str) -> None:
+        """Deletes a game and its moves"""
+
+    def load_game(self, game_id: str) -> Optional[dict]:
+        """Returns a saved game or None if there is no such game
+
+        The game is returned as a dictionary containing the "size", "engine" and
+        "battleships" of the game, the "boards" dictionary of each player's
+        placements and the list of "moves" as (username, col, row) in order.
+        """
+        return None
+
+    def flush(self) -> None:
+        """Waits until every write so far has been saved"""
+
+    def close(self) -> None:
+        """Saves every write so far and releases the backend"""
+
+
+# Tables of the SQLite database
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    engine TEXT NOT NULL,
+    battleships TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS boards (
+    game_id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    placements TEXT NOT NULL,
+    PRIMARY KEY (game_id, username)
+);
+CREATE TABLE IF NOT EXISTS moves (
+    move_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    game_id TEXT NOT NULL,
+    username TEXT NOT NULL,
+    col INTEGER NOT NULL,
+    row INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS moves_game ON moves (game_id, move_id);
+"""
+
+
+class SQLitePersistence(Persistence):
+    """A persistence backend keeping games in a local SQLite database
+
+    Writes are queued and a background thread commits them in batches of up to
+    batch_size, waiting up to flush_interval seconds for more writes to join a
+    batch. The database uses write-ahead logging without a sync on every commit,
+    so a crash of the machine may lose the last moments of moves, but never
+    leaves the database corrupted.
+
+    The writes of each game which are queued but not yet committed are also kept
+    in order, so a game can be loaded without waiting for the queue to be written.
+
+    Attributes:
+    path -- the path of the database file
+    batch_size -- the largest number of writes committed together
+    flush_interval -- seconds to wait for more writes before committing a batch
+    failed_batches -- number of batches which could not be written
+    """
+
+    def __init__(
+        self, path: str, batch_size: int = 500, flush_interval: float = 0.05
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.failed_batches = 0
+        self._writes = queue.Queue()
+        # The changes of the queued writes of each game, in the order they were made
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        # Held while committing, so a load sees each write committed or pending once
+        self._commit_lock = threading.Lock()
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+        connection.close()
+        self._writer = threading.Thread(target=self._write_batches, daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns a new connection to the database"""
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _write_batches(self) -> None:
+        """Commits the queued writes in batches until the backend is closed"""
+        connection = self._connect()
+        closed = False
+        while not closed:
+            batch = [self._writes.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Collects more writes to commit together until the batch is due
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                try:
+                    timeout = max(deadline - time.monotonic(), 0)
+                    batch.append(self._writes.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            # None is queued when the backend is closed
+            closed = None in batch
+            writes = [write for write in batch if write is not None]
+            try:
+                for _, _, sql, parameters in writes:
+                    connection.execute(sql, parameters)
+                with self._commit_lock:
+                    connection.commit()
+                    self._settle(writes)
+            except sqlite3.Error:
+                # A failed batch is rolled back, later batches are still written
+                connection.rollback()
+                self.failed_batches += 1
+                with self._commit_lock:
+                    self._settle(writes)
+            finally:
+                for _ in batch:
+                    self._writes.task_done()
+        connection.close()
+
+    def _queue(self, game_id: str, change: tuple, sql: str, parameters: tuple) -> None:
+        """Queues a write and keeps its change pending until it is committed"""
+        with self._pending_lock:
+            self._pending.setdefault(game_id, deque()).append(change)
+        self._writes.put((game_id, change, sql, parameters))
+
+    def _settle(self, writes: list) -> None:
+        """Forgets the pending changes of writes which have been committed or lost"""
+        with self._pending_lock:
+            for game_id, _, _, _ in writes:
+                changes = self._pending[game_id]
+                changes.popleft()
+                if not changes:
+                    del self._pending[game_id]
+
+    def save_game(
+        self, game_id: str, size: int, engine: str, battleships: dict[str, int]
+    ) -> None:
+        game = (size, engine, json.dumps(battleships))
+        self._queue(
+            game_id,
+            ("game", *game),
+            "INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?)",
+            (game_id, *game),
+        )
+
+    def save_board(self, game_id: str, username: str, placements: dict) -> None:
+        placements = json.dumps(placements)
+        self._queue(
+            game_id,
+            ("board", username, placements),
+            "INSERT OR REPLACE INTO boards VALUES (?, ?, ?)",
+            (game_id, username, placements),
+        )
+
+    def record_move(self, game_id: str, username: str, coordinates: tuple) -> None:
+        col, row = coordinates
+        self._queue(
+            game_id,
+            ("move", username, col, row),
+            "INSERT INTO moves (game_id, username, col, row) VALUES (?, ?, ?, ?)",
+            (game_id, username, col, row),
+        )
+
+    def delete_game(self, game_id: str) -> None:
+        for table in ("moves", "boards", "games"):
+            self._queue(
+                game_id,
+                ("delete",),
+                f"DELETE FROM {table} WHERE game_id = ?",
+                (game_id,),
+            )
+
+    def _load_rows(self, game_id: str) -> tuple[Optional[tuple], dict, list]:
+        """Returns the committed game, boards and moves of a game"""
+        connection = self._connect()
+        try:
+            game = connection.execute(
+                "SELECT size, engine, battleships FROM games WHERE game_id = ?",
+                (game_id,),
+            ).fetchone()
+            boards = connection.execute(
+                "SELECT username, placements FROM boards WHERE game_id = ?",
+                (game_id,),
+            ).fetchall()
+            moves = connection.execute(
+                "SELECT username, col, row FROM moves WHERE game_id = ? "
+                "ORDER BY move_id",
+                (game_id,),
+            ).fetchall()
+        finally:
+            connection.close()
+        return game, dict(boards), moves
+
+    def load_game(self, game_id: str) -> Optional[dict]:
+        # Reads the committed rows and the pending changes between two batches
+        with self._commit_lock:
+            game, boards, moves = self._load_rows(game_id)
+            with self._pending_lock:
+                changes = list(self._pending.get(game_id, ()))
+        # Lays the changes still queued over the committed rows, in order
+        for kind, *change in changes:
+            if kind == "game":
+                game = tuple(change)
+            elif kind == "board":
+                boards[change[0]] = change[1]
+            elif kind == "move":
+                moves.append(tuple(change))
+            else:
+                game, boards, moves = None, {}, []
+        if game is None:
+            return None
+        return {
+            "size": game[0],
+            "engine": game[1],
+            "battleships": json.loads(game[2]),
+            "boards": {
+                username: json.loads(placements)
+                for username, placements in boards.items()
+            },
+            "moves": moves,
+        }
+
+    def flush(self) -> None:
+        self._writes.join()
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._writes.put(None)
+            self._writer.join()
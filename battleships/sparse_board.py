@@ -0,0 +1,170 @@
+"""
+This module contains the sparse board engine for the Battleships game.
+
+The other board engines store every cell of the board, which is wasteful for very large
+boards where almost every cell is empty sea. A sparse board only stores the cells that
+contain a ship and the cells that have been attacked, in hash tables keyed by the cell
+index (col * size + row), so its memory scales with the number of ships and shots
+rather than with size * size.
+
+The 'SparseBoard' class exposes the same methods as the other board engines, and allows
+boards far larger than the usual limit of 10, for stress-testing and "big ocean"
+variants. As it would be too large to print every cell, its 'render' method only
+prints the lines of the board which contain a ship or a shot.
+"""
+
+from typing import Optional
+
+
+# Constants
+DOWN = 0
+RIGHT = 1
+
+
+class SparseBoard:
+    """Board engine storing only the occupied and attacked cells of the board
+
+    Attributes:
+    size -- the size of the board
+    cells -- dictionary containing the ship index of every occupied cell
+    shots -- set containing every cell that has been attacked
+    fleet -- list containing the name of each ship, ship index i is fleet[i]
+    health -- list containing the remaining health of each ship
+    remaining -- total health remaining across every ship
+    """
+
+    # Largest board size allowed for this engine
+    max_size = 1_000_000
+
+    def __init__(self, size: int = 10) -> None:
+        self.size = size
+        self.cells = {}
+        self.shots = set()
+        self.fleet = []
+        self.health = []
+        self.remaining = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _ship_cells(
+        self, col: int, row: int, direction: int, length: int
+    ) -> Optional[range]:
+        """Returns the cell indices covered by a ship or None if it is off the board"""
+        length = int(length)
+        if col < 0 or row < 0 or col >= self.size or row >= self.size:
+            return None
+        if direction == DOWN:
+            if col + length > self.size:
+                return None
+            step = self.size
+        else:
+            if row + length > self.size:
+                return None
+            step = 1
+        start = col * self.size + row
+        return range(start, start + step * length, step)
+
+    def is_position_occupied(
+        self, col: int, row: int, direction: int, length: int
+    ) -> bool:
+        """Checks if ship can fit and returns True or False"""
+        cells = self._ship_cells(col, row, direction, length)
+        return cells is not None and not any(cell in self.cells for cell in cells)
+
+    def place_ship(
+        self, ship: str, col: int, row: int, direction: int, length: int
+    ) -> None:
+        """Places a ship onto the board starting at (col, row)"""
+        if not self.is_position_occupied(col, row, direction, length):
+            raise ValueError(f"Ship '{ship}' does not fit on the board")
+        if ship in self.fleet:
+            index = self.fleet.index(ship)
+            self.health[index] += int(length)
+        else:
+            index = len(self.fleet)
+            self.fleet.append(ship)
+            self.health.append(int(length))
+        for cell in self._ship_cells(col, row, direction, length):
+            self.cells[cell] = index
+        self.remaining += int(length)
+
+    def ship_at(self, col: int, row: int) -> Optional[str]:
+        """Returns the name of the ship at (col, row) or None if cell is empty"""
+        index = self.cells.get(col * self.size + row)
+        return None if index is None else self.fleet[index]
+
+    def attack(self, col: int, row: int) -> Optional[str]:
+        """Records a shot at (col, row) and returns the ship hit or None"""
+        cell = col * self.size + row
+        # Checks if cell has already been attacked
+        if cell in self.shots:
+            return None
+        self.shots.add(cell)
+        index = self.cells.get(cell)
+        if index is None:
+            return None
+        self.health[index] -= 1
+        self.remaining -= 1
+        return self.fleet[index]
+
+    def is_sunk(self, ship: str) -> bool:
+        """Checks if every cell of a ship has been hit"""
+        return self.health[self.fleet.index(ship)] == 0
+
+    def is_game_over(self) -> bool:
+        """Checks if every ship on the board has been sunk"""
+        return self.remaining == 0
+
+    def occupied_cells(self):
+        """Returns the index of every cell containing a ship"""
+        return self.cells.keys()
+
+    def to_list(self) -> list[list]:
+        """Returns the board as a list of lists of ship names that are not hit
+
+        This stores every cell, so should only be used for small boards.
+        """
+        board = [[None] * self.size for _ in range(self.size)]
+        for cell, index in self.cells.items():
+            if cell not in self.shots:
+                board[cell // self.size][cell % self.size] = self.fleet[index]
+        return board
+
+    def render(self) -> str:
+        """Returns a text rendering of the lines of the board with a ship or a shot
+
+        Each line is written as 'col: ' followed by runs of cells, where each run is
+        the first and last row of the run and what the cells contain: a ship name,
+        'hit' or 'miss'.
+        """
+        contents = {}
+        for cell, index in self.cells.items():
+            contents[cell] = "hit" if cell in self.shots else self.fleet[index]
+        for cell in self.shots:
+            contents.setdefault(cell, "miss")
+
+        lines = []
+        runs = []
+        previous = None
+        run_start = 0
+        # Groups neighbouring cells with the same contents on each line into runs
+        for cell in sorted(contents):
+            col, row = divmod(cell, self.size)
+            if previous is not None and previous[0] != col:
+                lines.append(f"{previous[0]}: " + ", ".join(runs))
+                runs = []
+            if (
+                previous is not None
+                and previous[0] == col
+                and previous[1] == row - 1
+                and previous[2] == contents[cell]
+            ):
+                runs[-1] = f"{run_start}-{row} {contents[cell]}"
+            else:
+                run_start = row
+                runs.append(f"{row} {contents[cell]}")
+            previous = (col, row, contents[cell])
+        if previous is not None:
+            lines.append(f"{previous[0]}: " + ", ".join(runs))
+        return "\n".join(lines)
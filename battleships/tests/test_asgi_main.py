@@ -0,0 +1,175 @@
+"""
+This module contains unit tests for the 'asgi_main' module of the Battleships game.
+
+It uses pytest to define and run the tests. Requests are sent straight to the ASGI
+application with asyncio, checking it serves the same routes as the Flask server,
+and that requests for the same game play their turns one at a time.
+"""
+
+import asyncio
+import json
+import time
+
+import asgi_main
+from bots import RandomBot
+
+
+async def send_request(method, path, query=b"", cookie=None, body=b""):
+    """Sends one request to the ASGI application and returns the response"""
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query,
+        "headers": headers,
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi_main.app(scope, receive, send)
+    headers = dict(sent[0]["headers"])
+    return sent[0]["status"], headers, sent[1]["body"]
+
+
+def request(method, path, query=b"", cookie=None, body=b""):
+    """Sends one request to the ASGI application in a new event loop"""
+    return asyncio.run(send_request(method, path, query, cookie, body))
+
+
+def game_cookie(headers):
+    """Returns the game ID cookie set by a response"""
+    return headers[b"set-cookie"].decode().split(";")[0]
+
+
+def test_placement_starts_game():
+    """Tests the placement page is rendered and starts a new game"""
+    status, headers, body = request("GET", "/placement")
+    assert status == 200
+    assert b"<html" in body.lower()
+    assert game_cookie(headers).startswith("game_id=")
+
+
+def test_play_game():
+    """Tests a whole game can be played through the attack route"""
+    _, headers, _ = request("GET", "/placement")
+    cookie = game_cookie(headers)
+    status, _, _ = request("GET", "/", cookie=cookie)
+    assert status == 200
+
+    finished = None
+    for x in range(10):
+        for y in range(10):
+            _, _, body = request("GET", "/attack", f"x={x}&y={y}".encode(), cookie)
+            if body == b"Game Over":
+                break
+            outcome = json.loads(body)
+            finished = outcome.get("finished", finished)
+    assert finished is not None
+
+    _, _, body = request("GET", "/attack", b"x=0&y=0", cookie)
+    assert body == b"Game Over"
+
+
+def test_attack_errors():
+    """Tests attacks without a game or with invalid coordinates are rejected"""
+    assert request("GET", "/attack", b"x=0&y=0")[2] == b"No Game Found"
+    _, headers, _ = request("GET", "/placement")
+    cookie = game_cookie(headers)
+    assert request("GET", "/attack", b"x=a&y=0", cookie)[2] == b"Invalid Coordinates"
+    assert request("GET", "/missing")[0] == 404
+
+
+def test_attack_batch():
+    """Tests a batch of attacks is played until the game is over"""
+    _, headers, _ = request("GET", "/placement")
+    cookie = game_cookie(headers)
+    request("GET", "/", cookie=cookie)
+    shots = [[x, y] for x in range(10) for y in range(10)]
+    body = json.dumps({"shots": shots}).encode()
+    status, _, response = request("POST", "/attack/batch", cookie=cookie, body=body)
+    assert status == 200
+    outcome = json.loads(response)
+    assert outcome["finished"] is not None
+    assert outcome["played"] == len(outcome["turns"])
+
+    # Batches longer than a shot at every cell are rejected before playing
+    body = json.dumps({"shots": shots + [[0, 0]]}).encode()
+    assert request("POST", "/attack/batch", cookie=cookie, body=body)[2] == (
+        b"Too Many Shots"
+    )
+
+
+def test_placement_post():
+    """Tests placements are checked and placed on the caller's game"""
+    _, headers, _ = request("GET", "/placement")
+    cookie = game_cookie(headers)
+    placements = {
+        "Carrier": [5, 0, "v"],
+        "Battleship": [6, 0, "v"],
+        "Cruiser": [7, 0, "v"],
+        "Submarine": [8, 0, "v"],
+        "Destroyer": [9, 0, "v"],
+    }
+    body = json.dumps(placements).encode()
+    status, _, response = request("POST", "/placement", cookie=cookie, body=body)
+    assert status == 200
+    assert json.loads(response) == {"Success": True}
+    game = asgi_main.games.get(cookie.split("=")[1])
+    assert game.board("player").ship_at(0, 5) == "Carrier"
+
+    status, _, response = request("POST", "/placement", cookie=cookie, body=b"{}")
+    assert status == 400
+    assert json.loads(response)["Success"] is False
+
+
+def test_state():
+    """Tests the state of the caller's game is returned as bitmasks"""
+    _, headers, _ = request("GET", "/placement")
+    cookie = game_cookie(headers)
+    request("GET", "/", cookie=cookie)
+    _, _, body = request("GET", "/state", cookie=cookie)
+    state = json.loads(body)
+    assert state["full"] is True
+    request("GET", "/attack", query=b"x=0&y=0", cookie=cookie)
+    query = f"since={state['version']}".encode()
+    _, _, body = request("GET", "/state", query=query, cookie=cookie)
+    delta = json.loads(body)["BOT"]
+    assert int(delta["hits"], 16) | int(delta["misses"], 16) == 1
+
+
+def test_turns_of_a_game_played_one_at_a_time():
+    """Tests two attacks on the same game at once play their turns in turn"""
+    _, headers, _ = request("GET", "/placement")
+    cookie = game_cookie(headers)
+    request("GET", "/", cookie=cookie)
+    game = asgi_main.games.get(cookie.split("=", 1)[1])
+    playing = []
+    overlaps = []
+
+    class SlowBot(RandomBot):
+        def choose(self, shots, deadline=None):
+            overlaps.append(len(playing))
+            playing.append(self)
+            time.sleep(0.05)
+            playing.pop()
+            return super().choose(shots, deadline)
+
+    game.bot = SlowBot(10, {})
+
+    async def attack_twice():
+        return await asyncio.gather(
+            send_request("GET", "/attack", b"x=0&y=0", cookie),
+            send_request("GET", "/attack", b"x=1&y=0", cookie),
+        )
+
+    responses = asyncio.run(attack_twice())
+    assert all(status == 200 for status, _, _ in responses)
+    assert overlaps == [0, 0]
+    assert len(game.shots_by("player")) == 2 and len(game.shots_by("BOT")) == 2
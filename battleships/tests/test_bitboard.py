@@ -0,0 +1,172 @@
+"""
+This module contains unit tests for the 'bitboard' module of the Battleships game.
+
+It uses pytest to define and run the tests. The tests check that the 'BitBoard' engine
+works behind the existing 'place_battleships' and 'attack' functions and gives the same
+results as the list of lists board.
+"""
+
+import random
+import time
+
+import pytest
+from components import (
+    initialise_board,
+    place_battleships,
+    check_game_over,
+    board_to_list,
+    DOWN,
+    RIGHT,
+)
+from game_engine import attack
+from bitboard import BitBoard, iter_bits, line_mask, placement_index, sample_fleet
+
+# Ideal battleships
+ideal_ships = {
+    "Carrier": 5,
+    "Battleship": 4,
+    "Cruiser": 3,
+    "Submarine": 3,
+    "Destroyer": 2,
+}
+
+
+# Test line_mask
+# List of different inputs and expected outputs
+@pytest.mark.parametrize(
+    "col, row, direction, length, expected",
+    [
+        (0, 0, RIGHT, 2, 0b11),
+        (0, 0, DOWN, 2, 0b100001),
+        (1, 3, RIGHT, 2, 0b11 << 8),
+        (0, 4, RIGHT, 2, 0),  # Off the right of the board
+        (4, 0, DOWN, 2, 0),  # Off the bottom of the board
+        (-1, 0, DOWN, 2, 0),
+    ],
+)
+def test_line_mask(col, row, direction, length, expected):
+    """Tests line_mask on a 5x5 board"""
+    assert line_mask(5, col, row, direction, length) == expected
+
+
+def test_iter_bits():
+    """Tests iter_bits gives the index of each set bit from the lowest up"""
+    assert list(iter_bits(0)) == []
+    assert list(iter_bits(0b101001)) == [0, 3, 5]
+    assert list(iter_bits(1 << 99)) == [99]
+
+
+def test_initialise_board_engine():
+    """Tests initialise_board returns a BitBoard and rejects unknown engines"""
+    board = initialise_board(10, engine="bitboard")
+    assert isinstance(board, BitBoard)
+    assert len(board) == 10
+    with pytest.raises(ValueError):
+        initialise_board(10, engine="test")
+
+
+@pytest.mark.parametrize("algorithm", ["simple", "random"])
+def test_place_battleships_matches_list(algorithm):
+    """Tests every ship cell is placed on the BitBoard"""
+    board = place_battleships(initialise_board(engine="bitboard"), ideal_ships, algorithm)
+    cells = board_to_list(board)
+    for ship, length in ideal_ships.items():
+        assert sum(row.count(ship) for row in cells) == length
+    if algorithm == "simple":
+        assert cells == place_battleships(initialise_board(), ideal_ships, algorithm)
+
+
+def test_attack_and_game_over():
+    """Tests attack, sunk detection and game over on a BitBoard"""
+    board = initialise_board(5, engine="bitboard")
+    battleships = {"Destroyer": 2}
+    place_battleships(board, battleships)
+    players = {"player": {"board": board, "battleships": battleships}}
+
+    assert attack((4, 4), board, battleships) is False
+    assert attack((0, 0), board, battleships) is True
+    assert board.is_sunk("Destroyer") is False
+    # Attacking the same cell again is a miss
+    assert attack((0, 0), board, battleships) is False
+    assert check_game_over("player", players) is False
+    assert attack((0, 1), board, battleships) is True
+    assert board.is_sunk("Destroyer") is True
+    assert check_game_over("player", players) is True
+    assert board.hits == 0b11
+    assert board.misses == 1 << 24
+
+
+def test_placement_index():
+    """Tests the placement index lists every legal placement once and is cached"""
+    placements = placement_index(10, 5)
+    # 6 starting positions in each of 10 lines in each of 2 directions
+    assert len(placements) == 6 * 10 * 2
+    assert len({mask for mask, _, _, _ in placements}) == len(placements)
+    assert placement_index(10, 5) is placements
+
+
+def test_sample_fleet_no_overlaps():
+    """Tests sample_fleet places every ship without overlapping"""
+    placements = sample_fleet(10, list(ideal_ships.values()))
+    occupied = 0
+    for mask, _, _, _ in placements:
+        assert mask & occupied == 0
+        occupied |= mask
+    assert bin(occupied).count("1") == sum(ideal_ships.values())
+
+
+def test_sample_fleet_unplaceable():
+    """Tests sample_fleet reports a fleet which cannot fit instead of looping"""
+    # Five ships of 5 only fit on a 5x5 board in parallel lines
+    assert sample_fleet(5, [5, 5, 5, 5, 5]) is not None
+    assert sample_fleet(5, [5, 5, 5, 5, 5, 1]) is None
+    # Enough free cells for a ship of 2, but none of them are next to each other
+    occupied = (1 << 25) - 1 - (1 << 0) - (1 << 2) - (1 << 4) - (1 << 12)
+    assert sample_fleet(5, [2], occupied) is None
+    battleships = {"A": 5, "B": 5, "C": 5, "D": 4, "E": 4, "F": 3}
+    with pytest.raises(ValueError):
+        place_battleships(initialise_board(5), battleships, "random")
+
+
+def test_sample_fleet_crowded():
+    """Tests crowded fleets which fit are placed, filling every cell of the board"""
+    for size, lengths in ((10, [5] * 20), (8, [2] * 32), (6, [3] * 12)):
+        placements = sample_fleet(size, lengths)
+        assert [bin(mask).count("1") for mask, _, _, _ in placements] == lengths
+        occupied = 0
+        for mask, _, _, _ in placements:
+            assert mask & occupied == 0
+            occupied |= mask
+        assert occupied == (1 << (size * size)) - 1
+    board = place_battleships(
+        initialise_board(10), {f"s{i}": 5 for i in range(20)}, "random"
+    )
+    assert all(cell is not None for line in board_to_list(board) for cell in line)
+
+
+def test_sample_fleet_infeasible():
+    """Tests fleets which cannot fit are reported without an unbounded search"""
+    start = time.perf_counter()
+    # Ships of 4 cannot tile a 6x6 board, although there are enough cells
+    assert sample_fleet(6, [4] * 9) is None
+    with pytest.raises(ValueError):
+        place_battleships(
+            initialise_board(6), {f"s{i}": 4 for i in range(9)}, "random"
+        )
+    # A search which runs out of steps without a proof is not reported as one
+    with pytest.raises(RuntimeError):
+        sample_fleet(10, [4] * 25, steps=100)
+    assert time.perf_counter() - start < 5
+
+
+def test_sample_fleet_tight_fleets_always_placed():
+    """Tests fleets which only just fit are placed whatever the random generator"""
+    for seed in range(20):
+        for size, lengths in ((10, [3] * 33), (7, [3] * 16)):
+            placements = sample_fleet(size, lengths, rng=random.Random(seed))
+            assert placements is not None
+            occupied = 0
+            for mask, _, _, _ in placements:
+                assert mask & occupied == 0
+                occupied |= mask
+            assert bin(occupied).count("1") == sum(lengths)
@@ -0,0 +1,312 @@
+"""
+This module contains unit tests for the 'bots' module of the Battleships game.
+
+It uses pytest to define and run the tests. The tests check the hunt/target BOT only
+attacks the parity pattern while hunting, targets the neighbours of its hits, goes
+back to hunting once the ships it hit are sunk, and sinks a fleet in fewer shots than
+attacking at random. They also check the density BOT's heatmaps, updated after each
+shot, match heatmaps counted from scratch, and that it beats the hunt/target BOT, and
+that the Monte Carlo BOT only samples fleets consistent with its shots and answers by
+its deadline, with one process pool shared by BOTs moving at once. Difficulty
+tiers and the sharing of the move budget are also checked.
+"""
+
+import random
+import statistics
+import threading
+import time
+
+import pytest
+
+from bots import (
+    DensityBot,
+    HuntTargetBot,
+    MonteCarloBot,
+    MoveBudget,
+    RandomBot,
+    _line_density,
+    _process_pool,
+    create_bot,
+    sample_occupancy,
+)
+from components import create_battleships, initialise_board, place_battleships
+from models import GameState, ShotTracker, SparseShotTracker
+import mp_game_engine as mge
+
+
+def play_bot(strategy: str) -> int:
+    """Plays the BOT against a randomly placed fleet and returns the shots taken"""
+    battleships = create_battleships()
+    board = place_battleships(initialise_board(10, "compact"), battleships, "random")
+    game = GameState(10)
+    game.add_player("player", board, battleships)
+    game.add_player("BOT", initialise_board(10, "compact"), battleships)
+    game.bot = create_bot(strategy, 10, battleships)
+    while not game.is_game_over("player"):
+        mge.resolve_shot(game, "BOT", mge.generate_bot_attack(game))
+    return len(game.shots_by("BOT"))
+
+
+def test_create_bot():
+    """Tests BOTs are created by strategy name"""
+    assert isinstance(create_bot("random", 10, {"Destroyer": 2}), RandomBot)
+    assert isinstance(create_bot("hunt_target", 10, {"Destroyer": 2}), HuntTargetBot)
+    with pytest.raises(ValueError):
+        create_bot("unknown", 10, {"Destroyer": 2})
+
+
+def test_hunt_uses_parity():
+    """Tests the BOT only attacks cells of the parity pattern while hunting"""
+    bot = HuntTargetBot(10, {"Cruiser": 3, "Destroyer": 2})
+    shots = ShotTracker(10)
+    assert bot.untried == 50
+    assert bot.deck.itemsize == bot.positions.itemsize == 2
+    # Recording a miss off the pattern leaves the hunting cells untouched
+    bot.record((0, 1), False, None)
+    assert bot.untried == 50
+    for _ in range(50):
+        col, row = bot.choose(shots)
+        assert (col + row) % 2 == 0
+        shots.add((col, row))
+        bot.record((col, row), False, None)
+    assert bot.untried == 0
+    # Once the pattern is used up any untried cell is attacked
+    assert (sum(bot.choose(shots))) % 2 == 1
+
+
+def test_hunt_on_large_board():
+    """Tests the BOT hunts large boards on the parity pattern without a deck"""
+    bot = HuntTargetBot(20000, {"Cruiser": 3, "Destroyer": 2})
+    assert bot.deck is None and len(bot.positions) == 0
+    shots = SparseShotTracker(20000)
+    for _ in range(100):
+        col, row = bot.choose(shots)
+        assert (col + row) % 2 == 0
+        assert shots.add((col, row))
+        bot.record((col, row), False, None)
+
+
+def test_targets_neighbours_until_sunk():
+    """Tests the BOT attacks the neighbours of a hit and then goes back to hunting"""
+    bot = HuntTargetBot(10, {"Destroyer": 2, "Cruiser": 3})
+    shots = ShotTracker(10)
+    shots.add((4, 4))
+    bot.record((4, 4), True, None)
+    neighbours = {(3, 4), (5, 4), (4, 3), (4, 5)}
+    target = bot.choose(shots)
+    assert target in neighbours
+    shots.add(target)
+    bot.record(target, True, "Destroyer")
+    assert bot.targets == []
+    assert bot.wounded == 0
+
+
+def test_hunt_target_beats_random():
+    """Tests the hunt/target BOT sinks a fleet in fewer shots than the random BOT"""
+    random.seed(0)
+    hunt_target = statistics.mean(play_bot("hunt_target") for _ in range(100))
+    random_shots = statistics.mean(play_bot("random") for _ in range(100))
+    assert hunt_target < 70 < random_shots
+
+
+def test_density_updates_match_full_count():
+    """Tests the density updated after each shot equals the density counted again"""
+    np = pytest.importorskip("numpy")
+    random.seed(1)
+    battleships = create_battleships()
+    board = place_battleships(initialise_board(10, "compact"), battleships, "random")
+    game = GameState(10)
+    game.add_player("player", board, battleships)
+    game.add_player("BOT", initialise_board(10, "compact"), battleships)
+    game.bot = create_bot("density", 10, battleships)
+    for _ in range(30):
+        mge.resolve_shot(game, "BOT", mge.generate_bot_attack(game))
+        # Counts the density of every line of the board from scratch
+        bot = game.bot
+        lines = np.concatenate((bot.marks.transpose(0, 2, 1), bot.marks), axis=1)
+        counted = sum(
+            count * bot._cells(_line_density(lines, length))
+            for count, length in zip(bot._counts, bot._lengths)
+        )
+        assert (counted == bot._total).all()
+
+
+def test_density_targets_hits():
+    """Tests the density BOT attacks next to a hit on a ship which is not sunk"""
+    pytest.importorskip("numpy")
+    bot = DensityBot(10, {"Destroyer": 2, "Cruiser": 3})
+    shots = ShotTracker(10)
+    shots.add((4, 4))
+    bot.record((4, 4), True, None)
+    target = bot.choose(shots)
+    assert target in {(3, 4), (5, 4), (4, 3), (4, 5)}
+    shots.add(target)
+    bot.record(target, True, "Destroyer")
+    # The sunk ship's cells are blocked and the BOT goes back to hunting
+    assert bot.wounded == 0
+    assert bot.marks[0, 4, 4] == 1 and bot.marks[1].sum() == 0
+
+
+def test_density_beats_hunt_target():
+    """Tests the density BOT sinks a fleet in fewer shots than the hunt/target BOT"""
+    pytest.importorskip("numpy")
+    random.seed(0)
+    density = statistics.mean(play_bot("density") for _ in range(50))
+    hunt_target = statistics.mean(play_bot("hunt_target") for _ in range(50))
+    assert density < hunt_target
+
+
+def test_sampled_fleets_fit_shots():
+    """Tests sampled fleets avoid blocked cells and cover every hit"""
+    blocked = 1 << 0 | 1 << 11
+    hits = 1 << 55
+    counts, kept = sample_occupancy(10, [5, 4, 3], blocked, hits, 200, time.time() + 5)
+    assert kept > 0
+    assert counts[0] == counts[11] == 0
+    assert counts[55] == kept
+    assert sum(counts) == kept * 12
+
+
+def test_monte_carlo_targets_hits():
+    """Tests the Monte Carlo BOT attacks next to a hit and blocks sunk ships"""
+    battleships = {"Destroyer": 2, "Cruiser": 3}
+    bot = MonteCarloBot(10, battleships, samples=200, workers=0, cache=None)
+    shots = ShotTracker(10)
+    shots.add((4, 4))
+    bot.record((4, 4), True, None)
+    target = bot.choose(shots)
+    assert bot.last_samples > 0
+    assert target in {(3, 4), (5, 4), (4, 3), (4, 5)}
+    shots.add(target)
+    bot.record(target, True, "Destroyer")
+    assert bot.hits == 0
+    assert bot.remaining == [3]
+    assert bot.blocked >> 44 & 1
+
+
+def test_monte_carlo_degrades_without_time():
+    """Tests the Monte Carlo BOT still moves when it has no time to sample"""
+    bot = MonteCarloBot(
+        10, {"Destroyer": 2}, budget=0, workers=0, cache=None
+    )
+    shots = ShotTracker(10)
+    col, row = bot.choose(shots)
+    assert bot.last_samples == 0
+    assert (col + row) % 2 == 0
+
+
+def test_monte_carlo_process_pool():
+    """Tests the Monte Carlo BOT gathers samples from its process pool"""
+    bot = MonteCarloBot(
+        10, create_battleships(), samples=100, budget=5, workers=2, cache=None
+    )
+    shots = ShotTracker(10)
+    col, row = bot.choose(shots)
+    assert bot.last_samples == 100
+    assert 0 <= col < 10 and 0 <= row < 10
+
+
+def test_process_pool_created_once(monkeypatch):
+    """Tests BOTs asking for a new process pool at once all share a single pool"""
+    created = []
+
+    class SlowPool:
+        """A pool which is slow to start, so every thread asks for it at once"""
+
+        def __init__(self, max_workers, initializer):
+            time.sleep(0.05)
+            created.append(self)
+
+    monkeypatch.setattr("bots.ProcessPoolExecutor", SlowPool)
+    monkeypatch.setattr("bots._POOLS", {})
+    pools = []
+    threads = [
+        threading.Thread(target=lambda: pools.append(_process_pool(3)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert all(pool is created[0] for pool in pools)
+
+
+def test_seeded_monte_carlo_reproducible():
+    """Tests a seeded Monte Carlo BOT chooses the same cells with or without workers"""
+    choices = []
+    for workers in (0, 2):
+        bot = MonteCarloBot(
+            10,
+            create_battleships(),
+            samples=200,
+            budget=30,
+            workers=workers,
+            rng=random.Random(3),
+        )
+        shots = ShotTracker(10)
+        moves = []
+        for _ in range(3):
+            coordinates = bot.choose(shots)
+            shots.add(coordinates)
+            bot.record(coordinates, False, None)
+            moves.append(coordinates)
+        choices.append(moves)
+    assert choices[0] == choices[1]
+
+
+def test_seeded_monte_carlo_ignores_clock():
+    """Tests a seeded Monte Carlo BOT samples every fleet even past its deadline"""
+    moves = []
+    for budget, deadline in ((30, None), (0.000001, time.time() - 1)):
+        bot = MonteCarloBot(
+            10,
+            create_battleships(),
+            samples=100,
+            budget=budget,
+            workers=0,
+            rng=random.Random(5),
+        )
+        moves.append(bot.choose(ShotTracker(10), deadline))
+        assert bot.last_samples == 100
+    assert moves[0] == moves[1]
+
+
+def test_difficulty_tiers():
+    """Tests difficulty tiers create BOTs with the budgets of their tier"""
+    assert isinstance(create_bot("easy", 10, {"Destroyer": 2}), RandomBot)
+    assert isinstance(create_bot("medium", 10, {"Destroyer": 2}), HuntTargetBot)
+    hard = create_bot("hard", 10, {"Destroyer": 2})
+    expert = create_bot("expert", 10, {"Destroyer": 2})
+    assert isinstance(expert, MonteCarloBot)
+    assert hard.budget < expert.budget and hard.samples < expert.samples
+
+
+def test_monte_carlo_meets_deadline():
+    """Tests the Monte Carlo BOT returns its best move by the deadline"""
+    bot = MonteCarloBot(
+        10, create_battleships(), samples=10**6, budget=5, workers=0, cache=None
+    )
+    shots = ShotTracker(10)
+    start = time.time()
+    bot.choose(shots, start + 0.03)
+    assert time.time() - start < 0.5
+    assert 0 < bot.last_samples < 10**6
+    # A deadline already passed leaves no time to sample
+    bot.choose(shots, start)
+    assert bot.last_samples == 0
+
+
+def test_move_budget_shares_time():
+    """Tests each BOT move gets a smaller share of the budget as load grows"""
+    budget = MoveBudget(0.05, minimum=0.015)
+    with budget.reserve() as first:
+        assert first == 0.05
+        with budget.reserve() as second:
+            assert second == 0.025
+            assert budget.active == 2
+            with budget.reserve() as third, budget.reserve() as fourth:
+                assert third == pytest.approx(0.05 / 3)
+                # Shares below the minimum are not worth searching with
+                assert fourth == 0.0
+    assert budget.active == 0
@@ -16,6 +16,7 @@ different inputs and expected outputs.
 """
 
 import pytest
+import components
 from components import initialise_board, create_battleships, place_battleships
 
 # Ideal 10x10 board
@@ -233,3 +234,120 @@ def test_place_battleships_output():
     assert all(isinstance(row, list) for row in board)
     # Checks that there are some string values in the board
     assert any(any(isinstance(element, str) for element in row) for row in board)
+
+
+# Test the cached loading of create_battleships and load_placements
+def test_create_battleships_cached(tmp_path, monkeypatch):
+    """
+    Test create_battleships only reads a file again once it has changed
+    and returns a new dictionary each time
+    """
+    # Checks for changes on every call
+    monkeypatch.setattr(components, "FILE_CHECK_INTERVAL", 0)
+    fleet_file = tmp_path / "fleet.txt"
+    fleet_file.write_text("Destroyer:2\n")
+
+    first = create_battleships(str(fleet_file))
+    first["Destroyer"] = 0
+    assert create_battleships(str(fleet_file)) == {"Destroyer": 2}
+
+    # Edits to the file are picked up
+    fleet_file.write_text("Destroyer:2\nCruiser:3\n")
+    assert create_battleships(str(fleet_file)) == {"Destroyer": 2, "Cruiser": 3}
+
+
+def test_create_battleships_no_io_when_cached(tmp_path, monkeypatch):
+    """
+    Test create_battleships does no filesystem I/O while the file is cached
+    """
+    fleet_file = tmp_path / "fleet.txt"
+    fleet_file.write_text("Destroyer:2\n")
+    create_battleships(str(fleet_file))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("file was read")
+
+    monkeypatch.setattr(components.os, "stat", fail)
+    monkeypatch.setattr("builtins.open", fail)
+    assert create_battleships(str(fleet_file)) == {"Destroyer": 2}
+
+    # Clearing the cache reads the file again
+    components.clear_file_cache(str(fleet_file))
+    with pytest.raises(AssertionError):
+        create_battleships(str(fleet_file))
+
+
+def test_load_placements_read_only(tmp_path):
+    """
+    Test load_placements returns placements which cannot be changed
+    """
+    placement_file = tmp_path / "placement.json"
+    placement_file.write_text('{"Destroyer": ["0", "1", "h"]}')
+    placements = components.load_placements(str(placement_file))
+    assert placements["Destroyer"] == ("0", "1", "h")
+    with pytest.raises(TypeError):
+        placements["Destroyer"] = ("0", "0", "v")
+
+
+# Test the in-memory placements used by the custom algorithm
+@pytest.mark.parametrize(
+    "placements, expected",
+    [
+        ({"Destroyer": ["0", "1", "h"], "Cruiser": [2, 3, "v"]}, None),
+        ({"Destroyer": ["0", "1", "h"]}, ValueError),
+        ({"Destroyer": [0, 1, "h"], "Cruiser": [0, 1, "v"]}, ValueError),
+        ({"Destroyer": [9, 0, "h"], "Cruiser": [0, 1, "v"]}, ValueError),
+        ({"Destroyer": [0, 0, "x"], "Cruiser": [0, 1, "v"]}, ValueError),
+        ({"Destroyer": "01h", "Cruiser": [0, 1, "v"]}, ValueError),
+        ([["Destroyer", 0, 0, "h"]], TypeError),
+    ],
+)
+def test_validate_placements(placements, expected):
+    """
+    Test validate_placements accepts placements which fit without overlapping
+    and raises errors for any other placements
+    """
+    battleships = {"Destroyer": 2, "Cruiser": 3}
+    if expected is None:
+        valid = components.validate_placements(placements, battleships, 10)
+        assert valid == {"Destroyer": (0, 1, "h"), "Cruiser": (2, 3, "v")}
+    else:
+        with pytest.raises(expected):
+            components.validate_placements(placements, battleships, 10)
+
+
+def test_seeded_placement_reproducible():
+    """Tests the streams of a seed are reproducible and place fleets the same way"""
+    first, second = components.spawn_rngs(42, 2)
+    assert [rng.random() for rng in components.spawn_rngs(42, 2)] == [
+        first.random(),
+        second.random(),
+    ]
+    # Streams of the same seed are independent of each other
+    assert components.spawn_rngs(42, 2)[0].random() != second.random()
+    boards = [
+        place_battleships(
+            initialise_board(), create_battleships(), "random", rng=rng
+        )
+        for rng in (components.spawn_rngs(1, 1)[0], components.spawn_rngs(1, 1)[0])
+    ]
+    assert components.board_to_list(boards[0]) == components.board_to_list(boards[1])
+
+
+def test_place_battleships_custom_in_memory(monkeypatch):
+    """
+    Test the custom algorithm places given placements without reading placement.json
+    """
+
+    def fail(*args, **kwargs):
+        raise AssertionError("placement.json was read")
+
+    monkeypatch.setattr(components, "load_placements", fail)
+    board = place_battleships(
+        initialise_board(10),
+        {"Destroyer": 2, "Cruiser": 3},
+        algorithm="custom",
+        placements={"Destroyer": (0, 1, "h"), "Cruiser": (2, 3, "v")},
+    )
+    assert board[1][0] == board[1][1] == "Destroyer"
+    assert board[3][2] == board[4][2] == board[5][2] == "Cruiser"
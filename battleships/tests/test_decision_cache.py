@@ -0,0 +1,108 @@
+"""
+This module contains unit tests for the 'decision_cache' module of the Battleships
+game.
+
+It uses pytest to define and run the tests. The tests check mirrored positions share
+a canonical key, cached cells are mapped back through the symmetry of each position,
+the LRU and LFU policies evict the right entries within the memory cap, and the Monte
+Carlo BOT answers a position seen before without sampling, but only caches moves
+chosen from every sample.
+"""
+
+import time
+
+import pytest
+
+import decision_cache as dc
+from bots import MonteCarloBot
+from models import ShotTracker
+
+
+def test_mirrored_positions_share_key():
+    """Tests every rotation and reflection of a position has the same key"""
+    blocked = 1 << (0 * 10 + 1) | 1 << (2 * 10 + 7)
+    hits = 1 << (5 * 10 + 3)
+    key, _ = dc.canonical_position(10, blocked, hits, [3, 2])
+    for bits, _ in dc.symmetries(10):
+        moved = dc.canonical_position(
+            10, dc._transform(blocked, bits), dc._transform(hits, bits), [2, 3]
+        )
+        assert moved[0] == key
+    # A different position has a different key
+    assert dc.canonical_position(10, blocked, 0, [3, 2])[0] != key
+
+
+def test_cells_map_back_through_symmetry():
+    """Tests a cell cached for a position is mapped back onto its mirror image"""
+    assert len(dc.symmetries(10)) == 8
+    for index in range(8):
+        for cell in (0, 9, 37, 99):
+            canonical = dc.to_canonical(10, cell, index)
+            assert dc.from_canonical(10, canonical, index) == cell
+
+
+def test_lru_eviction():
+    """Tests the least recently used entry is evicted at the memory cap"""
+    entry = dc._entry_size((10, (2,), 0, 0), 0)
+    cache = dc.DecisionCache(max_bytes=entry * 2, policy="lru")
+    cache.put((10, (2,), 0, 0), 1)
+    cache.put((10, (2,), 1, 0), 2)
+    assert cache.get((10, (2,), 0, 0)) == 1
+    cache.put((10, (2,), 2, 0), 3)
+    assert cache.get((10, (2,), 1, 0)) is None
+    assert cache.get((10, (2,), 0, 0)) == 1
+    assert len(cache) == 2 and cache.evictions == 1
+    assert cache.size <= cache.max_bytes
+    assert cache.hit_rate == pytest.approx(2 / 3)
+
+
+def test_lfu_eviction():
+    """Tests the least frequently used entry is evicted at the memory cap"""
+    entry = dc._entry_size((10, (2,), 0, 0), 0)
+    cache = dc.DecisionCache(max_bytes=entry * 2, policy="lfu")
+    cache.put((10, (2,), 0, 0), 1)
+    cache.put((10, (2,), 1, 0), 2)
+    cache.get((10, (2,), 0, 0))
+    cache.get((10, (2,), 0, 0))
+    cache.get((10, (2,), 1, 0))
+    # The second entry was used less, although more recently
+    cache.put((10, (2,), 2, 0), 3)
+    assert cache.get((10, (2,), 1, 0)) is None
+    assert cache.get((10, (2,), 0, 0)) == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalid_policy():
+    """Tests an unknown eviction policy is rejected"""
+    with pytest.raises(ValueError):
+        dc.DecisionCache(policy="fifo")
+
+
+def test_bot_reuses_cached_decision():
+    """Tests the Monte Carlo BOT answers a mirrored position from the cache"""
+    cache = dc.DecisionCache()
+    battleships = {"Destroyer": 2, "Cruiser": 3}
+    first = MonteCarloBot(10, battleships, samples=100, workers=0, cache=cache)
+    first.record((0, 0), False, None)
+    col, row = first.choose(ShotTracker(10))
+    assert first.last_samples > 0
+
+    # The same position reflected across the board
+    second = MonteCarloBot(10, battleships, samples=100, workers=0, cache=cache)
+    second.record((9, 9), False, None)
+    shots = ShotTracker(10)
+    shots.add((9, 9))
+    assert second.choose(shots) == (9 - col, 9 - row)
+    assert second.last_samples == 0
+    assert cache.hits == 1
+
+
+def test_bot_skips_caching_cut_short_moves():
+    """Tests a move picked from fewer samples at its deadline is not cached"""
+    cache = dc.DecisionCache()
+    bot = MonteCarloBot(
+        10, {"Destroyer": 2, "Cruiser": 3}, samples=10**6, workers=0, cache=cache
+    )
+    bot.choose(ShotTracker(10), time.time() + 0.05)
+    assert 0 < bot.last_samples < 10**6
+    assert len(cache) == 0
@@ -0,0 +1,101 @@
+"""
+This module contains unit tests for the 'events' module of the Battleships game.
+
+It uses pytest to define and run the tests. The tests check that events are only sent
+to the subscribers of their own game, that a full queue drops its oldest events, and
+that the '/events' route in 'main' streams the events of a game, ending straight
+away for a game which is already over.
+"""
+
+import json
+
+from events import EventBus, format_event
+import main
+
+
+def test_publish_to_subscribers():
+    """Tests events are only sent to subscribers of the same game"""
+    bus = EventBus()
+    first = bus.subscribe("first")
+    second = bus.subscribe("second")
+    bus.publish("first", {"type": "hit"})
+    assert first.get(timeout=0) == {"type": "hit"}
+    assert first.get(timeout=0) is None
+    assert second.get(timeout=0) is None
+    bus.unsubscribe(first)
+    assert bus.subscribers("first") == 0
+    assert bus.subscribers("second") == 1
+
+
+def test_full_queue_drops_oldest():
+    """Tests a slow subscriber only keeps the newest events"""
+    bus = EventBus(queue_size=2)
+    subscription = bus.subscribe("game")
+    for i in range(5):
+        bus.publish("game", {"type": "player_shot", "turn": i})
+    assert subscription.dropped == 3
+    assert subscription.get(timeout=0)["turn"] == 3
+    assert subscription.get(timeout=0)["turn"] == 4
+
+
+def test_format_event():
+    """Tests events are formatted as server-sent event messages"""
+    message = format_event({"type": "sunk", "ship": "Cruiser"})
+    assert message.startswith("event: sunk\ndata: ")
+    assert message.endswith("\n\n")
+    assert json.loads(message.split("data: ")[1]) == {"type": "sunk", "ship": "Cruiser"}
+
+
+def next_event(stream) -> str:
+    """Returns the next event message of a stream, skipping keep-alive comments"""
+    while True:
+        message = next(stream).decode()
+        if not message.startswith(":"):
+            return message
+
+
+def test_events_route(monkeypatch):
+    """Tests the '/events' route streams the events of the caller's game"""
+    monkeypatch.setattr(main, "EVENT_KEEPALIVE", 0.01)
+    client = main.app.test_client()
+    client.get("/placement")
+    client.get("/")
+    response = client.get("/events", buffered=False)
+    assert response.mimetype == "text/event-stream"
+    stream = response.response
+
+    assert client.get("/attack?x=0&y=0").is_json
+    message = next_event(stream)
+    assert message.startswith("event: player_shot")
+    assert json.loads(message.split("data: ")[1])["coordinates"] == [0, 0]
+    # A hit on the BOT is published before the BOT's shot
+    message = next_event(stream)
+    if message.startswith("event: hit"):
+        message = next_event(stream)
+    assert message.startswith("event: bot_shot")
+    response.close()
+
+
+def test_events_route_game_over(monkeypatch):
+    """Tests the stream ends once the game is over and spectators can follow a game"""
+    monkeypatch.setattr(main, "EVENT_KEEPALIVE", 0.01)
+    client = main.app.test_client()
+    client.get("/placement")
+    client.get("/")
+    game_id = client.get_cookie(main.GAME_COOKIE).value
+    spectator = main.app.test_client()
+    response = spectator.get(f"/events?game={game_id}", buffered=False)
+
+    shots = [[x, y] for x in range(10) for y in range(10)]
+    assert client.post("/attack/batch", json={"shots": shots}).json["finished"]
+    messages = b"".join(response.response).decode()
+    assert messages.rstrip().split("\n\n")[-1].startswith("event: game_over")
+    assert "event: sunk" in messages
+    assert main.events.subscribers(game_id) == 0
+    assert spectator.get("/events?game=unknown").data == b"No Game Found"
+
+    # Following the finished game sends its game over event and ends the stream
+    messages = spectator.get(f"/events?game={game_id}").data.decode()
+    assert messages.startswith("event: game_over")
+    assert json.loads(messages.split("data: ")[1])["winner"] in ("player", "BOT")
+    assert main.events.subscribers(game_id) == 0
@@ -0,0 +1,50 @@
+"""
+This module contains unit tests for the 'fleet' module of the Battleships game.
+
+It uses pytest to define and run the tests. The tests check that the 'Fleet' game
+state keeps integer health for each ship, and that 'attack' and 'check_game_over'
+use it instead of scanning the board.
+"""
+
+from components import initialise_board, place_battleships, check_game_over
+from game_engine import attack
+from fleet import Fleet
+
+
+def test_fleet_hit():
+    """Tests hit updates the health, sunk count and remaining health"""
+    fleet = Fleet({"Cruiser": 3, "Destroyer": 2})
+    assert fleet.remaining == 5
+    assert fleet.hit("Destroyer") is False
+    assert fleet["Destroyer"] == 1
+    assert fleet.hit("Destroyer") is True
+    assert fleet.is_sunk("Destroyer") is True
+    # Hits on a sunk ship are ignored
+    assert fleet.hit("Destroyer") is True
+    assert fleet.status() == {"Cruiser": 3, "Destroyer": 0}
+    assert fleet.remaining == 3
+    assert fleet.sunk == 1
+    assert fleet.is_game_over() is False
+
+
+def test_attack_updates_fleet():
+    """Tests attack keeps the fleet health as integers and ends the game"""
+    battleships = {"Destroyer": 2}
+    board = place_battleships(initialise_board(5), battleships)
+    fleet = Fleet(battleships)
+    players = {"player": {"board": board, "battleships": fleet}}
+
+    assert attack((0, 0), board, fleet) is True
+    assert fleet["Destroyer"] == 1
+    assert isinstance(fleet["Destroyer"], int)
+    assert check_game_over("player", players) is False
+    assert attack((0, 1), board, fleet) is True
+    assert check_game_over("player", players) is True
+
+
+def test_attack_dictionary_health_is_integer():
+    """Tests attack stores the health of a battleships dictionary as an integer"""
+    battleships = {"Destroyer": 2}
+    board = place_battleships(initialise_board(5), battleships)
+    attack((0, 0), board, battleships)
+    assert battleships["Destroyer"] == 1
@@ -0,0 +1,190 @@
+"""
+This module contains unit tests for the 'game_store' module of the Battleships game.
+
+It uses pytest to define and run the tests. The tests check that games are kept
+separately for each game ID, that the oldest games are removed once the store is full,
+and that the Flask routes in 'main' play on the caller's own game, giving the BOT a
+deadline for each move.
+"""
+
+import time
+
+from bots import MoveBudget, RandomBot
+from game_store import GameStore
+from components import board_to_list, check_game_over
+import main
+import mp_game_engine as mge
+
+
+def test_new_game():
+    """Tests a new game has an empty player board and a placed BOT board"""
+    store = GameStore(10, "compact")
+    game_id, game = store.new_game()
+    assert store.get(game_id) is game
+    assert game.board("player").remaining == 0
+    assert check_game_over("BOT", game) is False
+    assert store.get("unknown") is None
+    assert store.get(None) is None
+
+
+def test_games_are_separate():
+    """Tests each game ID has its own game"""
+    store = GameStore(10, "list")
+    first_id, first = store.new_game()
+    second_id, second = store.new_game()
+    assert first_id != second_id
+    first.shots_by("player").add((0, 0))
+    assert (0, 0) not in second.shots_by("player")
+    store.remove(first_id)
+    assert first_id not in store
+    assert len(store) == 1
+
+
+def test_least_recently_used_removed():
+    """Tests the least recently used game is removed once the store is full"""
+    store = GameStore(10, "compact", max_games=2)
+    first_id, _ = store.new_game()
+    second_id, _ = store.new_game()
+    # Using the first game makes the second the least recently used
+    store.get(first_id)
+    third_id, _ = store.new_game()
+    assert first_id in store
+    assert second_id not in store
+    assert third_id in store
+
+
+def test_routes_use_callers_game():
+    """Tests two players playing at once each attack their own game"""
+    first = main.app.test_client()
+    second = main.app.test_client()
+    for client in (first, second):
+        assert client.get("/placement").status_code == 200
+        assert client.get("/").status_code == 200
+
+    assert first.get("/attack?x=0&y=0").is_json
+    # The same cell can still be attacked in the other game
+    assert second.get("/attack?x=0&y=0").is_json
+    assert first.get("/attack?x=0&y=0").data == b"Already Attacked"
+
+
+def test_attack_without_game():
+    """Tests attacking without a game does not play on another player's game"""
+    client = main.app.test_client()
+    assert client.get("/attack?x=0&y=0").data == b"No Game Found"
+
+
+def test_attack_batch():
+    """Tests a batch of attacks plays every turn and stops at game over"""
+    client = main.app.test_client()
+    client.get("/placement")
+    client.get("/")
+    shots = [[x, y] for x in range(10) for y in range(10)]
+    response = client.post("/attack/batch", json={"shots": [[0, 0], [0, 0], [11, 0]]})
+    turns = response.get_json()["turns"]
+    assert "hit" in turns[0]
+    assert turns[1] == {"error": "Already Attacked"}
+    assert turns[2] == {"error": "Invalid Coordinates"}
+
+    outcome = client.post("/attack/batch", json={"shots": shots}).get_json()
+    assert outcome["finished"] is not None
+    assert "finished" in outcome["turns"][-1]
+    assert outcome["played"] < len(shots)
+    assert client.post("/attack/batch", json={"shots": "bad"}).data == (
+        b"Invalid Coordinates"
+    )
+    # Batches longer than a shot at every cell are rejected before playing
+    response = client.post("/attack/batch", json={"shots": [[0, 0]] * 101})
+    assert response.data == b"Too Many Shots"
+
+
+def test_placement_held_in_game():
+    """Tests placements posted to '/placement' are placed on the caller's own game"""
+    first = main.app.test_client()
+    second = main.app.test_client()
+    first.get("/placement")
+    second.get("/placement")
+    placements = {
+        "Carrier": [0, 5, "h"],
+        "Battleship": [0, 6, "h"],
+        "Cruiser": [0, 7, "h"],
+        "Submarine": [0, 8, "h"],
+        "Destroyer": [0, 9, "h"],
+    }
+    assert first.post("/placement", json=placements).json == {"Success": True}
+    first_game = main.games.get(first.get_cookie(main.GAME_COOKIE).value)
+    assert first_game.board("player").ship_at(5, 0) == "Carrier"
+
+    # The other player's game is untouched and still uses the default placements
+    second.get("/")
+    second_game = main.games.get(second.get_cookie(main.GAME_COOKIE).value)
+    assert second_game.board("player").ship_at(0, 0) == "Carrier"
+
+    # Invalid placements are rejected
+    placements["Destroyer"] = [9, 9, "h"]
+    response = second.post("/placement", json=placements)
+    assert response.status_code == 400
+    assert response.json["Success"] is False
+
+
+def test_refresh_after_fleet_sunk():
+    """Tests refreshing '/' once the player's fleet is sunk keeps the sunk board"""
+    client = main.app.test_client()
+    client.get("/placement")
+    client.get("/")
+    game = main.games.get(client.get_cookie(main.GAME_COOKIE).value)
+    # The BOT sinks every ship of the player
+    for col, line in enumerate(board_to_list(game.board("player"))):
+        for row, cell in enumerate(line):
+            if cell is not None:
+                game.shots_by("BOT").add((col, row))
+                mge.resolve_shot(game, "BOT", (col, row))
+    assert check_game_over("player", game)
+
+    assert client.get("/").status_code == 200
+    assert check_game_over("player", game)
+    assert game.is_placed("player")
+
+
+def test_state_route():
+    """Tests '/state' returns bitmasks of both boards and only changes since a version"""
+    client = main.app.test_client()
+    client.get("/placement")
+    client.get("/")
+    state = client.get("/state").json
+    assert state["full"] is True
+    assert int(state["player"]["ships"], 16) != 0
+    assert "ships" not in state["BOT"]
+    assert state["BOT"]["hits"] == state["BOT"]["misses"] == "0"
+
+    client.get("/attack?x=3&y=4")
+    delta = client.get(f"/state?since={state['version']}").json
+    assert delta["full"] is False
+    assert delta["version"] > state["version"]
+    # Only the player's one shot at the BOT's board has changed
+    shot = int(delta["BOT"]["hits"], 16) | int(delta["BOT"]["misses"], 16)
+    assert shot == 1 << 43
+    bot_shot = int(delta["player"]["hits"], 16) | int(delta["player"]["misses"], 16)
+    assert bin(bot_shot).count("1") == 1
+
+    assert client.get(f"/state?since={delta['version']}").json["BOT"]["hits"] == "0"
+    assert client.get("/state?since=-5").json["full"] is True
+    assert client.get("/state?since=x").data == b"Invalid Version"
+
+
+def test_attack_gives_bot_deadline(monkeypatch):
+    """Tests '/attack' gives the BOT a deadline from the server's move budget"""
+    deadlines = []
+
+    class RecordingBot(RandomBot):
+        def choose(self, shots, deadline=None):
+            deadlines.append(deadline - time.time())
+            return super().choose(shots, deadline)
+
+    monkeypatch.setattr(main, "bot_budget", MoveBudget(0.5))
+    client = main.app.test_client()
+    client.get("/placement")
+    client.get("/")
+    game = main.games.get(client.get_cookie(main.GAME_COOKIE).value)
+    game.bot = RecordingBot(10, {})
+    client.get("/attack?x=0&y=0")
+    assert 0 < deadlines[0] <= 0.5
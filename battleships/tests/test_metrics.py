@@ -0,0 +1,77 @@
+"""
+This module contains unit tests for the 'metrics' module of the Battleships game.
+
+It uses pytest to define and run the tests. The tests check that latencies are counted
+in the right buckets, that nothing is recorded while metrics are disabled, and that the
+'/metrics' route in 'main' returns the metrics in the Prometheus text format.
+"""
+
+import pytest
+
+import main
+import metrics
+from metrics import NULL_TIMER, Histogram, Registry
+
+
+@pytest.fixture(name="enabled")
+def fixture_enabled(monkeypatch):
+    """Enables the shared registry for one test"""
+    monkeypatch.setattr(metrics.registry, "enabled", True)
+    yield metrics.registry
+    metrics.registry.clear()
+
+
+def test_histogram_buckets():
+    """Tests values are counted in the first bucket they fit in"""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.total == pytest.approx(5.65)
+
+
+def test_disabled_registry_records_nothing():
+    """Tests a disabled registry hands out a timer doing nothing and records nothing"""
+    registry = Registry()
+    timer = registry.timer("battleships_turn_phase_seconds")
+    assert timer is NULL_TIMER
+    timer.lap("bot_move")
+    registry.observe("battleships_request_seconds", (("route", "/"),), 0.1)
+    registry.increment("battleships_requests_total", (("route", "/"),))
+    assert registry.render() == "\n"
+
+
+def test_render():
+    """Tests metrics are rendered in the Prometheus text format"""
+    registry = Registry(enabled=True)
+    registry.observe("battleships_request_seconds", (("route", "/attack"),), 0.002)
+    registry.increment("battleships_requests_total", (("route", '/"x'), ("status", 200)))
+    registry.gauge("battleships_active_games", lambda: 3)
+    lines = registry.render().splitlines()
+    assert "# TYPE battleships_request_seconds histogram" in lines
+    assert 'battleships_request_seconds_bucket{route="/attack",le="0.001"} 0' in lines
+    assert 'battleships_request_seconds_bucket{route="/attack",le="0.005"} 1' in lines
+    assert 'battleships_request_seconds_bucket{route="/attack",le="+Inf"} 1' in lines
+    assert 'battleships_request_seconds_count{route="/attack"} 1' in lines
+    assert 'battleships_requests_total{route="/\\"x",status="200"} 1' in lines
+    assert "battleships_active_games 3" in lines
+
+
+def test_metrics_route(enabled):
+    """Tests the '/metrics' route reports requests and the phases of each turn"""
+    client = main.app.test_client()
+    client.get("/placement")
+    client.get("/")
+    client.get("/attack?x=0&y=0")
+    response = client.get("/metrics")
+    assert response.mimetype == "text/plain"
+    body = response.data.decode()
+    assert 'battleships_requests_total{route="/attack",status="200"} 1' in body
+    for phase in ("player_attack", "bot_move", "game_over_check"):
+        assert f'battleships_turn_phase_seconds_count{{phase="{phase}"}}' in body
+    assert "battleships_active_games" in body
+
+
+def test_metrics_route_disabled():
+    """Tests the '/metrics' route is not served while metrics are disabled"""
+    assert main.app.test_client().get("/metrics").status_code == 404
@@ -0,0 +1,164 @@
+"""
+This module contains unit tests for the 'models' module of the Battleships game.
+
+It uses pytest to define and run the tests. The tests check that the compact 'Board'
+engine works behind the existing component functions, and that 'GameState' can be
+used in place of the players dictionary.
+"""
+
+import pytest
+from components import (
+    initialise_board,
+    place_battleships,
+    check_game_over,
+    board_to_list,
+)
+from game_engine import attack
+from models import (
+    DECK_MAX_SIZE,
+    Board,
+    GameState,
+    Ship,
+    ShotTracker,
+    SparseShotTracker,
+)
+from mp_game_engine import generate_untried_attack
+
+# Ideal battleships
+ideal_ships = {
+    "Carrier": 5,
+    "Battleship": 4,
+    "Cruiser": 3,
+    "Submarine": 3,
+    "Destroyer": 2,
+}
+
+
+def test_slots():
+    """Tests the model classes do not create a dictionary for each object"""
+    for obj in (Ship("Destroyer", 2), Board(10), GameState(10), ShotTracker(10)):
+        assert not hasattr(obj, "__dict__")
+
+
+@pytest.mark.parametrize("algorithm", ["simple", "random"])
+def test_place_battleships_matches_list(algorithm):
+    """Tests every ship cell is placed on the compact Board"""
+    board = place_battleships(initialise_board(engine="compact"), ideal_ships, algorithm)
+    assert isinstance(board.cells, bytearray)
+    cells = board_to_list(board)
+    for ship, length in ideal_ships.items():
+        assert sum(row.count(ship) for row in cells) == length
+    if algorithm == "simple":
+        assert cells == place_battleships(initialise_board(), ideal_ships, algorithm)
+
+
+def test_board_tracks_health():
+    """Tests the compact Board tracks the health of its own ships"""
+    board = place_battleships(initialise_board(5, engine="compact"), {"Destroyer": 2})
+    assert attack((0, 0), board, board) is True
+    assert board["Destroyer"] == 1
+    assert attack((0, 0), board, board) is False
+    assert board.is_sunk("Destroyer") is False
+    assert attack((0, 1), board, board) is True
+    assert board.status() == {"Destroyer": 0}
+    assert board.is_game_over() is True
+
+
+@pytest.mark.parametrize("engine", ["list", "compact"])
+def test_game_state(engine):
+    """Tests GameState can be used in place of the players dictionary"""
+    battleships = {"Destroyer": 2}
+    game = GameState(5)
+    for username in ("player", "BOT"):
+        board = place_battleships(initialise_board(5, engine=engine), battleships)
+        game.add_player(username, board, battleships)
+
+    attack((0, 0), game.board("BOT"), game.fleet("BOT"))
+    assert check_game_over("BOT", game) is False
+    attack((0, 1), game.board("BOT"), game.fleet("BOT"))
+    assert check_game_over("BOT", game) is True
+    assert check_game_over("player", game) is False
+
+
+def test_shot_tracker():
+    """Tests ShotTracker detects repeated shots and rejects cells off the board"""
+    shots = ShotTracker(5)
+    assert (1, 2) not in shots
+    assert shots.add((1, 2)) is True
+    assert (1, 2) in shots
+    assert shots.add((1, 2)) is False
+    assert len(shots) == 1
+    with pytest.raises(ValueError):
+        shots.add((5, 0))
+    # The deck holds 2 byte cell indices, so large boards keep no deck
+    assert ShotTracker(DECK_MAX_SIZE).deck.itemsize == 2
+    with pytest.raises(ValueError):
+        ShotTracker(DECK_MAX_SIZE + 1)
+
+
+def test_shot_tracker_samples_untried_cells():
+    """Tests every cell is picked exactly once before the board is full"""
+    shots = ShotTracker(5)
+    picked = [generate_untried_attack(shots) for _ in range(25)]
+    assert len(set(picked)) == 25
+    assert all(0 <= col < 5 and 0 <= row < 5 for col, row in picked)
+    with pytest.raises(ValueError):
+        shots.sample()
+
+
+def test_shots_since():
+    """Tests the cells attacked after an earlier shot are found from the deck"""
+    shots = ShotTracker(10)
+    for coordinates in [(0, 0), (5, 5), (9, 9), (2, 3)]:
+        shots.add(coordinates)
+    assert shots.shots_since(0) == shots.shots
+    assert shots.shots_since(2) == (1 << 99) | (1 << 23)
+    assert shots.shots_since(4) == 0
+    shots.mark_hit((5, 5))
+    assert shots.hits == 1 << 55
+
+
+def test_sparse_shot_tracker():
+    """Tests SparseShotTracker records, samples and masks shots like ShotTracker"""
+    shots = SparseShotTracker(5)
+    for coordinates in [(0, 0), (4, 4), (1, 2)]:
+        assert shots.add(coordinates) is True
+    assert shots.add((1, 2)) is False
+    assert (4, 4) in shots and len(shots) == 3
+    assert shots.shots_since(1) == (1 << 24) | (1 << 7)
+    shots.mark_hit((4, 4))
+    assert shots.hits == 1 << 24
+    picked = [generate_untried_attack(shots) for _ in range(22)]
+    assert len(set(picked)) == 22 and shots.shots == (1 << 25) - 1
+    with pytest.raises(ValueError):
+        shots.sample()
+
+
+def test_large_games_track_shots_sparsely():
+    """Tests games on large boards keep no deck of every cell"""
+    game = GameState(20000)
+    game.add_player("player", initialise_board(20000, "sparse"), {})
+    assert isinstance(game.shots_by("player"), SparseShotTracker)
+    small = GameState(10)
+    small.add_player("player", initialise_board(10), {})
+    assert isinstance(small.shots_by("player"), ShotTracker)
+
+
+def test_game_state_version():
+    """Tests the version of a game increases and gives the earlier shot counts"""
+    game = GameState(10)
+    game.add_player("player", initialise_board(10, "compact"), {})
+    game.add_player("BOT", initialise_board(10, "compact"), {})
+    start = game.version()
+    game.shots_by("player").add((0, 0))
+    game.shots_by("BOT").add((1, 1))
+    game.shots_by("player").add((2, 2))
+    assert game.version() > start
+    assert game.shot_counts(start) == (0, 0)
+    assert game.shot_counts(game.version()) == (2, 1)
+    # Versions never reached or from before a board changed are not found
+    assert game.shot_counts(game.version() + 1) is None
+    current = game.version()
+    game.set_board("player", initialise_board(10, "compact"), {})
+    assert game.version() > current
+    assert game.shot_counts(current) is None
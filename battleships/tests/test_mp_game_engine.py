@@ -0,0 +1,122 @@
+"""
+This module contains unit tests for the 'mp_game_engine' module of the Battleships
+game.
+
+It uses pytest to define and run the tests. The tests check a 'Game' is played one
+step at a time, returning the events of each step without any console I/O, and that
+the command line game loops are driven by it.
+"""
+
+import builtins
+from itertools import chain
+
+import components as c
+import game_engine as ge
+import models as m
+import mp_game_engine as mge
+from bots import RandomBot
+
+
+def cell_inputs(*first):
+    """Returns an input function giving the entries and then every cell in turn"""
+    entries = chain(first, (f"{x}{y}" for x in range(10) for y in range(10)))
+    return lambda prompt="": next(entries)
+
+
+def test_step_returns_events():
+    """Tests a step returns the events of the player's and the BOT's shots"""
+    game = mge.create_game(bot="hunt_target")
+    events = game.step((0, 0))
+    assert events[0]["type"] == "player_shot"
+    assert events[0]["coordinates"] == [0, 0]
+    shots = [event for event in events if event["type"].endswith("_shot")]
+    assert [event["type"] for event in shots] == ["player_shot", "bot_shot"]
+    assert len(game.state.shots_by("BOT")) == 1
+    assert game.finished is False
+
+
+def test_step_errors():
+    """Tests moves which cannot be played return a single error event"""
+    game = mge.create_game()
+    game.step((0, 0))
+    assert game.step((0, 0)) == [{"type": "error", "message": "Already Attacked"}]
+    assert game.step((10, 0)) == [{"type": "error", "message": "Invalid Coordinates"}]
+
+
+def test_step_until_game_over():
+    """Tests a game ends with a game over event and rejects further moves"""
+    game = mge.create_game(bot_replies=False)
+    cells = [(col, row) for col in range(10) for row in range(10)]
+    for cell in cells:
+        events = game.step(cell)
+        if game.finished:
+            break
+    assert events[-1] == {"type": "game_over", "winner": "player"}
+    # Without the BOT replying, only the player has attacked
+    assert len(game.state.shots_by("BOT")) == 0
+    assert game.step(cells[-1]) == [{"type": "error", "message": "Game Over"}]
+
+
+def test_seeded_game_replays():
+    """Tests a game created from a seed places the same fleets and BOT moves"""
+    games = [mge.create_game(seed=5) for _ in range(2)]
+    boards = [c.board_to_list(game.state.board("BOT")) for game in games]
+    assert boards[0] == boards[1]
+    assert games[0].step((0, 0)) == games[1].step((0, 0))
+
+
+def one_hit_game() -> tuple:
+    """Returns a game where both fleets are one hit from sinking, and the cell the
+    BOT attacks, which sinks the player's fleet
+    """
+    state = m.GameState(5)
+    for username in ("player", "BOT"):
+        board = c.place_battleships(c.initialise_board(5), {"Boat": 1}, "simple")
+        state.add_player(username, board, {"Boat": 1})
+    boat = next(
+        (col, row)
+        for col, line in enumerate(c.board_to_list(state.board("player")))
+        for row, cell in enumerate(line)
+        if cell is not None
+    )
+
+    class SinkingBot(RandomBot):
+        def choose(self, shots, deadline=None):
+            return boat
+
+    state.bot = SinkingBot(5, {"Boat": 1})
+    return state, boat
+
+
+def test_player_sinking_last_ship_wins():
+    """Tests the BOT does not reply once the player has sunk its last ship"""
+    state, boat = one_hit_game()
+    game = mge.Game(state)
+    events = game.step(boat)
+    assert "bot_shot" not in [event["type"] for event in events]
+    assert events[-1] == {"type": "game_over", "winner": "player"}
+    assert game.winner == "player"
+    assert not c.check_game_over("player", state)
+
+    state, boat = one_hit_game()
+    assert mge.play_turn(state, boat) == {
+        "hit": True,
+        "Player_Turn": boat,
+        "finished": "GAME OVER PLAYER WINS!",
+    }
+
+
+def test_game_loops_use_steps(monkeypatch, capsys):
+    """Tests both command line game loops are played through to game over"""
+    monkeypatch.setattr(builtins, "input", cell_inputs("Tester"))
+    mge.ai_opponent_game_loop()
+    output = capsys.readouterr().out
+    assert "GAME OVER!" in output
+    assert "THE WINNER WAS" in output
+
+    monkeypatch.setattr(builtins, "input", cell_inputs("0", "00"))
+    ge.simple_game_loop()
+    output = capsys.readouterr().out
+    assert "Invalid data entered!" in output
+    assert "Already Attacked" in output
+    assert output.rstrip().endswith("GAME OVER!")
@@ -0,0 +1,133 @@
+"""
+This module contains unit tests for the 'numpy_board' module of the Battleships game.
+
+It uses pytest to define and run the tests. The tests check the vectorized legal
+placement search against the one at a time 'is_position_occupied' checks, and that
+the 'NumpyBoard' engine works behind 'place_battleships' and 'attack', and that window
+sums along each line match the sums of the board in both directions.
+"""
+
+import pytest
+from components import (
+    initialise_board,
+    place_battleships,
+    is_position_occupied,
+    check_game_over,
+    board_to_list,
+    DOWN,
+    RIGHT,
+)
+from game_engine import attack
+from numpy_board import (
+    generate_boards,
+    iter_boards,
+    line_window_sums,
+    placements_to_cells,
+    window_sums,
+)
+
+np = pytest.importorskip("numpy")
+
+# Ideal battleships
+ideal_ships = {
+    "Carrier": 5,
+    "Battleship": 4,
+    "Cruiser": 3,
+    "Submarine": 3,
+    "Destroyer": 2,
+}
+
+
+@pytest.mark.parametrize("length", [1, 2, 3, 5, 10])
+def test_legal_starts_match_is_position_occupied(length):
+    """Tests legal_starts agrees with is_position_occupied for every cell"""
+    board = place_battleships(initialise_board(engine="numpy"), ideal_ships, "random")
+    down, right = board.legal_starts(length)
+    for col in range(10):
+        for row in range(10):
+            assert down[col, row] == is_position_occupied(board, col, row, DOWN, length)
+            assert right[col, row] == is_position_occupied(
+                board, col, row, RIGHT, length
+            )
+
+
+def test_place_battleships_random():
+    """Tests random placement places every ship cell without overlaps"""
+    board = place_battleships(initialise_board(engine="numpy"), ideal_ships, "random")
+    cells = board_to_list(board)
+    for ship, length in ideal_ships.items():
+        assert sum(row.count(ship) for row in cells) == length
+
+
+def test_place_battleships_random_full_board():
+    """Tests random placement raises an error when a ship cannot fit"""
+    battleships = {"A": 5, "B": 5, "C": 5, "D": 5, "E": 5, "F": 1}
+    with pytest.raises(ValueError):
+        place_battleships(initialise_board(5, engine="numpy"), battleships, "random")
+
+
+def test_score_placements():
+    """Tests every legal placement is scored with the weight it covers"""
+    board = initialise_board(5, engine="numpy")
+    weights = np.arange(25).reshape(5, 5)
+    down, right = board.score_placements(2, weights)
+    assert right[0, 0] == 0 + 1
+    assert down[0, 0] == 0 + 5
+    assert right[0, 4] == -1
+    assert down[4, 0] == -1
+
+
+def test_attack_and_game_over():
+    """Tests attack and game over on a NumpyBoard"""
+    board = initialise_board(5, engine="numpy")
+    battleships = {"Destroyer": 2}
+    place_battleships(board, battleships)
+    players = {"player": {"board": board, "battleships": battleships}}
+
+    assert attack((4, 4), board, battleships) is False
+    assert attack((0, 0), board, battleships) is True
+    assert attack((0, 0), board, battleships) is False
+    assert check_game_over("player", players) is False
+    assert attack((0, 1), board, battleships) is True
+    assert board.is_sunk("Destroyer") is True
+    assert check_game_over("player", players) is True
+
+
+def test_generate_boards():
+    """Tests every generated board holds the whole fleet without overlaps"""
+    placements = generate_boards(2000, 10, ideal_ships, seed=1)
+    assert placements.shape == (2000, len(ideal_ships), 3)
+    cells = placements_to_cells(placements, 10, ideal_ships)
+    for index, length in enumerate(ideal_ships.values()):
+        assert ((cells == index + 1).sum(axis=(1, 2)) == length).all()
+
+
+def test_generate_boards_seed():
+    """Tests the same seed generates the same boards"""
+    first = generate_boards(100, 10, ideal_ships, seed=7)
+    second = generate_boards(100, 10, ideal_ships, seed=7)
+    assert (first == second).all()
+
+
+def test_iter_boards_chunks():
+    """Tests iter_boards splits the boards into chunks"""
+    chunks = list(iter_boards(250, 10, ideal_ships, seed=1, chunk_size=100))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+
+
+def test_generate_boards_crowded():
+    """Tests crowded boards are filled exactly or reported as unplaceable"""
+    fleet = {"A": 5, "B": 5}
+    cells = placements_to_cells(generate_boards(50, 5, fleet, seed=1), 5, fleet)
+    assert ((cells > 0).sum(axis=(1, 2)) == 10).all()
+    with pytest.raises(ValueError):
+        generate_boards(10, 5, {str(i): 5 for i in range(6)}, seed=1)
+
+
+def test_line_window_sums():
+    """Tests window sums along each line match the sums going DOWN and RIGHT"""
+    grid = np.arange(25).reshape(5, 5)
+    down, right = window_sums(grid, 3)
+    assert (line_window_sums(grid, 3) == right[:, :3]).all()
+    assert (line_window_sums(grid.T, 3).T == down[:3, :]).all()
+    assert line_window_sums(grid, 3)[0].tolist() == [3, 6, 9]
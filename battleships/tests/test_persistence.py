@@ -0,0 +1,193 @@
+"""
+This module contains unit tests for the 'persistence' module of the Battleships game.
+
+It uses pytest to define and run the tests. The tests check that games saved to a
+SQLite database are restored with the same boards, shots and fleets, including by a
+new game store as if the server had restarted, that loads do not wait for queued
+writes, that unknown game IDs are only looked up once, that games are only saved
+while they are being played, and that a game restored by two requests at once is
+only restored into the store once.
+"""
+
+import threading
+import time
+
+import pytest
+
+from components import board_placements, initialise_board, place_battleships
+from game_store import GameStore
+from persistence import Persistence, SQLitePersistence
+import mp_game_engine as mge
+
+
+@pytest.fixture(name="database")
+def fixture_database(tmp_path):
+    """Returns the path of a new database file"""
+    return str(tmp_path / "games.db")
+
+
+def test_board_placements():
+    """Tests the placements of a board can place the same ships again"""
+    board = place_battleships(
+        initialise_board(10), {"Carrier": 5, "Cruiser": 3}, algorithm="random"
+    )
+    placements = board_placements(board)
+    assert set(placements) == {"Carrier", "Cruiser"}
+    for row, col, direction in placements.values():
+        assert board[col][row] is not None
+        assert direction in ("h", "v")
+
+
+def test_default_persistence_keeps_nothing():
+    """Tests the default backend restores no games"""
+    backend = Persistence()
+    backend.save_game("game", 10, "list", {"Carrier": 5})
+    assert backend.load_game("game") is None
+
+
+def test_moves_committed_in_batches(database):
+    """Tests queued writes are saved once flushed"""
+    backend = SQLitePersistence(database, flush_interval=0.01)
+    backend.save_game("game", 10, "list", {"Destroyer": 2})
+    backend.save_board("game", "BOT", {"Destroyer": [0, 0, "h"]})
+    for row in range(3):
+        backend.record_move("game", "player", (0, row))
+    saved = backend.load_game("game")
+    assert saved["battleships"] == {"Destroyer": 2}
+    assert saved["boards"]["BOT"] == {"Destroyer": [0, 0, "h"]}
+    assert saved["moves"] == [("player", 0, 0), ("player", 0, 1), ("player", 0, 2)]
+    backend.delete_game("game")
+    assert backend.load_game("game") is None
+    backend.close()
+    assert backend.failed_batches == 0
+
+
+@pytest.mark.parametrize("engine", ["list", "compact", "bitboard"])
+def test_game_restored_after_restart(database, engine):
+    """Tests a new store restores a game with the same boards and shots"""
+    store = GameStore(
+        10, engine, persistence=SQLitePersistence(database), bot="hunt_target"
+    )
+    game_id, game = store.new_game()
+    place_battleships(game.board("player"), {"Carrier": 5, "Cruiser": 3}, "simple")
+    store.save_board(game_id, "player")
+    for col in range(3):
+        mge.play_turn(game, (col, 0), lambda event: store.record_event(game_id, event))
+    store.persistence.close()
+
+    # A new store acts as a server which has restarted
+    restarted = GameStore(
+        10, engine, persistence=SQLitePersistence(database), bot="hunt_target"
+    )
+    restored = restarted.get(game_id)
+    assert restored is not None
+    assert game_id in restarted
+    for username in ("player", "BOT"):
+        assert restored.shots_by(username).shots == game.shots_by(username).shots
+        assert board_placements(restored.board(username)) == board_placements(
+            game.board(username)
+        )
+        assert dict(restored.fleet(username).items()) == dict(
+            game.fleet(username).items()
+        )
+    # The BOT is rebuilt from its moves, with the same targets still to attack
+    assert restored.bot.untried == game.bot.untried
+    shots = game.shots_by("BOT")
+    assert [cell for cell in restored.bot.targets if not shots.shots >> cell & 1] == [
+        cell for cell in game.bot.targets if not shots.shots >> cell & 1
+    ]
+    assert restarted.get("unknown") is None
+    restarted.persistence.close()
+
+
+def test_load_does_not_wait_for_queue(database):
+    """Tests a game is loaded with its queued writes before they are committed"""
+    backend = SQLitePersistence(database, flush_interval=0.5)
+    backend.save_game("game", 10, "list", {"Destroyer": 2})
+    backend.save_board("game", "BOT", {"Destroyer": [0, 0, "h"]})
+    backend.record_move("game", "player", (0, 0))
+    start = time.perf_counter()
+    saved = backend.load_game("game")
+    assert time.perf_counter() - start < 0.25
+    assert saved["boards"]["BOT"] == {"Destroyer": [0, 0, "h"]}
+    assert saved["moves"] == [("player", 0, 0)]
+    backend.flush()
+    # Moves queued after the committed ones are laid over them in order
+    backend.record_move("game", "BOT", (1, 1))
+    assert backend.load_game("game")["moves"] == [("player", 0, 0), ("BOT", 1, 1)]
+    backend.delete_game("game")
+    assert backend.load_game("game") is None
+    backend.close()
+
+
+def test_unknown_games_remembered():
+    """Tests a game ID with no saved game only reaches the backend once"""
+
+    class CountingPersistence(Persistence):
+        """A backend counting the games it is asked to load"""
+
+        loads = 0
+
+        def load_game(self, game_id):
+            CountingPersistence.loads += 1
+            return None
+
+    store = GameStore(persistence=CountingPersistence())
+    assert store.get("unknown") is None
+    assert store.get("unknown") is None
+    assert CountingPersistence.loads == 1
+
+
+def test_only_placed_games_saved(database):
+    """Tests a game is saved once its ships are placed and deleted once it is over"""
+    store = GameStore(10, "compact", persistence=SQLitePersistence(database))
+    game_id, game = store.new_game()
+    assert store.persistence.load_game(game_id) is None
+    place_battleships(game.board("player"), {"Destroyer": 2}, "simple")
+    store.save_board(game_id, "player")
+    saved = store.persistence.load_game(game_id)
+    assert set(saved["boards"]) == {"player", "BOT"}
+
+    # The game is played until it is over, so the finished game is deleted
+    outcome = {}
+    for coordinates in [(col, row) for col in range(10) for row in range(10)]:
+        outcome = mge.play_turn(
+            game, coordinates, lambda event: store.record_event(game_id, event)
+        )
+        if "finished" in outcome:
+            break
+    assert "finished" in outcome
+    assert store.persistence.load_game(game_id) is None
+    assert store.get(game_id) is game
+    store.persistence.close()
+
+
+def test_game_restored_once():
+    """Tests requests restoring the same game at once all get the same game state"""
+    saved = {
+        "size": 10,
+        "engine": "list",
+        "battleships": {"Destroyer": 2},
+        "boards": {"BOT": {"Destroyer": [0, 0, "h"]}},
+        "moves": [],
+    }
+    barrier = threading.Barrier(2)
+
+    class SlowPersistence(Persistence):
+        """A backend which loads the game once both requests are loading it"""
+
+        def load_game(self, game_id):
+            barrier.wait(timeout=5)
+            return saved
+
+    store = GameStore(persistence=SlowPersistence())
+    games = []
+    threads = [
+        threading.Thread(target=lambda: games.append(store.get("game")))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert games[0] is games[1] is store.get("game")
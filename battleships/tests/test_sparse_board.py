@@ -0,0 +1,122 @@
+"""
+This module contains unit tests for the 'sparse_board' module of the Battleships game.
+
+It uses pytest to define and run the tests. The tests check that the 'SparseBoard'
+engine allows boards larger than 10, and that placement, attack, game over,
+rendering and the state of a game's boards work with it.
+"""
+
+import pytest
+from components import (
+    initialise_board,
+    place_battleships,
+    check_game_over,
+    print_player_board,
+    DOWN,
+    RIGHT,
+)
+from game_engine import attack
+from models import GameState
+from mp_game_engine import board_state, resolve_shot
+from sparse_board import SparseBoard
+
+# Ideal battleships
+ideal_ships = {
+    "Carrier": 5,
+    "Battleship": 4,
+    "Cruiser": 3,
+    "Submarine": 3,
+    "Destroyer": 2,
+}
+
+
+# Test initialise_board
+# List of different inputs and expected outputs
+@pytest.mark.parametrize(
+    "size, engine, expected_exception",
+    [
+        (1000, "sparse", None),
+        (10, "sparse", None),
+        (4, "sparse", ValueError),
+        (11, "list", ValueError),
+        (11, "compact", ValueError),
+    ],
+)
+def test_initialise_board_size(size, engine, expected_exception):
+    """Tests only the sparse engine allows boards larger than 10"""
+    if expected_exception is None:
+        assert len(initialise_board(size, engine=engine)) == size
+    else:
+        with pytest.raises(expected_exception):
+            initialise_board(size, engine=engine)
+
+
+@pytest.mark.parametrize("size", [10, 1000])
+def test_place_battleships_random(size):
+    """Tests random placement stores only the ship cells"""
+    board = initialise_board(size, engine="sparse")
+    place_battleships(board, ideal_ships, "random")
+    assert len(board.cells) == sum(ideal_ships.values())
+    assert board.remaining == sum(ideal_ships.values())
+
+
+def test_attack_and_game_over():
+    """Tests attack and game over on a large SparseBoard"""
+    board = initialise_board(1000, engine="sparse")
+    battleships = {"Destroyer": 2}
+    place_battleships(board, battleships)
+    players = {"player": {"board": board, "battleships": battleships}}
+
+    assert attack((999, 999), board, battleships) is False
+    assert attack((0, 0), board, battleships) is True
+    assert attack((0, 0), board, battleships) is False
+    assert check_game_over("player", players) is False
+    assert attack((0, 1), board, battleships) is True
+    assert board.is_sunk("Destroyer") is True
+    assert check_game_over("player", players) is True
+    # Memory only grows with the ships and shots
+    assert len(board.cells) == 2
+    assert len(board.shots) == 3
+
+
+def test_render(capsys):
+    """Tests only the lines of the board in use are rendered"""
+    board = SparseBoard(1000)
+    board.place_ship("Cruiser", 5, 10, RIGHT, 3)
+    board.place_ship("Carrier", 5, 20, RIGHT, 5)
+    board.place_ship("Destroyer", 7, 500, DOWN, 2)
+    board.attack(5, 11)
+    board.attack(5, 13)
+    print_player_board(board)
+    assert capsys.readouterr().out.splitlines() == [
+        "5: 10 Cruiser, 11 hit, 12 Cruiser, 13 miss, 20-24 Carrier",
+        "7: 500 Destroyer",
+        "8: 500 Destroyer",
+    ]
+
+
+def test_board_state_lists_cells():
+    """Tests the state of a huge board lists its cells rather than building masks"""
+    size = 100000
+    game = GameState(size)
+    for username in ("player", "BOT"):
+        board = initialise_board(size, engine="sparse")
+        place_battleships(board, {"Destroyer": 2}, "simple")
+        game.add_player(username, board, {"Destroyer": 2})
+    version = board_state(game)["version"]
+    for username, coordinates in (("player", (0, 0)), ("BOT", (size - 1, size - 1))):
+        game.shots_by(username).add(coordinates)
+        resolve_shot(game, username, coordinates)
+
+    state = board_state(game)
+    assert state["cells"] is True
+    assert state["player"] == {
+        "hits": [],
+        "misses": [(size - 1, size - 1)],
+        "ships": [(0, 0), (0, 1)],
+    }
+    assert state["BOT"] == {"hits": [(0, 0)], "misses": []}
+    # Only the shots made since an earlier version are listed
+    delta = board_state(game, since=version)
+    assert delta["full"] is False
+    assert delta["BOT"] == {"hits": [(0, 0)], "misses": []}
@@ -0,0 +1,97 @@
+"""
+This module contains unit tests for the 'tournament' module of the Battleships game.
+
+It uses pytest to define and run the tests. The tests check a match is played until
+one BOT sinks the other's fleet, results are streamed to the output file with their
+statistics, and the win rate intervals and percentiles are calculated correctly.
+They also check a seed replays the same games whatever the number of workers.
+"""
+
+import json
+
+import pytest
+
+import tournament as tm
+
+
+def test_play_match():
+    """Tests a match ends once the winner has sunk the other BOT's fleet"""
+    winner, shots = tm.play_match("hunt_target", "random")
+    assert winner in (0, 1)
+    # The first BOT attacks first, so it has made as many shots or one more
+    assert shots[0] - shots[1] in (0, 1)
+    assert shots[winner] >= 17
+
+
+def test_run_tournament_streams_results(tmp_path):
+    """Tests every result is written to the output file and counted once"""
+    output = tmp_path / "results.jsonl"
+    statistics = tm.run_tournament(
+        ["random", "hunt_target", "medium"], 10, str(output), workers=0, batch=3
+    )
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(results) == statistics["games"] == 30
+    assert len(statistics["matchups"]) == 3
+    first = statistics["matchups"][0]
+    assert first["bots"] == ["random", "hunt_target"]
+    assert sum(first["wins"]) == first["games"] == 10
+    # Each BOT of a matchup attacks first in half of its games
+    assert sum(result["starts"] for result in results) == 15
+    assert statistics["games_per_second"] > 0
+
+
+def test_run_tournament_in_pool(tmp_path):
+    """Tests games are played across worker processes"""
+    output = tmp_path / "results.jsonl"
+    statistics = tm.run_tournament(["hunt_target"], 8, str(output), workers=2, batch=2)
+    assert statistics["games"] == 8
+    games = sorted(json.loads(line)["game"] for line in open(output))
+    assert games == list(range(8))
+
+
+def test_seeded_tournament_reproducible(tmp_path):
+    """Tests a seed plays the same games in this process and across workers"""
+    runs = []
+    for workers in (0, 2):
+        output = tmp_path / f"results_{workers}.jsonl"
+        statistics = tm.run_tournament(
+            ["random", "hunt_target"], 6, str(output), workers, batch=2, seed=7
+        )
+        assert statistics["seed"] == 7
+        runs.append(sorted(open(output).read().splitlines()))
+    assert runs[0] == runs[1]
+    assert tm.play_match("random", "hunt_target", seed=7) == tm.play_match(
+        "random", "hunt_target", seed=7
+    )
+
+
+def test_seeded_monte_carlo_tournament_reproducible(tmp_path):
+    """Tests seeded games of a Monte Carlo tier do not depend on timing"""
+    runs = []
+    for workers in (0, 2):
+        output = tmp_path / f"results_{workers}.jsonl"
+        tm.run_tournament(["hard", "medium"], 2, str(output), workers, batch=1, seed=3)
+        runs.append(sorted(open(output).read().splitlines()))
+    assert runs[0] == runs[1]
+
+
+def test_invalid_strategy(tmp_path):
+    """Tests unknown strategies are rejected before any game is played"""
+    with pytest.raises(ValueError):
+        tm.run_tournament(["unknown"], 1, str(tmp_path / "results.jsonl"))
+
+
+def test_statistics():
+    """Tests the win rate intervals and the percentiles of the shots to win"""
+    low, high = tm._wilson_interval(50, 100)
+    assert low == pytest.approx(0.4038, abs=1e-3)
+    assert high == pytest.approx(0.5962, abs=1e-3)
+    assert tm._wilson_interval(0, 0) == (0.0, 1.0)
+
+    standings = tm.Standings(("a", "b"), size=10)
+    for shots in range(1, 101):
+        standings.add({"winner": 0, "shots": [shots, 0]})
+    summary = standings.summary()
+    assert summary["win_rate"] == [1.0, 0.0]
+    assert summary["shots_to_win"][0] == {"mean": 50.5, "p50": 50, "p90": 90, "p99": 99}
+    assert summary["shots_to_win"][1]["mean"] is None
@@ -0,0 +1,318 @@
+"""
+This module contains the tournament runner of BOT strategies for the Battleships game.
+
+Two BOTs play whole games against each other, each attacking a fleet placed on the
+other's board with the placement algorithms of 'components', without any server or
+console. The games are spread across every core with 'multiprocessing', and the
+result of each game is written to a file of JSON lines as soon as it is played, so a
+tournament of millions of games never holds its results in memory.
+
+The 'play_match' function plays one game between two BOTs.
+The 'Standings' class keeps the statistics of a matchup as results come in: win rates
+with confidence intervals and the shots taken to win, kept as a histogram.
+The 'run_tournament' function plays every matchup of a list of BOTs and returns the
+statistics of each, with the number of games played per second.
+
+The module can be run as a script, for example:
+    python tournament.py random hunt_target density --games 100000
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+from itertools import combinations
+from multiprocessing import Pool
+from typing import Iterator, Optional
+
+import bots as bt
+import components as c
+import models as m
+import mp_game_engine as mge
+
+
+# Number of games played by a worker before sending back their results
+BATCH_SIZE = 100
+# Percentiles of the shots taken to win given in the statistics
+PERCENTILES = (50, 90, 99)
+# The z-score of the 95% confidence intervals of the win rates
+CONFIDENCE_Z = 1.96
+
+
+def play_match(
+    first: str,
+    second: str,
+    size: int = 10,
+    algorithm: str = "random",
+    engine: str = "compact",
+    seed=None,
+) -> tuple[int, list[int]]:
+    """Plays one game between two BOTs and returns the winner and the shots of each
+
+    The first BOT attacks first. The winner is returned as 0 for the first BOT or 1
+    for the second, with the number of shots each BOT made. Given a seed, each
+    fleet and each BOT draws from its own random stream, so the game is played the
+    same way every time, in any process.
+
+    Keyword arguments:
+    first -- the strategy or difficulty of the first BOT (see bots.create_bot)
+    second -- the strategy or difficulty of the second BOT
+    size -- the size of the boards (default 10)
+    algorithm -- the placement algorithm of both fleets (default "random")
+    engine -- the board engine of both boards (default "compact")
+    seed -- the seed the game is played from, or None to use the random module
+    """
+    streams = [None] * 4 if seed is None else c.spawn_rngs(seed, 4)
+    game = m.GameState(size)
+    players = []
+    for index, strategy in enumerate((first, second)):
+        battleships = c.create_battleships()
+        board = c.place_battleships(
+            c.initialise_board(size, engine),
+            battleships,
+            algorithm,
+            rng=streams[index],
+        )
+        game.add_player(str(index), board, battleships)
+        players.append(bt.create_bot(strategy, size, battleships, streams[2 + index]))
+
+    turn = 0
+    while True:
+        attacker, target = str(turn), str(1 - turn)
+        shots = game.shots_by(attacker)
+        coordinates = players[turn].choose(shots)
+        shots.add(coordinates)
+        hit, sunk = mge.attack_and_publish(
+            coordinates, game.board(target), game.fleet(target), attacker
+        )
+        if hit:
+            shots.mark_hit(coordinates)
+        players[turn].record(coordinates, hit, sunk)
+        # The attacker wins once every ship of the target has been sunk
+        if sunk is not None and game.is_game_over(target):
+            return turn, [len(game.shots_by("0")), len(game.shots_by("1"))]
+        turn = 1 - turn
+
+
+def _play_batch(task: tuple) -> list[dict]:
+    """Plays a batch of games of a matchup and returns the result of each
+
+    The BOTs take turns to attack first, so the first game of a matchup is
+    started by its first BOT. Game n is played from the seed (seed + n), so it is
+    the same game whichever worker plays it.
+    """
+    start, count, bots, size, algorithm, engine, seed = task
+    results = []
+    for game in range(start, start + count):
+        starts = game % 2
+        winner, shots = play_match(
+            bots[starts], bots[1 - starts], size, algorithm, engine, seed + game
+        )
+        # Orders the results by the BOTs of the matchup, not by who attacked first
+        if starts:
+            winner, shots = 1 - winner, shots[::-1]
+        results.append(
+            {
+                "game": game,
+                "seed": seed + game,
+                "bots": list(bots),
+                "starts": starts,
+                "winner": winner,
+                "shots": shots,
+            }
+        )
+    return results
+
+
+def _wilson_interval(wins: int, games: int) -> tuple[float, float]:
+    """Returns the 95% Wilson score interval of a win rate"""
+    if games == 0:
+        return 0.0, 1.0
+    rate = wins / games
+    z2 = CONFIDENCE_Z * CONFIDENCE_Z
+    centre = (rate + z2 / (2 * games)) / (1 + z2 / games)
+    spread = (
+        CONFIDENCE_Z
+        * math.sqrt(rate * (1 - rate) / games + z2 / (4 * games * games))
+        / (1 + z2 / games)
+    )
+    return max(centre - spread, 0.0), min(centre + spread, 1.0)
+
+
+class Standings:
+    """The statistics of the games of one matchup, updated as results come in
+
+    The shots taken to win are kept as a histogram of at most size * size counts,
+    so the statistics take the same memory however many games are played.
+
+    Attributes:
+    bots -- the strategies of the two BOTs of the matchup
+    games -- number of games played
+    wins -- number of games won by each BOT
+    shots -- histogram of the shots taken to win by each BOT, indexed by shots
+    """
+
+    def __init__(self, bots: tuple[str, str], size: int = 10) -> None:
+        self.bots = bots
+        self.games = 0
+        self.wins = [0, 0]
+        self.shots = [[0] * (size * size + 1) for _ in range(2)]
+
+    def add(self, result: dict) -> None:
+        """Adds the result of a game"""
+        winner = result["winner"]
+        self.games += 1
+        self.wins[winner] += 1
+        self.shots[winner][result["shots"][winner]] += 1
+
+    def summary(self) -> dict:
+        """Returns the win rates and shots taken to win of both BOTs, in order"""
+        return {
+            "bots": list(self.bots),
+            "games": self.games,
+            "wins": list(self.wins),
+            "win_rate": [wins / max(self.games, 1) for wins in self.wins],
+            "win_rate_95": [
+                list(_wilson_interval(wins, self.games)) for wins in self.wins
+            ],
+            "shots_to_win": [_histogram_summary(histogram) for histogram in self.shots],
+        }
+
+
+def _histogram_summary(histogram: list[int]) -> dict:
+    """Returns the mean and percentiles of the values counted in a histogram"""
+    count = sum(histogram)
+    if count == 0:
+        return {"mean": None, **{f"p{q}": None for q in PERCENTILES}}
+    summary = {
+        "mean": sum(value * n for value, n in enumerate(histogram)) / count,
+    }
+    for q in PERCENTILES:
+        # The smallest value with at least q percent of the values at or below it
+        needed = math.ceil(count * q / 100)
+        seen = 0
+        for value, n in enumerate(histogram):
+            seen += n
+            if seen >= needed:
+                summary[f"p{q}"] = value
+                break
+    return summary
+
+
+def _tasks(
+    matchups: list,
+    games: int,
+    size: int,
+    algorithm: str,
+    engine: str,
+    batch: int,
+    seed: int,
+) -> Iterator[tuple]:
+    """Yields the batches of games of every matchup"""
+    for bots in matchups:
+        for start in range(0, games, batch):
+            count = min(batch, games - start)
+            yield start, count, bots, size, algorithm, engine, seed
+
+
+def run_tournament(
+    strategies: list[str],
+    games: int,
+    output: str,
+    workers: Optional[int] = None,
+    size: int = 10,
+    algorithm: str = "random",
+    engine: str = "compact",
+    batch: int = BATCH_SIZE,
+    seed: Optional[int] = None,
+) -> dict:
+    """Plays every matchup of a list of BOTs and returns the statistics
+
+    Every pair of strategies plays the number of games, or a single strategy plays
+    against itself. The result of each game is appended to the output file as a
+    line of JSON as soon as its batch is played, with the seed it was played from.
+    The same seed plays the same games whatever the number of workers, and every
+    matchup plays the same fleets in game n, so the BOTs are compared fairly.
+
+    Keyword arguments:
+    strategies -- the strategies or difficulties of the BOTs (see bots.create_bot)
+    games -- number of games played by each matchup
+    output -- the path of the file of JSON lines the results are written to
+    workers -- number of processes playing games, 0 to play in this process, or
+               None for one per core (default None)
+    size -- the size of the boards (default 10)
+    algorithm -- the placement algorithm of every fleet (default "random")
+    engine -- the board engine of every board (default "compact")
+    batch -- number of games played by a worker at a time (default BATCH_SIZE)
+    seed -- the seed of the first game, or None to pick one at random
+    """
+    for strategy in strategies:
+        if strategy not in bt.BOTS and strategy not in bt.DIFFICULTIES:
+            raise ValueError(f"Invalid BOT strategy: {strategy}")
+    if len(strategies) == 1:
+        matchups = [(strategies[0], strategies[0])]
+    else:
+        matchups = list(combinations(strategies, 2))
+    if seed is None:
+        seed = random.getrandbits(32)
+    standings = {bots: Standings(bots, size) for bots in matchups}
+    tasks = _tasks(matchups, games, size, algorithm, engine, batch, seed)
+
+    start = time.perf_counter()
+    with open(output, "w", encoding="utf-8") as f:
+        if workers == 0:
+            batches = map(_play_batch, tasks)
+            pool = None
+        else:
+            # Each worker reseeds its random generator so forked workers differ
+            pool = Pool(workers or os.cpu_count(), initializer=random.seed)
+            batches = pool.imap_unordered(_play_batch, tasks)
+        try:
+            for results in batches:
+                for result in results:
+                    standings[tuple(result["bots"])].add(result)
+                    f.write(json.dumps(result) + "\n")
+        finally:
+            if pool is not None:
+                pool.terminate()
+    elapsed = time.perf_counter() - start
+
+    played = sum(standing.games for standing in standings.values())
+    return {
+        "seed": seed,
+        "games": played,
+        "seconds": elapsed,
+        "games_per_second": played / elapsed if elapsed else 0.0,
+        "matchups": [standing.summary() for standing in standings.values()],
+    }
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    """Runs a tournament from the command line and prints its statistics"""
+    parser = argparse.ArgumentParser(description="Plays BOTs against each other")
+    parser.add_argument("strategies", nargs="+", help="BOT strategies or difficulties")
+    parser.add_argument("--games", type=int, default=1000, help="games per matchup")
+    parser.add_argument("--output", default="tournament.jsonl", help="results file")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use")
+    parser.add_argument("--size", type=int, default=10, help="size of the boards")
+    parser.add_argument("--algorithm", default="random", help="placement algorithm")
+    parser.add_argument("--engine", default="compact", help="board engine")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the games")
+    options = parser.parse_args(args)
+    statistics = run_tournament(
+        options.strategies,
+        options.games,
+        options.output,
+        options.workers,
+        options.size,
+        options.algorithm,
+        options.engine,
+        seed=options.seed,
+    )
+    print(json.dumps(statistics, indent=2))
+
+
+if __name__ == "__main__":
+    main()